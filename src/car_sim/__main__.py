@@ -1,10 +1,46 @@
+import argparse
+import os
 from car_sim.simulator import CarSimulator
+from car_sim.vehicle_spec import VehicleSpec
 
 
 def main():
-    simulator = CarSimulator()
+    parser = argparse.ArgumentParser(description="3D car physics simulator")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="world seed; the same seed always generates the same world")
+    parser.add_argument("--cache-dir", default=os.path.join("~", ".cache", "car_sim"),
+                        help="where generated chunks of seeded worlds are kept")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always regenerate the world")
+    parser.add_argument("--physics-rate", type=float, default=60.0,
+                        help="physics steps per simulated second, independent of the frame rate")
+    parser.add_argument("--physics-thread", action="store_true",
+                        help="run physics on its own thread")
+    parser.add_argument("--max-fps", type=int, default=0,
+                        help="frame rate cap (0 for none)")
+    parser.add_argument("--record", metavar="LOG", default=None,
+                        help="record every physics step's inputs to an input log")
+    parser.add_argument("--replay", metavar="LOG", default=None,
+                        help="play back an input log instead of driving")
+    parser.add_argument("--playback-rate", type=float, default=1.0,
+                        help="replay speed relative to real time")
+    parser.add_argument("--vehicle", default="default",
+                        help=f"vehicle to drive: one of {', '.join(VehicleSpec.available())}, "
+                             "or a vehicle JSON file")
+    args = parser.parse_args()
+    
+    # Only seeded worlds are worth caching; a random seed is never seen again
+    # (replayed worlds always come from the log's seed)
+    cache_dir = None
+    if (args.seed is not None or args.replay is not None) and not args.no_cache:
+        cache_dir = os.path.expanduser(args.cache_dir)
+    
+    simulator = CarSimulator(seed=args.seed, cache_dir=cache_dir, physics_rate=args.physics_rate,
+                             physics_thread=args.physics_thread, max_fps=args.max_fps,
+                             vehicle=args.vehicle, record=args.record, replay=args.replay,
+                             playback_rate=args.playback_rate)
     simulator.run()
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
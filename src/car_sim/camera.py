@@ -1,16 +1,24 @@
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import math
+from car_sim.frustum import Frustum
 
 class Camera:
-    def __init__(self, car):
-        self.car = car
+    def __init__(self, car, fov=45.0, aspect=4 / 3, near=0.1, far=2000.0):
+        self.car = car  # Followed object: x, y, z and angle (the simulator passes the drawn pose)
         self.distance = 6.0  # Distance behind car
         self.height = 2.5    # Height above car
         self.smoothing = 0.15
         self.current_pos = [0, 0, 0]
         self.target_angle = 0  # Added to track car's direction
         
+        # Projection parameters (must match gluPerspective) for culling
+        self.fov = fov
+        self.aspect = aspect
+        self.near = near
+        self.far = far
+        self.frustum = None
+        
     def update(self):
         # Smoothly follow car's angle
         angle_diff = (self.car.angle - self.target_angle)
@@ -43,4 +51,10 @@ class Camera:
             self.current_pos[0], self.current_pos[1], self.current_pos[2],
             look_x, look_y, look_z,
             0, 0, 1
-        ) 
\ No newline at end of file
+        )
+        
+        # Frustum for this frame's view, used to skip invisible chunks
+        self.frustum = Frustum(
+            self.current_pos, (look_x, look_y, look_z), (0, 0, 1),
+            self.fov, self.aspect, self.near, self.far
+        )
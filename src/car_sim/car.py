@@ -1,9 +1,26 @@
-import pygame
-from OpenGL.GL import *
 import math
+import operator
+from car_sim.vehicle_spec import VehicleSpec
 
+# A car's dynamic state; everything constant about the model (engine,
+# gearbox, brakes, handling, dimensions) is on its VehicleSpec, which cars
+# of the same model share.
 class Car:
-    def __init__(self, x, y, z, world):
+    # Everything that changes as the car drives, in a fixed order. Slots
+    # keep it compact, and a snapshot is just these values as one tuple.
+    state_fields = (
+        'x', 'y', 'z', 'angle', 'velocity', 'angular_velocity', 'pitch', 'roll',
+        'steering_angle', 'steering_input', 'current_gear', 'current_rpm', 'shifting', 'shift_timer',
+        'gear_changing', 'gear_change_timer', 'throttle', 'current_throttle', 'power_buildup',
+        'brake', 'handbrake', 'drift_angle', 'lateral_velocity', 'drift_momentum',
+    )
+    int_fields = ('current_gear',)
+    bool_fields = ('shifting', 'gear_changing')
+    __slots__ = state_fields + ('world', 'spec')
+    _get_state = operator.attrgetter(*state_fields)
+    _state_columns = tuple(enumerate(state_fields))
+
+    def __init__(self, x, y, z, world, spec=None):
         # Position and orientation
         self.x = x
         self.y = y
@@ -11,148 +28,53 @@ class Car:
         self.angle = 0
         self.velocity = 0
         self.angular_velocity = 0
+        self.pitch = 0  # Follow the ground, set every update
+        self.roll = 0
         
-        # Store world reference
+        # Store world reference and the vehicle model
         self.world = world
+        self.spec = spec if spec is not None else VehicleSpec.load()
         
-        # Basic car properties
-        self.mass = 1400  # kg
-        self.wheel_base = 2.8  # meters
+        # Steering
         self.steering_angle = 0
-        self.max_steering_angle = math.pi / 6.5  # Reduced maximum steering angle
         self.steering_input = 0
         
-        # Steering properties - adjusted for more natural turning
-        self.steering_speed = 2.5        # Slightly reduced for less sharp response
-        self.steering_return_speed = 6.0  # Keep fast return to center
-        self.angular_damping = 0.85
-        
-        # Engine and transmission properties
-        self.engine_power = 120000  # Keep at 120 kW
+        # Engine and transmission
         self.current_gear = 1
-        self.gear_ratios = [6.0, 3.8, 2.8, 2.0, 1.5, 1.0]
-        self.differential_ratio = 3.9
-        
-        # Revised speed limits per gear (in km/h)
-        self.gear_speed_limits = [25, 50, 80, 125, 160, 200]
+        self.current_rpm = self.spec.idle_rpm
+        self.shifting = False
+        self.shift_timer = 0
+        self.gear_changing = False
+        self.gear_change_timer = 0
         
-        # Throttle and power delivery - adjusted for smoother acceleration
+        # Throttle and power delivery
         self.throttle = 0
         self.current_throttle = 0
-        self.throttle_smoothing = 0.15
         self.power_buildup = 0
-        self.power_buildup_rate = 0.4
-        self.power_decay_rate = 1.0
-        
-        # Physics properties - improved ground contact
-        self.drag_coefficient = 0.35
-        self.rolling_resistance = 0.015
-        self.ground_contact_force = 2.0  # Added for better road holding
-        
-        # Added clutch simulation
-        self.clutch_engagement = 1.0
-        self.clutch_grip = 0.0
-        self.stall_rpm = 500
-        
-        # Tire and grip properties - improved ground contact
-        self.tire_grip = 2.2              # Base tire grip
-        self.lateral_grip = 1.8           # Lateral grip coefficient
-        self.slip_angle = 0
-        self.max_slip_angle = math.pi / 6
-        self.tire_rolling_radius = 0.3
-        
-        # Car dimensions (for rendering)
-        self.length = 4.5
-        self.width = 1.8
-        self.height = 1.4
-        
-        # Gear change properties
-        self.gear_changing = False
-        self.gear_change_time = 0.5  # Time to change gears
-        self.gear_change_timer = 0
-        self.optimal_shift_rpm = 5500  # RPM to shift up for best acceleration
-        self.downshift_rpm = 2500     # RPM to shift down
-        
-        # Inertia and momentum - more realistic weight
-        self.acceleration_factor = 0.4   # Reduced for much slower acceleration
-        self.momentum = 0.97
-        
-        # Vehicle dynamics - adjusted for game-like handling
-        self.understeer_factor = 0.8    # Reduced for more responsive turning
-        self.weight_transfer_factor = 0.2  # More pronounced weight transfer
-        self.steering_weight_speed = 25.0  # Speed at which steering becomes heavy
-        self.max_lateral_g = 1.1          # Maximum lateral G-force
-        self.grip_factor = 1.2          # Reduced for less sharp turning
-        self.turn_speed_factor = 0.65   # Reduced for smoother turns
-        self.drift_threshold = 25.0     # Increased for better high-speed stability
-        
-        # Speed and acceleration characteristics
-        self.max_speed = 60.0  # About 216 km/h
-        self.acceleration_curve = 0.85  # More linear acceleration (was 0.7)
-        self.current_rpm = 800
-        self.idle_rpm = 800
-        self.max_rpm = 6500
-        self.optimal_rpm = 4000
-        self.redline_rpm = 6800
-        
-        # Transmission properties
-        self.transmission_efficiency = 0.9
-        self.gear_shift_time = 0.3
-        self.shifting = False
-        self.shift_timer = 0
         
-        # Speed and acceleration
-        self.deceleration_factor = 0.98
-        self.turn_response = 3.0       # Added to control turn responsiveness
-        
-        # Braking properties
-        self.max_brake_force = 25000    # Reduced from 35000
-        self.brake_response = 0.7       # Slightly slower response
-        self.brake_efficiency = 1.2     # Reduced from 1.5
-        self.abs_threshold = 0.2        # Speed below which ABS doesn't work
-        
-        # Low speed braking
-        self.low_speed_threshold = 8.0  # km/h - increased for smoother transition
-        self.stop_threshold = 0.8       # m/s
-        self.parking_brake_factor = 0.92  # Gentler final stop
-        
-        # Tire grip for braking
-        self.brake_grip = 1.8           # Grip coefficient during braking
-        self.brake_distribution = 0.6    # Front brake bias (60% front, 40% rear)
-        
-        # Clutch and launch characteristics
-        self.clutch_engaged = False
-        self.clutch_bite_point = 0.2      # Point where clutch starts engaging
-        self.clutch_slip = 1.0            # 1.0 = full slip, 0.0 = fully engaged
-        self.clutch_engage_rate = 0.4     # How quickly clutch engages
-        self.launch_control = 0.3         # Initial power limit for smooth starts
-        
-        # First gear characteristics
-        self.initial_power_band = 8.0     # Reduced from 15.0
-        self.clutch_engagement_speed = 0.4 # Slower clutch engagement
-        self.launch_power = 0.4           # Reduced initial power
-        self.post_launch_factor = 0.6     # Smoother power transition
-        
-        # Adjusted acceleration control
-        self.initial_acceleration_limit = 0.6  # Increased from 0.3 for better launch
-        self.acceleration_curve_factor = 1.4   # Adjusted for better power delivery
-        self.speed_transition_point = 20.0     # Increased transition point
-        
-        # Stall prevention
-        self.stall_threshold = 800      # RPM below which engine might stall
-        self.min_start_speed = [0, 5, 15, 25, 35, 45]  # Minimum speed (km/h) needed for each gear
-        self.stall_chance = [0.0, 0.3, 0.7, 0.9, 0.95, 0.98]  # Chance of stall at low speed per gear
-        
-        # Handbrake properties - adjusted for better drifting
+        # Brakes
+        self.brake = 0
         self.handbrake = 0.0               # Handbrake input (0-1)
-        self.handbrake_grip_factor = 0.15  # Lower for more slide
+        
+        # Drift state
         self.drift_angle = 0.0             # Current drift angle
         self.lateral_velocity = 0.0        # Sideways velocity component
         self.drift_momentum = 0.0          # Drift state momentum
-        self.drift_recovery_rate = 0.95    # Slower recovery for longer drifts
-        self.drift_traction = 0.3          # Lower traction during drift
-        self.drift_speed_threshold = 12.0  # Lower speed threshold for drifting
-        self.drift_angle_factor = 2.5      # Stronger drift angle effect
+
+    def snapshot(self):
+        # The car's state as a tuple in state_fields order
+        return self._get_state(self)
+
+    def write_state(self, row):
+        # The snapshot written straight into `row` (e.g. a preallocated
+        # NumPy row) field by field, without building a tuple first
+        for column, name in self._state_columns:
+            row[column] = getattr(self, name)
+
+    def restore(self, state):
+        # Back to a snapshot (or any sequence in state_fields order)
+        for name, value in zip(self.state_fields, state):
+            setattr(self, name, value)
 
     def apply_throttle(self, amount):
         self.throttle = max(0, min(1, amount))
@@ -167,122 +89,77 @@ class Car:
         self.handbrake = max(0, min(1, amount))
 
     def change_gear(self, gear_change):
+        spec = self.spec
         if not self.gear_changing:
             new_gear = self.current_gear + gear_change
-            if 0 <= new_gear < len(self.gear_ratios):
+            if 0 <= new_gear < spec.gear_count:
                 self.gear_changing = True
-                self.gear_change_timer = self.gear_change_time
+                self.gear_change_timer = spec.gear_change_time
                 self.current_gear = new_gear
-                # Simulate clutch effect during gear change
-                self.clutch_grip = 0.2
 
     def calculate_engine_force(self):
+        spec = self.spec
         if self.shifting:
             self.power_buildup *= 0.5
             return 0
         
         # Throttle response
         throttle_diff = self.throttle - self.current_throttle
-        self.current_throttle += throttle_diff * self.throttle_smoothing
+        self.current_throttle += throttle_diff * spec.throttle_smoothing
         
         # Progressive power buildup
         if self.throttle > 0:
-            power_increment = self.power_buildup_rate * self.current_throttle * 0.003  # Reduced from 0.006
+            power_increment = spec.power_buildup_rate * self.current_throttle * 0.003  # Reduced from 0.006
             self.power_buildup = min(1.0, self.power_buildup + power_increment)
         else:
-            self.power_buildup = max(0.0, self.power_buildup - self.power_decay_rate * 0.008)
+            self.power_buildup = max(0.0, self.power_buildup - spec.power_decay_rate * 0.008)
 
         current_speed_kmh = abs(self.velocity * 3.6)
-
-        # Enhanced first gear launch behavior
-        if self.current_gear == 1:
-            if current_speed_kmh < self.initial_power_band:
-                if current_speed_kmh < 2.0:  # Very low speed handling
-                    # Simulate clutch engagement
-                    self.clutch_slip = max(0.0, 1.0 - (current_speed_kmh / 2.0))
-                    
-                    # Very gentle initial power
-                    initial_factor = min(1.0, current_speed_kmh)
-                    power_factor = self.launch_power * initial_factor
-                    
-                    # Apply clutch slip effect
-                    power_factor *= (1.0 - self.clutch_slip * 0.7)
-                else:
-                    # Progressive power build from 2-8 km/h
-                    speed_factor = (current_speed_kmh - 2.0) / (self.initial_power_band - 2.0)
-                    power_factor = self.launch_power + (speed_factor * (1.0 - self.launch_power))
-                    
-                    # Gradual clutch engagement
-                    clutch_factor = min(1.0, current_speed_kmh * self.clutch_engagement_speed)
-                    power_factor *= 0.4 + (clutch_factor * 0.6)
-                
-                # Apply throttle sensitivity at launch
-                power_factor *= (0.3 + self.current_throttle * 0.7)
-            else:
-                # Normal first gear power
-                power_factor = 1.0
+        gear = self.current_gear
+        min_start_speed = spec.min_start_speed[gear - 1]
         
         # Check if we can start in current gear
-        if current_speed_kmh < self.min_start_speed[self.current_gear - 1]:
-            if self.current_gear > 2:  # Only prevent starting in higher gears
+        if current_speed_kmh < min_start_speed:
+            if gear > 2:  # Only prevent starting in higher gears
                 return 0
         
         # Calculate RPM
-        wheel_rpm = abs(self.velocity) * 60 / (2 * math.pi * 0.3)
-        self.current_rpm = max(
-            self.idle_rpm,
-            wheel_rpm * self.gear_ratios[self.current_gear - 1] * self.differential_ratio
-        )
+        self.current_rpm = max(spec.idle_rpm, abs(self.velocity) * spec.rpm_per_speed[gear - 1])
         
         # Prevent starting in wrong gear
-        if self.current_rpm < self.stall_threshold and self.current_gear > 1:
-            if current_speed_kmh < self.min_start_speed[self.current_gear - 1]:
+        if self.current_rpm < spec.stall_threshold and gear > 1:
+            if current_speed_kmh < min_start_speed:
                 return 0
         
-        # Rest of power calculation
-        rpm_factor = self.current_rpm / self.max_rpm
-        if rpm_factor < 0.2:
-            power_factor = rpm_factor * 1.5
-        elif rpm_factor < 0.4:
-            power_factor = 0.3 + rpm_factor * 0.8
-        elif rpm_factor < 0.7:
-            power_factor = 0.6 + rpm_factor * 0.4
-        else:
-            power_factor = 1.0 - (rpm_factor - 0.7) * 1.2
+        # Full-throttle force at this RPM in this gear, from the spec's table
+        engine_force = spec.engine_force(gear, self.current_rpm)
         
         # Higher gear low-speed penalty
-        if current_speed_kmh < self.min_start_speed[self.current_gear - 1] * 1.2:
-            speed_factor = current_speed_kmh / (self.min_start_speed[self.current_gear - 1] * 1.2)
-            power_factor *= max(0.0, speed_factor - 0.2)
-        
-        # Calculate final engine force with all factors
-        throttle_power = pow(self.current_throttle * self.power_buildup, 1.1)
-        engine_force = (self.engine_power * 
-                       power_factor * 
-                       throttle_power * 
-                       self.gear_ratios[self.current_gear - 1] * 
-                       self.differential_ratio * 
-                       self.transmission_efficiency)
-        
-        return engine_force
+        penalty_speed = spec.penalty_speed[gear - 1]
+        if current_speed_kmh < penalty_speed:
+            engine_force *= max(0.0, current_speed_kmh / penalty_speed - 0.2)
+        
+        # Scale by the throttle response curve
+        return engine_force * (self.current_throttle * self.power_buildup) ** spec.throttle_exponent
 
     def update_steering(self, dt):
+        spec = self.spec
         # More responsive steering with better speed consideration
         speed_factor = min(1.0, abs(self.velocity) / 30.0)
         
         # Calculate maximum steering angle based on speed
-        effective_max_angle = self.max_steering_angle / (1.0 + speed_factor * 0.5)
+        effective_max_angle = spec.max_steering_angle / (1.0 + speed_factor * 0.5)
         
         # Base steering response with speed limitation
         target_angle = -self.steering_input * effective_max_angle
         
         if abs(self.steering_input) > 0.1:
             # Smoother steering response
-            steering_speed = self.steering_speed * (1.0 - speed_factor * 0.3)
+            steering_speed = spec.steering_speed * (1.0 - speed_factor * 0.3)
             self.steering_angle += (target_angle - self.steering_angle) * steering_speed * dt
         else:
             # Keep quick return to center
-            return_force = -self.steering_angle * self.steering_return_speed
+            return_force = -self.steering_angle * spec.steering_return_speed
             self.steering_angle += return_force * dt
             
             if abs(self.steering_angle) < 0.05:
@@ -290,12 +167,14 @@ class Car:
                 self.angular_velocity *= 0.5
 
     def calculate_slip_angle(self):
+        spec = self.spec
         if abs(self.velocity) < 0.1:
             return 0
         # Calculate slip angle based on steering and velocity
-        return math.atan2(self.wheel_base * math.tan(self.steering_angle), abs(self.velocity))
+        return math.atan2(spec.wheel_base * math.tan(self.steering_angle), abs(self.velocity))
 
     def update(self, dt):
+        spec = self.spec
         self.update_steering(dt)
         
         # Handle gear shifting
@@ -309,14 +188,14 @@ class Car:
             current_speed_kmh = abs(self.velocity * 3.6)
             
             # Calculate drift behavior
-            if current_speed_kmh > self.drift_speed_threshold:
+            if current_speed_kmh > spec.drift_speed_threshold:
                 # More pronounced steering effect during drift
                 steering_factor = self.steering_angle * (current_speed_kmh / 40.0)
-                self.drift_angle += steering_factor * self.handbrake * dt * self.drift_angle_factor
+                self.drift_angle += steering_factor * self.handbrake * dt * spec.drift_angle_factor
                 
                 # Apply drift physics
                 self.drift_momentum = min(1.0, self.drift_momentum + dt * 1.5)
-                grip_loss = self.handbrake * (1.0 - self.handbrake_grip_factor)
+                grip_loss = self.handbrake * (1.0 - spec.handbrake_grip_factor)
                 
                 # Enhanced vehicle dynamics during drift
                 self.angular_velocity += self.drift_angle * dt * 3.5
@@ -330,9 +209,9 @@ class Car:
                     self.throttle *= (1.0 - self.handbrake * 0.3)
         else:
             # Smoother recovery from drift
-            self.drift_angle *= self.drift_recovery_rate
+            self.drift_angle *= spec.drift_recovery_rate
             self.drift_momentum = max(0.0, self.drift_momentum - dt * 0.8)
-            self.lateral_velocity *= self.drift_recovery_rate
+            self.lateral_velocity *= spec.drift_recovery_rate
         
         # Apply drift effects to position
         if abs(self.lateral_velocity) > 0.01:
@@ -347,11 +226,11 @@ class Car:
         if self.brake > 0:
             current_speed_kmh = abs(self.velocity * 3.6)
             
-            if current_speed_kmh < self.low_speed_threshold:
+            if current_speed_kmh < spec.low_speed_threshold:
                 # Enhanced low-speed stopping
-                if abs(self.velocity) < self.stop_threshold:
+                if abs(self.velocity) < spec.stop_threshold:
                     # Gentler stop when almost stopped
-                    self.velocity *= self.parking_brake_factor
+                    self.velocity *= spec.parking_brake_factor
                     if abs(self.velocity) < 0.01:
                         self.velocity = 0
                 else:
@@ -367,16 +246,16 @@ class Car:
                 speed_factor = min(1.0, current_speed_kmh / 100.0)  # Progressive up to 100 km/h
                 
                 # Base brake force that reduces at higher speeds
-                brake_force = self.max_brake_force * (1.0 - speed_factor * 0.3)
+                brake_force = spec.max_brake_force * (1.0 - speed_factor * 0.3)
                 
                 # Apply brake with speed-dependent response
-                brake_power = pow(self.brake, self.brake_response)
+                brake_power = pow(self.brake, spec.brake_response)
                 brake_power *= (1.0 - speed_factor * 0.2)  # Less effective at high speeds
                 
-                total_brake_force = brake_force * brake_power * self.brake_efficiency
+                total_brake_force = brake_force * brake_power * spec.brake_efficiency
                 
                 # Calculate deceleration with speed-dependent effectiveness
-                brake_decel = total_brake_force / self.mass
+                brake_decel = total_brake_force / spec.mass
                 brake_decel *= (1.0 - speed_factor * 0.3)  # Less effective at high speeds
                 
                 # More gradual velocity reduction
@@ -393,11 +272,11 @@ class Car:
         net_force = engine_force - drag_force - rolling_resistance
         
         # Base acceleration
-        acceleration = net_force / self.mass
+        acceleration = net_force / spec.mass
         
         if self.throttle > 0:
             current_speed_kmh = abs(self.velocity * 3.6)
-            speed_limit = self.gear_speed_limits[self.current_gear - 1]
+            speed_limit = spec.gear_speed_limits[self.current_gear - 1]
             
             # More gradual speed limiting
             if current_speed_kmh > speed_limit * 0.85:
@@ -410,7 +289,7 @@ class Car:
             acceleration *= max(0.1, gear_factor)
             
             # Additional acceleration smoothing
-            acceleration *= self.acceleration_factor
+            acceleration *= spec.acceleration_factor
         
         # Update velocity with smooth acceleration
         self.velocity += acceleration * dt * 0.5  # Reduced from 0.7
@@ -420,97 +299,55 @@ class Car:
             self.velocity *= (1.0 - dt * 0.1)
         
         # Simpler RPM calculation
-        wheel_rpm = abs(self.velocity) * 60 / (2 * math.pi * 0.3)
         if not self.shifting:
-            target_rpm = wheel_rpm * self.gear_ratios[self.current_gear - 1] * self.differential_ratio
+            target_rpm = abs(self.velocity) * spec.rpm_per_speed[self.current_gear - 1]
             rpm_change_rate = 3000 * dt  # Faster RPM changes
             rpm_diff = target_rpm - self.current_rpm
             rpm_change = min(abs(rpm_diff), rpm_change_rate) * (1 if rpm_diff > 0 else -1)
-            self.current_rpm = max(self.idle_rpm, 
-                                 min(self.max_rpm, 
+            self.current_rpm = max(spec.idle_rpm, 
+                                 min(spec.max_rpm, 
                                      self.current_rpm + rpm_change))
         
         # Speed limits
-        self.velocity = max(-self.max_speed/2, min(self.max_speed, self.velocity))
+        self.velocity = max(-spec.max_speed/2, min(spec.max_speed, self.velocity))
         
         if abs(self.velocity) > 0.1:
             if abs(self.steering_angle) > 0.001:
                 # Calculate turn radius with more gradual response
-                turn_radius = self.wheel_base / math.sin(abs(self.steering_angle))
+                turn_radius = spec.wheel_base / math.sin(abs(self.steering_angle))
                 
                 # Smoother turning rate calculation
-                base_turn_rate = (self.velocity / turn_radius) * self.grip_factor
+                base_turn_rate = (self.velocity / turn_radius) * spec.grip_factor
                 if self.steering_angle < 0:
                     base_turn_rate = -abs(base_turn_rate)
                 
                 # More gradual turn response
-                speed_grip = max(0.4, 1.0 - (abs(self.velocity) / self.drift_threshold) * 0.4)
-                turn_rate = base_turn_rate * speed_grip * self.turn_speed_factor
+                speed_grip = max(0.4, 1.0 - (abs(self.velocity) / spec.drift_threshold) * 0.4)
+                turn_rate = base_turn_rate * speed_grip * spec.turn_speed_factor
                 
                 # Smoother angular velocity changes
-                self.angular_velocity += (turn_rate - self.angular_velocity) * self.turn_response * dt
+                self.angular_velocity += (turn_rate - self.angular_velocity) * spec.turn_response * dt
                 
                 # Gentler speed loss in turns
                 self.velocity *= (1.0 - abs(self.steering_angle) * 0.06 * dt)
             else:
                 # Maintain smooth straightening
-                self.angular_velocity *= self.angular_damping
+                self.angular_velocity *= spec.angular_damping
         
         # Calculate new position based on velocity and current angle
         intended_x = self.x + self.velocity * math.cos(self.angle) * dt
         intended_z = self.y + self.velocity * math.sin(self.angle) * dt  # Note: car's y is world's z
         
-        # Check for tree collisions BEFORE updating position
-        collision_detected = False
-        collision_response = [0, 0]
+        # Check for tree collisions BEFORE updating position. The car's
+        # circle is swept along the whole step, so a fast car cannot jump
+        # over a trunk between two frames.
+        car_radius = max(spec.width, spec.length) / 2
+        collision = self.world.vegetation.sweep_trunks(
+            self.x, self.y, intended_x, intended_z, car_radius)  # y is world's z
         
-        # Get nearby trees from current and adjacent chunks
-        chunk_x = int(self.x / self.world.chunk_size) * self.world.chunk_size
-        chunk_z = int(self.y / self.world.chunk_size) * self.world.chunk_size  # Use y as z
-        
-        # Car's bounding box (using half dimensions for collision)
-        car_radius = max(self.width, self.length) / 2
-        
-        # Check surrounding chunks
-        for dx in [-1, 0, 1]:
-            for dz in [-1, 0, 1]:  # Changed dy to dz to match world coordinates
-                check_chunk = (chunk_x + dx * self.world.chunk_size, 
-                             chunk_z + dz * self.world.chunk_size)
-                
-                # Get trees from TreeSystem
-                if hasattr(self.world, 'vegetation') and check_chunk in self.world.vegetation.chunk_trees:
-                    trees = self.world.vegetation.chunk_trees[check_chunk]
-                    for tree_x, tree_z, tree_type, _ in trees:  # Note: tree coords are in (x,z)
-                        # Calculate distance to intended position
-                        dx = intended_x - tree_x
-                        dz = intended_z - tree_z  # Compare z coordinates
-                        distance = math.sqrt(dx*dx + dz*dz)
-                        
-                        # Tree trunk collision radius (adjust based on tree type)
-                        tree_radius = 0.5  # Base trunk radius
-                        if tree_type == 'PINE':
-                            tree_radius = 0.4
-                        elif tree_type == 'OAK':
-                            tree_radius = 0.6
-                        
-                        # Total collision distance
-                        min_distance = car_radius + tree_radius
-                        
-                        if distance < min_distance:
-                            collision_detected = True
-                            # Calculate normalized bounce direction
-                            if distance > 0:  # Prevent division by zero
-                                bounce_x = dx / distance
-                                bounce_z = dz / distance
-                                collision_response[0] += bounce_x
-                                collision_response[1] += bounce_z
-
-        if collision_detected:
-            # Normalize collision response
-            response_mag = math.sqrt(collision_response[0]**2 + collision_response[1]**2)
-            if response_mag > 0:
-                collision_response[0] /= response_mag
-                collision_response[1] /= response_mag
+        if collision is not None:
+            time_of_impact, normal_x, normal_z = collision
+            collision_response = [normal_x, normal_z]
             
             # Calculate impact speed for bounce effect
             impact_speed = abs(self.velocity)
@@ -523,10 +360,12 @@ class Car:
             # Apply bounce effect
             self.velocity *= -bounce_factor
             
-            # Push car away from collision
+            # Stop where the car touched the trunk and push it away
             safe_distance = 0.2  # Push back distance
-            intended_x = self.x + collision_response[0] * safe_distance
-            intended_z = self.y + collision_response[1] * safe_distance  # Use z for world coords
+            contact_x = self.x + (intended_x - self.x) * time_of_impact
+            contact_z = self.y + (intended_z - self.y) * time_of_impact  # Use z for world coords
+            intended_x = contact_x + collision_response[0] * safe_distance
+            intended_z = contact_z + collision_response[1] * safe_distance
             
             # Add some angular momentum on impact
             impact_angle = math.atan2(collision_response[1], collision_response[0])
@@ -556,20 +395,15 @@ class Car:
         self.y = intended_z  # Car's y coordinate is world's z coordinate
         self.z = new_height + 1.0  # This is actual height (y in world coordinates)
         
-        # Calculate terrain normal for car orientation (sample points further apart)
-        # Note: Using proper coordinate system for sampling terrain heights
-        front_height = self.world.get_height_at(
-            self.x + math.cos(self.angle) * 2.0,
-            self.y + math.sin(self.angle) * 2.0  # y is world's z
-        )
-        right_height = self.world.get_height_at(
-            self.x - math.sin(self.angle) * 2.0,
-            self.y + math.cos(self.angle) * 2.0  # y is world's z
-        )
+        # Terrain normal under the car from one query; pitch and roll follow
+        # the surface slope along and across the heading
+        _, normal = self.world.get_height_and_normal(self.x, self.y)  # y is world's z
+        forward_slope = -(normal[0] * math.cos(self.angle) + normal[1] * math.sin(self.angle))
+        side_slope = -(-normal[0] * math.sin(self.angle) + normal[1] * math.cos(self.angle))
         
         # Calculate pitch and roll (more pronounced angles)
-        pitch = math.atan2(front_height - current_height, 2.0) * 1.2
-        roll = math.atan2(right_height - current_height, 2.0) * 1.2
+        pitch = math.atan2(forward_slope, normal[2]) * 1.2
+        roll = math.atan2(side_slope, normal[2]) * 1.2
         
         # Store orientation for drawing
         self.pitch = pitch
@@ -578,116 +412,26 @@ class Car:
         # Update car angle
         self.angle += self.angular_velocity * dt
         
-    def draw(self):
-        glPushMatrix()
-        
-        # Move to car position
-        glTranslatef(self.x, self.y, self.z)
-        
-        # Apply rotations in the correct order
-        glRotatef(math.degrees(self.angle), 0, 0, 1)  # Yaw
-        glRotatef(math.degrees(self.pitch), 0, 1, 0)  # Pitch
-        glRotatef(math.degrees(self.roll), 1, 0, 0)   # Roll
-        
-        # Draw car body
-        glColor3f(1.0, 0.0, 0.0)  # Red color
-        self._draw_box(self.length, self.width, self.height)
-        
-        # Draw wheels with terrain adaptation
-        self._draw_wheels()
-        
-        glPopMatrix()
-        
-    def _draw_box(self, length, width, height):
-        l, w, h = length/2, width/2, height/2
-        
-        glBegin(GL_QUADS)
-        # Front face
-        glVertex3f(l, w, -h)
-        glVertex3f(l, -w, -h)
-        glVertex3f(l, -w, h)
-        glVertex3f(l, w, h)
-        
-        # Back face
-        glVertex3f(-l, w, -h)
-        glVertex3f(-l, -w, -h)
-        glVertex3f(-l, -w, h)
-        glVertex3f(-l, w, h)
-        
-        # Top face
-        glVertex3f(l, w, h)
-        glVertex3f(-l, w, h)
-        glVertex3f(-l, -w, h)
-        glVertex3f(l, -w, h)
-        
-        # Bottom face
-        glVertex3f(l, w, -h)
-        glVertex3f(-l, w, -h)
-        glVertex3f(-l, -w, -h)
-        glVertex3f(l, -w, -h)
-        
-        # Right face
-        glVertex3f(l, w, -h)
-        glVertex3f(-l, w, -h)
-        glVertex3f(-l, w, h)
-        glVertex3f(l, w, h)
-        
-        # Left face
-        glVertex3f(l, -w, -h)
-        glVertex3f(-l, -w, -h)
-        glVertex3f(-l, -w, h)
-        glVertex3f(l, -w, h)
-        glEnd()
-        
-    def _draw_wheels(self):
-        wheel_radius = 0.3
-        wheel_width = 0.2
-        
-        # Wheel positions relative to car center
-        wheels = [
-            (self.length/3, self.width/2, -self.height/2),   # Front right
-            (self.length/3, -self.width/2, -self.height/2),  # Front left
-            (-self.length/3, self.width/2, -self.height/2),  # Rear right
-            (-self.length/3, -self.width/2, -self.height/2)  # Rear left
-        ]
-        
-        glColor3f(0.2, 0.2, 0.2)  # Dark gray for wheels
-        for x, y, z in wheels:
-            glPushMatrix()
-            glTranslatef(x, y, z)
-            self._draw_cylinder(wheel_radius, wheel_width)
-            glPopMatrix()
-            
-    def _draw_cylinder(self, radius, height):
-        # Simple cylinder implementation
-        segments = 20
-        glBegin(GL_TRIANGLE_STRIP)
-        for i in range(segments + 1):
-            angle = 2 * math.pi * i / segments
-            x = radius * math.cos(angle)
-            y = radius * math.sin(angle)
-            glVertex3f(x, 0, y)
-            glVertex3f(x, height, y)
-        glEnd()
-
     def shift_up(self):
-        if not self.shifting and self.current_gear < len(self.gear_ratios):
+        spec = self.spec
+        if not self.shifting and self.current_gear < spec.gear_count:
             # Only allow upshift if RPM is high enough
-            if self.current_rpm > self.optimal_rpm:
+            if self.current_rpm > spec.optimal_rpm:
                 self.current_gear += 1
                 self.shifting = True
-                self.shift_timer = self.gear_shift_time
+                self.shift_timer = spec.gear_shift_time
                 return True
         return False
 
     def shift_down(self):
+        spec = self.spec
         if not self.shifting and self.current_gear > 1:
             # Only allow downshift if we won't over-rev the engine
-            next_gear_rpm = self.current_rpm * (self.gear_ratios[self.current_gear - 2] / 
-                                              self.gear_ratios[self.current_gear - 1])
-            if next_gear_rpm < self.redline_rpm:
+            next_gear_rpm = self.current_rpm * (spec.gear_ratios[self.current_gear - 2] / 
+                                              spec.gear_ratios[self.current_gear - 1])
+            if next_gear_rpm < spec.redline_rpm:
                 self.current_gear -= 1
                 self.shifting = True
-                self.shift_timer = self.gear_shift_time
+                self.shift_timer = spec.gear_shift_time
                 return True
         return False 
\ No newline at end of file
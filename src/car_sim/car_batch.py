@@ -0,0 +1,325 @@
+import numpy as np
+import math
+from car_sim.car import Car
+from car_sim.vehicle_spec import VehicleSpec
+
+# N cars stepped at once. Every piece of per-car state lives in a NumPy
+# array (struct of arrays) and Car.update's engine, brake, steering and
+# drift model runs as masked vector operations over all of them. All cars
+# of a batch share one VehicleSpec, so a batch and scalar cars with the same
+# spec and inputs stay together to within floating-point noise.
+class CarBatch:
+    # Per-car state, as on Car
+    state_fields = [
+        'x', 'y', 'z', 'angle', 'velocity', 'angular_velocity', 'pitch', 'roll',
+        'steering_angle', 'steering_input', 'current_gear', 'throttle', 'current_throttle',
+        'power_buildup', 'brake', 'handbrake', 'current_rpm', 'shifting', 'shift_timer',
+        'drift_angle', 'drift_momentum', 'lateral_velocity',
+    ]
+    int_fields = {'current_gear'}
+    bool_fields = {'shifting'}
+
+    # Per-gear tables of the spec, as arrays indexed by gear - 1
+    gear_tables = ['gear_ratios', 'rpm_per_speed', 'gear_speed_limits', 'min_start_speed', 'penalty_speed']
+
+    def __init__(self, world, xs, ys, spec=None, template=None):
+        # Cars at (xs, ys), on the ground like a freshly spawned Car of
+        # `spec` (the template's, or the default vehicle)
+        self.world = world
+        if spec is None:
+            spec = template.spec if template is not None else VehicleSpec.load()
+        if template is None:
+            template = Car(0.0, 0.0, 0.0, world, spec)
+        self.spec = spec
+        for name in self.gear_tables:
+            setattr(self, name, np.array(getattr(spec, name), dtype=float))
+
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        for name in self.state_fields:
+            self.set_state(name, np.full(len(xs), getattr(template, name)))
+        self.x = xs.copy()
+        self.y = ys.copy()
+        self.z = world.get_heights(xs, ys) + 1.0
+
+    @classmethod
+    def from_cars(cls, cars):
+        # A batch continuing from the current state of scalar cars, which
+        # must share a spec
+        batch = cls(cars[0].world, np.zeros(len(cars)), np.zeros(len(cars)), template=cars[0])
+        for name in cls.state_fields:
+            batch.set_state(name, np.array([getattr(car, name) for car in cars]))
+        return batch
+
+    def set_state(self, name, values):
+        if name in self.int_fields:
+            dtype = np.int64
+        elif name in self.bool_fields:
+            dtype = bool
+        else:
+            dtype = float
+        setattr(self, name, np.array(values, dtype=dtype))
+
+    def __len__(self):
+        return len(self.x)
+
+    # Inputs take a scalar for every car or one value per car
+
+    def apply_throttle(self, amount):
+        self.throttle = np.clip(np.broadcast_to(amount, self.x.shape), 0, 1).astype(float)
+
+    def apply_brake(self, amount):
+        self.brake = np.clip(np.broadcast_to(amount, self.x.shape), 0, 1).astype(float)
+
+    def apply_steering(self, amount):
+        self.steering_input = np.clip(np.broadcast_to(amount, self.x.shape), -1, 1).astype(float)
+
+    def apply_handbrake(self, amount):
+        self.handbrake = np.clip(np.broadcast_to(amount, self.x.shape), 0, 1).astype(float)
+
+    def shift_up(self, cars=None):
+        # Shift the cars selected by the boolean mask `cars` (all when
+        # None) where Car.shift_up would; returns which ones shifted
+        spec = self.spec
+        allowed = (~self.shifting & (self.current_gear < spec.gear_count) &
+                   (self.current_rpm > spec.optimal_rpm))
+        if cars is not None:
+            allowed &= cars
+        self.current_gear += allowed
+        self.start_shift(allowed)
+        return allowed
+
+    def shift_down(self, cars=None):
+        # Only where the lower gear won't over-rev the engine
+        spec = self.spec
+        ratio_now = self.gear_ratios[self.current_gear - 1]
+        ratio_down = self.gear_ratios[np.maximum(self.current_gear - 2, 0)]
+        next_gear_rpm = self.current_rpm * (ratio_down / ratio_now)
+        allowed = ~self.shifting & (self.current_gear > 1) & (next_gear_rpm < spec.redline_rpm)
+        if cars is not None:
+            allowed &= cars
+        self.current_gear -= allowed
+        self.start_shift(allowed)
+        return allowed
+
+    def start_shift(self, cars):
+        spec = self.spec
+        self.shifting |= cars
+        self.shift_timer = np.where(cars, spec.gear_shift_time, self.shift_timer)
+
+    def calculate_engine_force(self):
+        # Car.calculate_engine_force; cars that return early there get no
+        # force here and keep whatever state they had reached
+        spec = self.spec
+        shifting = self.shifting
+        running = ~shifting
+        self.power_buildup = np.where(shifting, self.power_buildup * 0.5, self.power_buildup)
+
+        # Throttle response and progressive power buildup
+        self.current_throttle = np.where(
+            running, self.current_throttle + (self.throttle - self.current_throttle) * spec.throttle_smoothing,
+            self.current_throttle)
+        building = np.minimum(1.0, self.power_buildup + spec.power_buildup_rate * self.current_throttle * 0.003)
+        decaying = np.maximum(0.0, self.power_buildup - spec.power_decay_rate * 0.008)
+        self.power_buildup = np.where(running, np.where(self.throttle > 0, building, decaying), self.power_buildup)
+
+        current_speed_kmh = np.abs(self.velocity * 3.6)
+        gear_index = self.current_gear - 1
+
+        # Can't start in the higher gears
+        min_start_speed = self.min_start_speed[gear_index]
+        revving = running & ~((current_speed_kmh < min_start_speed) & (self.current_gear > 2))
+
+        # Calculate RPM
+        self.current_rpm = np.where(
+            revving, np.maximum(spec.idle_rpm, np.abs(self.velocity) * self.rpm_per_speed[gear_index]),
+            self.current_rpm)
+        driving = revving & ~((self.current_rpm < spec.stall_threshold) & (self.current_gear > 1) &
+                              (current_speed_kmh < min_start_speed))
+
+        # Full-throttle force from the spec's table
+        engine_force = spec.engine_forces(self.current_gear, self.current_rpm)
+
+        # Higher gear low-speed penalty
+        penalty_speed = self.penalty_speed[gear_index]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            penalty = np.maximum(0.0, current_speed_kmh / penalty_speed - 0.2)
+        engine_force = np.where(current_speed_kmh < penalty_speed, engine_force * penalty, engine_force)
+
+        throttle_power = np.power(self.current_throttle * self.power_buildup, spec.throttle_exponent)
+        return np.where(driving, engine_force * throttle_power, 0.0)
+
+    def update_steering(self, dt):
+        spec = self.spec
+        speed_factor = np.minimum(1.0, np.abs(self.velocity) / 30.0)
+        effective_max_angle = spec.max_steering_angle / (1.0 + speed_factor * 0.5)
+        target_angle = -self.steering_input * effective_max_angle
+
+        # Steer towards the target, or return to center without input
+        steering = np.abs(self.steering_input) > 0.1
+        steering_speed = spec.steering_speed * (1.0 - speed_factor * 0.3)
+        turned = self.steering_angle + (target_angle - self.steering_angle) * steering_speed * dt
+        returned = self.steering_angle + (-self.steering_angle * spec.steering_return_speed) * dt
+        centered = ~steering & (np.abs(returned) < 0.05)
+        self.steering_angle = np.where(steering, turned, np.where(centered, 0.0, returned))
+        self.angular_velocity = np.where(centered, self.angular_velocity * 0.5, self.angular_velocity)
+
+    def update(self, dt):
+        spec = self.spec
+        self.update_steering(dt)
+
+        # Handle gear shifting
+        self.shift_timer = np.where(self.shifting, self.shift_timer - dt, self.shift_timer)
+        self.shifting &= self.shift_timer > 0
+
+        # Handbrake drift above the drift speed, recovery without handbrake
+        handbrake = self.handbrake > 0
+        current_speed_kmh = np.abs(self.velocity * 3.6)
+        drifting = handbrake & (current_speed_kmh > spec.drift_speed_threshold)
+        steering_factor = self.steering_angle * (current_speed_kmh / 40.0)
+        self.drift_angle = np.where(
+            drifting, self.drift_angle + steering_factor * self.handbrake * dt * spec.drift_angle_factor,
+            self.drift_angle * np.where(handbrake, 1.0, spec.drift_recovery_rate))
+        self.drift_momentum = np.where(
+            drifting, np.minimum(1.0, self.drift_momentum + dt * 1.5),
+            np.where(handbrake, self.drift_momentum, np.maximum(0.0, self.drift_momentum - dt * 0.8)))
+        grip_loss = self.handbrake * (1.0 - spec.handbrake_grip_factor)
+        self.angular_velocity = np.where(drifting, self.angular_velocity + self.drift_angle * dt * 3.5,
+                                         self.angular_velocity)
+        self.velocity = np.where(drifting, self.velocity * (1.0 - grip_loss * 0.15), self.velocity)
+        self.lateral_velocity = np.where(
+            drifting, np.sin(self.drift_angle) * self.velocity * 0.9,
+            self.lateral_velocity * np.where(handbrake, 1.0, spec.drift_recovery_rate))
+        self.throttle = np.where(drifting & (self.throttle > 0), self.throttle * (1.0 - self.handbrake * 0.3),
+                                 self.throttle)
+
+        # Apply drift effects to position
+        sliding = np.abs(self.lateral_velocity) > 0.01
+        self.x = np.where(sliding, self.x + self.lateral_velocity * np.cos(self.angle + math.pi/2) * dt, self.x)
+        self.y = np.where(sliding, self.y + self.lateral_velocity * np.sin(self.angle + math.pi/2) * dt, self.y)
+
+        # Calculate forces
+        engine_force = self.calculate_engine_force()
+
+        # Braking: gentle stop, fixed deceleration at low speed, progressive
+        # force above that
+        braking = self.brake > 0
+        speed = np.abs(self.velocity)
+        current_speed_kmh = np.abs(self.velocity * 3.6)
+        low_speed = braking & (current_speed_kmh < spec.low_speed_threshold)
+        stopping = low_speed & (speed < spec.stop_threshold)
+        stopped = self.velocity * spec.parking_brake_factor
+        stopped = np.where(np.abs(stopped) < 0.01, 0.0, stopped)
+
+        speed_factor = np.minimum(1.0, current_speed_kmh / 100.0)
+        brake_force = spec.max_brake_force * (1.0 - speed_factor * 0.3)
+        brake_power = np.power(self.brake, spec.brake_response) * (1.0 - speed_factor * 0.2)
+        total_brake_force = brake_force * brake_power * spec.brake_efficiency
+        brake_decel = total_brake_force / spec.mass * (1.0 - speed_factor * 0.3)
+        brake_decel = np.where(low_speed, 8.0, brake_decel)
+        slowed = np.copysign(np.maximum(0.0, speed - brake_decel * dt), self.velocity)
+        self.velocity = np.where(stopping, stopped, np.where(braking, slowed, self.velocity))
+
+        # Calculate forces
+        drag_force = 0.4 * self.velocity * np.abs(self.velocity)
+        rolling_resistance = 0.1 * self.velocity
+        net_force = engine_force - drag_force - rolling_resistance
+        acceleration = net_force / spec.mass
+
+        # Gear speed limit and gear-specific acceleration under throttle
+        throttle = self.throttle > 0
+        current_speed_kmh = np.abs(self.velocity * 3.6)
+        speed_limit = self.gear_speed_limits[self.current_gear - 1]
+        limit_factor = np.clip((speed_limit - current_speed_kmh) / (speed_limit * 0.15), 0, 1.0)
+        limiting = throttle & (current_speed_kmh > speed_limit * 0.85)
+        acceleration = np.where(limiting, acceleration * np.maximum(0.05, limit_factor), acceleration)
+        gear_factor = np.maximum(0.1, 1.0 - (self.current_gear - 1) * 0.2)
+        acceleration = np.where(throttle, acceleration * gear_factor * spec.acceleration_factor, acceleration)
+
+        # Update velocity with smooth acceleration
+        self.velocity = self.velocity + acceleration * dt * 0.5
+
+        # Natural deceleration
+        coasting = (self.throttle < 0.1) & (self.brake == 0)
+        self.velocity = np.where(coasting, self.velocity * (1.0 - dt * 0.1), self.velocity)
+
+        # Simpler RPM calculation
+        target_rpm = np.abs(self.velocity) * self.rpm_per_speed[self.current_gear - 1]
+        rpm_diff = target_rpm - self.current_rpm
+        rpm_change = np.minimum(np.abs(rpm_diff), 3000 * dt) * np.where(rpm_diff > 0, 1, -1)
+        self.current_rpm = np.where(
+            self.shifting, self.current_rpm,
+            np.maximum(spec.idle_rpm, np.minimum(spec.max_rpm, self.current_rpm + rpm_change)))
+
+        # Speed limits
+        self.velocity = np.maximum(-spec.max_speed/2, np.minimum(spec.max_speed, self.velocity))
+
+        # Turning
+        moving = np.abs(self.velocity) > 0.1
+        turning = moving & (np.abs(self.steering_angle) > 0.001)
+        with np.errstate(divide='ignore'):
+            turn_radius = spec.wheel_base / np.sin(np.abs(self.steering_angle))
+        base_turn_rate = (self.velocity / turn_radius) * spec.grip_factor
+        base_turn_rate = np.where(self.steering_angle < 0, -np.abs(base_turn_rate), base_turn_rate)
+        speed_grip = np.maximum(0.4, 1.0 - (np.abs(self.velocity) / spec.drift_threshold) * 0.4)
+        turn_rate = base_turn_rate * speed_grip * spec.turn_speed_factor
+        self.angular_velocity = np.where(
+            turning, self.angular_velocity + (turn_rate - self.angular_velocity) * spec.turn_response * dt,
+            np.where(moving, self.angular_velocity * spec.angular_damping, self.angular_velocity))
+        self.velocity = np.where(turning, self.velocity * (1.0 - np.abs(self.steering_angle) * 0.06 * dt),
+                                 self.velocity)
+
+        # Intended positions; car y is world z
+        intended_x = self.x + self.velocity * np.cos(self.angle) * dt
+        intended_z = self.y + self.velocity * np.sin(self.angle) * dt
+
+        # Swept tree collisions for every car at once
+        car_radius = max(spec.width, spec.length) / 2
+        hit, time_of_impact, normal_x, normal_z = self.world.vegetation.sweep_trunks_batch(
+            self.x, self.y, intended_x, intended_z, car_radius)
+        if hit.any():
+            impact_speed = np.abs(self.velocity)
+            bounce_factor = np.where(impact_speed > 10, np.minimum(0.5, 0.3 * (impact_speed / 10)), 0.3)
+            self.velocity = np.where(hit, self.velocity * -bounce_factor, self.velocity)
+
+            # Stop where the car touched the trunk and push it away
+            safe_distance = 0.2
+            t = np.where(hit, time_of_impact, 0.0)
+            contact_x = self.x + (intended_x - self.x) * t
+            contact_z = self.y + (intended_z - self.y) * t
+            intended_x = np.where(hit, contact_x + normal_x * safe_distance, intended_x)
+            intended_z = np.where(hit, contact_z + normal_z * safe_distance, intended_z)
+
+            # Angular momentum on impact
+            impact_angle = np.arctan2(normal_z, normal_x)
+            angle_diff = np.mod(impact_angle - self.angle, 2 * math.pi)
+            angle_diff = np.where(angle_diff > math.pi, angle_diff - 2 * math.pi, angle_diff)
+            self.angular_velocity = np.where(hit, self.angular_velocity + angle_diff * impact_speed * 0.1,
+                                             self.angular_velocity)
+
+        # Slope effect from the terrain under the old and new positions
+        current_height = self.world.get_heights(self.x, self.y)
+        new_height = self.world.get_heights(intended_x, intended_z)
+        dx = intended_x - self.x
+        dz = intended_z - self.y
+        distance = np.sqrt(dx*dx + dz*dz)
+        slope_angle = np.arctan2(new_height - current_height, distance)
+        slope_factor = 1.0 - np.abs(np.sin(slope_angle)) * 0.05
+        self.velocity = np.where(distance > 0.001, self.velocity * slope_factor, self.velocity)
+
+        # Update position with proper height offset
+        self.x = intended_x
+        self.y = intended_z
+        self.z = new_height + 1.0
+
+        # Pitch and roll follow the surface slope along and across the heading
+        _, normal = self.world.get_height_and_normal(self.x, self.y)
+        cos_angle = np.cos(self.angle)
+        sin_angle = np.sin(self.angle)
+        forward_slope = -(normal[:, 0] * cos_angle + normal[:, 1] * sin_angle)
+        side_slope = -(-normal[:, 0] * sin_angle + normal[:, 1] * cos_angle)
+        self.pitch = np.arctan2(forward_slope, normal[:, 2]) * 1.2
+        self.roll = np.arctan2(side_slope, normal[:, 2]) * 1.2
+
+        # Update car angle
+        self.angle = self.angle + self.angular_velocity * dt
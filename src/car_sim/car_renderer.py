@@ -0,0 +1,106 @@
+from OpenGL.GL import *
+import math
+
+# Draws a Car; the car itself is pure physics and never touches GL. The
+# body is placed at `pose` (anything with x, y, z, angle, pitch and roll),
+# the car itself by default.
+class CarRenderer:
+    def __init__(self, car, pose=None):
+        self.car = car
+        self.pose = pose if pose is not None else car
+        
+    def draw(self):
+        car = self.car
+        pose = self.pose
+        glPushMatrix()
+        
+        # Move to car position
+        glTranslatef(pose.x, pose.y, pose.z)
+        
+        # Apply rotations in the correct order
+        glRotatef(math.degrees(pose.angle), 0, 0, 1)  # Yaw
+        glRotatef(math.degrees(pose.pitch), 0, 1, 0)  # Pitch
+        glRotatef(math.degrees(pose.roll), 1, 0, 0)   # Roll
+        
+        # Draw car body
+        glColor3f(1.0, 0.0, 0.0)  # Red color
+        spec = car.spec
+        self._draw_box(spec.length, spec.width, spec.height)
+        
+        # Draw wheels with terrain adaptation
+        self._draw_wheels()
+        
+        glPopMatrix()
+        
+    def _draw_box(self, length, width, height):
+        l, w, h = length/2, width/2, height/2
+        
+        glBegin(GL_QUADS)
+        # Front face
+        glVertex3f(l, w, -h)
+        glVertex3f(l, -w, -h)
+        glVertex3f(l, -w, h)
+        glVertex3f(l, w, h)
+        
+        # Back face
+        glVertex3f(-l, w, -h)
+        glVertex3f(-l, -w, -h)
+        glVertex3f(-l, -w, h)
+        glVertex3f(-l, w, h)
+        
+        # Top face
+        glVertex3f(l, w, h)
+        glVertex3f(-l, w, h)
+        glVertex3f(-l, -w, h)
+        glVertex3f(l, -w, h)
+        
+        # Bottom face
+        glVertex3f(l, w, -h)
+        glVertex3f(-l, w, -h)
+        glVertex3f(-l, -w, -h)
+        glVertex3f(l, -w, -h)
+        
+        # Right face
+        glVertex3f(l, w, -h)
+        glVertex3f(-l, w, -h)
+        glVertex3f(-l, w, h)
+        glVertex3f(l, w, h)
+        
+        # Left face
+        glVertex3f(l, -w, -h)
+        glVertex3f(-l, -w, -h)
+        glVertex3f(-l, -w, h)
+        glVertex3f(l, -w, h)
+        glEnd()
+        
+    def _draw_wheels(self):
+        spec = self.car.spec
+        wheel_radius = spec.tire_rolling_radius
+        wheel_width = 0.2
+        
+        # Wheel positions relative to car center
+        wheels = [
+            (spec.length/3, spec.width/2, -spec.height/2),   # Front right
+            (spec.length/3, -spec.width/2, -spec.height/2),  # Front left
+            (-spec.length/3, spec.width/2, -spec.height/2),  # Rear right
+            (-spec.length/3, -spec.width/2, -spec.height/2)  # Rear left
+        ]
+        
+        glColor3f(0.2, 0.2, 0.2)  # Dark gray for wheels
+        for x, y, z in wheels:
+            glPushMatrix()
+            glTranslatef(x, y, z)
+            self._draw_cylinder(wheel_radius, wheel_width)
+            glPopMatrix()
+            
+    def _draw_cylinder(self, radius, height):
+        # Simple cylinder implementation
+        segments = 20
+        glBegin(GL_TRIANGLE_STRIP)
+        for i in range(segments + 1):
+            angle = 2 * math.pi * i / segments
+            x = radius * math.cos(angle)
+            y = radius * math.sin(angle)
+            glVertex3f(x, 0, y)
+            glVertex3f(x, height, y)
+        glEnd()
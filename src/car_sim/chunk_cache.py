@@ -0,0 +1,127 @@
+import numpy as np
+import hashlib
+import json
+import os
+import threading
+
+# On-disk cache of generated chunks for one world.
+#
+# Terrain grids (heights and biomes for every LOD level) have a fixed size,
+# so they live in region files of region_size x region_size fixed-layout
+# records that are memory-mapped; a cached chunk is read straight from the
+# mapping without touching the noise. Tree instances vary in count and are
+# small, so each chunk gets its own .npy file holding the tree array as is,
+# memory-mapped the same way.
+#
+# Everything else that shapes a chunk (road, vegetation tables, LOD levels)
+# is passed in as `generation`, a JSON-able dict; its hash goes into
+# meta.json with the layout, and a cache written with other parameters is
+# cleared rather than read.
+class ChunkCache:
+    region_size = 16
+    version = 3  # Bump when generation changes what gets cached
+
+    def __init__(self, root, seed, resolution, chunk_size, lod_resolutions, tree_types, tree_dtype,
+                 generation=None):
+        # Keyed by the world seed: the terrain seeds derive from it, but
+        # tree placement uses it directly, and many seeds share terrain seeds
+        self.directory = os.path.join(root, f"{seed}_{resolution}_{chunk_size:g}")
+        self.tree_directory = os.path.join(self.directory, 'trees')
+        os.makedirs(self.tree_directory, exist_ok=True)
+
+        fields = [('valid', 'u1')]
+        for level, level_resolution in enumerate(lod_resolutions):
+            shape = (level_resolution + 1, level_resolution + 1)
+            fields.append((f'heights{level}', '<f8', shape))
+            fields.append((f'biomes{level}', 'u1', shape))
+        self.record_dtype = np.dtype(fields)
+        self.levels = len(lod_resolutions)
+
+        self.tree_types = list(tree_types)
+        self.tree_dtype = np.dtype(tree_dtype)
+        self.generation_hash = self.hash_parameters(generation or {})
+
+        self.regions = {}
+        self.lock = threading.Lock()
+        self.check_layout()
+
+    @staticmethod
+    def hash_parameters(parameters):
+        data = json.dumps(parameters, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def check_layout(self):
+        # Region files are only valid for the record layout and generation
+        # parameters that wrote them
+        layout = {'version': self.version, 'record': self.record_dtype.descr,
+                  'trees': self.tree_types, 'tree_record': self.tree_dtype.descr,
+                  'generation': self.generation_hash}
+        layout = json.loads(json.dumps(layout))
+        meta_path = os.path.join(self.directory, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f) == layout:
+                    return
+            self.clear()
+        with open(meta_path, 'w') as f:
+            json.dump(layout, f)
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.startswith('region_'):
+                os.remove(os.path.join(self.directory, name))
+        for name in os.listdir(self.tree_directory):
+            os.remove(os.path.join(self.tree_directory, name))
+
+    def region(self, key):
+        # Memory-mapped region holding `key` and the record index inside it
+        region_key = (key[0] // self.region_size, key[1] // self.region_size)
+        index = (key[0] % self.region_size, key[1] % self.region_size)
+        with self.lock:
+            region = self.regions.get(region_key)
+            if region is None:
+                path = os.path.join(self.directory, f"region_{region_key[0]}_{region_key[1]}.dat")
+                mode = 'r+' if os.path.exists(path) else 'w+'
+                region = np.memmap(path, dtype=self.record_dtype, mode=mode,
+                                   shape=(self.region_size, self.region_size))
+                self.regions[region_key] = region
+        return region, index
+
+    def tree_path(self, key):
+        return os.path.join(self.tree_directory, f"{key[0]}_{key[1]}.npy")
+
+    def load(self, key):
+        # (grids, trees) for a cached chunk, or None. Grids are views into
+        # the mapped region file, paged in by the OS when first read.
+        region, index = self.region(key)
+        if not region['valid'][index]:
+            return None
+        try:
+            trees = np.load(self.tree_path(key), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        if trees.dtype != self.tree_dtype:
+            return None
+
+        grids = [(region[f'heights{level}'][index], region[f'biomes{level}'][index])
+                 for level in range(self.levels)]
+        return grids, trees
+
+    def save(self, key, grids, trees):
+        # Write to a temporary name first so a crash never leaves half a file
+        path = self.tree_path(key)
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, trees)
+        os.replace(path + '.tmp', path)
+
+        # Mark the record valid only once its grids are written
+        region, index = self.region(key)
+        for level, (heights, biomes) in enumerate(grids):
+            region[f'heights{level}'][index] = heights
+            region[f'biomes{level}'][index] = biomes
+        region['valid'][index] = 1
+
+    def flush(self):
+        with self.lock:
+            for region in self.regions.values():
+                region.flush()
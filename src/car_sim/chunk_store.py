@@ -0,0 +1,98 @@
+import numpy as np
+import math
+
+# Tracks which chunks are resident and evicts them when over budget.
+# Chunks are keyed by integer chunk coordinates (floor of world position /
+# chunk size). The store does not hold chunk data itself; components that
+# keep per-chunk data register with it and get release_chunk(key) called
+# when a chunk is evicted.
+class ChunkStore:
+    def __init__(self, chunk_size, max_chunks=400, max_bytes=64 * 1024 * 1024):
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.max_bytes = max_bytes  # None disables the memory budget
+
+        self.chunk_bytes = {}  # key -> approximate size of the chunk's data
+        self.last_used = {}    # key -> frame the chunk was last needed
+        self.total_bytes = 0
+        self.frame = 0
+
+        self.components = []
+
+    def register(self, component):
+        self.components.append(component)
+
+    def chunk_key(self, x, z):
+        return (math.floor(x / self.chunk_size), math.floor(z / self.chunk_size))
+
+    def chunk_origin(self, key):
+        return (key[0] * self.chunk_size, key[1] * self.chunk_size)
+
+    @staticmethod
+    def unique_keys(chunk_ix, chunk_iz):
+        # Distinct keys among integer chunk coordinate arrays, as a (K, 2)
+        # array sorted like np.unique(axis=0), and each point's row in it.
+        # Packing the pairs into one integer keeps the sort one-dimensional.
+        if not len(chunk_ix):
+            return np.zeros((0, 2), dtype=np.int64), np.zeros(0, dtype=np.int64)
+        min_x = chunk_ix.min()
+        min_z = chunk_iz.min()
+        span_z = int(chunk_iz.max() - min_z) + 1
+        packed = (chunk_ix - min_x) * span_z + (chunk_iz - min_z)
+        packed_keys, inverse = np.unique(packed, return_inverse=True)
+        keys = np.stack([packed_keys // span_z + min_x, packed_keys % span_z + min_z], axis=1)
+        return keys, inverse.ravel()
+
+    def __contains__(self, key):
+        return key in self.chunk_bytes
+
+    def __len__(self):
+        return len(self.chunk_bytes)
+
+    def add(self, key, nbytes):
+        if key in self.chunk_bytes:
+            self.total_bytes -= self.chunk_bytes[key]
+        self.chunk_bytes[key] = nbytes
+        self.total_bytes += nbytes
+        self.last_used[key] = self.frame
+
+    def touch(self, key):
+        if key in self.chunk_bytes:
+            self.last_used[key] = self.frame
+
+    def next_frame(self):
+        self.frame += 1
+
+    def over_budget(self):
+        if len(self.chunk_bytes) > self.max_chunks:
+            return True
+        return self.max_bytes is not None and self.total_bytes > self.max_bytes
+
+    def evict(self, center_key):
+        # Least recently used first; among equally stale chunks, the ones
+        # farthest from `center_key` go first. Chunks used this frame stay.
+        if not self.over_budget():
+            return []
+
+        def priority(key):
+            dx = key[0] - center_key[0]
+            dz = key[1] - center_key[1]
+            return (self.last_used[key], -(dx * dx + dz * dz))
+
+        evicted = []
+        for key in sorted(self.chunk_bytes, key=priority):
+            if not self.over_budget() or self.last_used[key] == self.frame:
+                break
+            self.release(key)
+            evicted.append(key)
+        return evicted
+
+    def release(self, key):
+        self.total_bytes -= self.chunk_bytes.pop(key)
+        del self.last_used[key]
+        for component in self.components:
+            component.release_chunk(key)
+
+    def clear(self):
+        for key in list(self.chunk_bytes):
+            self.release(key)
@@ -0,0 +1,65 @@
+import numpy as np
+import math
+
+# View frustum built from the same parameters the renderer hands to
+# gluPerspective and gluLookAt, used to cull chunks before drawing them.
+class Frustum:
+    def __init__(self, eye, target, up, fov, aspect, near, far):
+        self.eye = np.asarray(eye, dtype=float)
+        projection = self.perspective_matrix(fov, aspect, near, far)
+        view = self.look_at_matrix(eye, target, up)
+        self.planes = self.extract_planes(projection @ view)
+
+    @staticmethod
+    def perspective_matrix(fov, aspect, near, far):
+        # Same matrix gluPerspective builds
+        f = 1.0 / math.tan(math.radians(fov) / 2)
+        return np.array([
+            [f / aspect, 0, 0, 0],
+            [0, f, 0, 0],
+            [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+            [0, 0, -1, 0],
+        ])
+
+    @staticmethod
+    def look_at_matrix(eye, target, up):
+        # Same matrix gluLookAt builds
+        eye = np.asarray(eye, dtype=float)
+        forward = np.asarray(target, dtype=float) - eye
+        forward /= np.linalg.norm(forward)
+        side = np.cross(forward, up)
+        side /= np.linalg.norm(side)
+        true_up = np.cross(side, forward)
+
+        view = np.identity(4)
+        view[0, :3] = side
+        view[1, :3] = true_up
+        view[2, :3] = -forward
+        view[:3, 3] = -view[:3, :3] @ eye
+        return view
+
+    @staticmethod
+    def extract_planes(matrix):
+        # Gribb/Hartmann: each plane is row 3 plus or minus another row.
+        # Rows are (a, b, c, d) with a*x + b*y + c*z + d >= 0 inside.
+        planes = np.array([
+            matrix[3] + matrix[0],  # Left
+            matrix[3] - matrix[0],  # Right
+            matrix[3] + matrix[1],  # Bottom
+            matrix[3] - matrix[1],  # Top
+            matrix[3] + matrix[2],  # Near
+            matrix[3] - matrix[2],  # Far
+        ])
+        return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+    def boxes_visible(self, box_min, box_max):
+        # Vectorized AABB test for N boxes given as (N, 3) corner arrays.
+        # For every plane take the box corner farthest along its normal; if
+        # even that corner is behind the plane the box is outside.
+        normals = self.planes[:, :3]
+        corners = np.where(normals[None, :, :] > 0, box_max[:, None, :], box_min[:, None, :])
+        distances = np.einsum('npk,pk->np', corners, normals) + self.planes[:, 3]
+        return (distances >= 0).all(axis=1)
+
+    def box_visible(self, box_min, box_max):
+        return bool(self.boxes_visible(np.array([box_min]), np.array([box_max]))[0])
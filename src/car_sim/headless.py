@@ -0,0 +1,40 @@
+from car_sim.car import Car
+from car_sim.vehicle_spec import VehicleSpec
+from car_sim.world import World
+
+# The simulation without a window: same world and car physics as
+# CarSimulator, but no pygame and no OpenGL anywhere in the import chain.
+# Useful for tests, scripted runs and batch experiments.
+#
+#     sim = HeadlessSimulator(seed=1234)
+#     sim.car.apply_throttle(1)
+#     sim.run(600)  # Ten simulated seconds
+#     sim.shutdown()
+class HeadlessSimulator:
+    def __init__(self, seed=None, cache_dir=None, spawn=(0.0, 0.0), vehicle='default'):
+        self.world = World(seed=seed, cache_dir=cache_dir, headless=True)
+
+        # Spawn on the ground, as the windowed simulator does
+        spawn_x, spawn_y = spawn
+        terrain_height = self.world.get_height_at(spawn_x, spawn_y)
+        self.car = Car(x=spawn_x, y=spawn_y, z=terrain_height + 1.0, world=self.world,
+                       spec=VehicleSpec.load(vehicle))
+
+        self.time = 0.0
+        self.steps = 0
+
+    def step(self, dt=1/60):
+        # One physics step on generated ground, then stream chunks around
+        # the car
+        self.world.require_chunks(self.car.x, self.car.y)
+        self.car.update(dt)
+        self.world.update((self.car.x, self.car.y))
+        self.time += dt
+        self.steps += 1
+
+    def run(self, steps, dt=1/60):
+        for _ in range(steps):
+            self.step(dt)
+
+    def shutdown(self):
+        self.world.shutdown()
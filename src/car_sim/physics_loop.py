@@ -0,0 +1,146 @@
+import math
+import threading
+import time
+
+# Physics at a fixed rate, decoupled from rendering. The car's model has
+# per-step factors (damping, drift recovery, power buildup), so it only
+# behaves the same at the same step size; frames just decide how many
+# steps are due. Rendering draws a pose interpolated between the last two
+# physics states, which keeps motion smooth when the frame rate and the
+# physics rate differ.
+
+# Where a car is drawn: position and orientation, nothing else
+class CarPose:
+    fields = ('x', 'y', 'z', 'angle', 'pitch', 'roll')
+    __slots__ = fields
+
+    def __init__(self, car=None):
+        for name in self.fields:
+            setattr(self, name, 0.0)
+        if car is not None:
+            self.capture(car)
+
+    def capture(self, car):
+        self.x = car.x
+        self.y = car.y
+        self.z = car.z
+        self.angle = car.angle
+        self.pitch = car.pitch
+        self.roll = car.roll
+
+    def blend(self, previous, current, alpha):
+        # `alpha` of the way from `previous` to `current`; angles go the
+        # short way round. Returns self.
+        self.x = previous.x + (current.x - previous.x) * alpha
+        self.y = previous.y + (current.y - previous.y) * alpha
+        self.z = previous.z + (current.z - previous.z) * alpha
+        for name in ('angle', 'pitch', 'roll'):
+            start = getattr(previous, name)
+            delta = (getattr(current, name) - start + math.pi) % (2 * math.pi) - math.pi
+            setattr(self, name, start + delta * alpha)
+        return self
+
+
+# Accumulator loop on the caller's thread: real time adds up and is
+# consumed in whole steps of 1 / rate, at most max_substeps per frame (if
+# physics falls further behind, the rest is dropped instead of spiralling).
+# `speed` scales simulated time against real time, e.g. for replays.
+class FixedTimestep:
+    def __init__(self, car, step, rate=60.0, max_substeps=8, speed=1.0):
+        self.car = car
+        self.step = step  # step(dt): apply inputs and advance the car once
+        self.dt = 1.0 / rate
+        self.max_substeps = max_substeps
+        self.speed = speed
+        self.accumulator = 0.0
+        self.steps = 0
+
+        # Poses after the last two steps; swapped, never reallocated
+        self.previous = CarPose(car)
+        self.current = CarPose(car)
+
+    def advance(self, frame_time):
+        # Run the steps owed for `frame_time` seconds; returns how many ran
+        self.accumulator += frame_time * self.speed
+        substeps = 0
+        while self.accumulator >= self.dt:
+            if substeps == self.max_substeps:
+                self.accumulator %= self.dt
+                break
+            self.step(self.dt)
+            self.previous, self.current = self.current, self.previous
+            self.current.capture(self.car)
+            self.accumulator -= self.dt
+            self.steps += 1
+            substeps += 1
+        return substeps
+
+    def interpolated_pose(self, pose):
+        # The pose one step behind real time, written into `pose`
+        return pose.blend(self.previous, self.current, self.accumulator / self.dt)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+# The same fixed-rate stepping on a thread of its own, paced by the clock,
+# so rendering can't hold physics back. Each step's pose goes into the back
+# buffer, then back, current and previous rotate under the lock; readers
+# blend the two newest poses under the same lock.
+class PhysicsThread:
+    def __init__(self, car, step, rate=60.0, max_substeps=8, speed=1.0):
+        self.car = car
+        self.step = step
+        self.dt = 1.0 / rate
+        self.interval = self.dt / speed  # Real time between steps
+        self.max_substeps = max_substeps
+        self.steps = 0
+
+        self.previous = CarPose(car)
+        self.current = CarPose(car)
+        self.back = CarPose(car)
+        self.current_time = time.perf_counter()  # Clock time the current pose is due
+        self.lock = threading.Lock()
+
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="physics", daemon=True)
+
+    def start(self):
+        self.current_time = time.perf_counter()
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def run(self):
+        next_time = self.current_time + self.interval
+        while not self.stopping.is_set():
+            now = time.perf_counter()
+            if now < next_time:
+                time.sleep(next_time - now)
+                continue
+
+            substeps = 0
+            while now >= next_time and substeps < self.max_substeps:
+                self.step(self.dt)
+                self.back.capture(self.car)
+                with self.lock:
+                    self.previous, self.current, self.back = self.current, self.back, self.previous
+                    self.current_time = next_time
+                self.steps += 1
+                substeps += 1
+                next_time += self.interval
+            if now >= next_time:
+                # Too far behind: drop the time instead of catching up
+                next_time = now + self.interval
+
+    def interpolated_pose(self, pose):
+        # The pose one step behind real time, written into `pose`
+        with self.lock:
+            alpha = (time.perf_counter() - self.current_time) / self.interval
+            return pose.blend(self.previous, self.current, min(max(alpha, 0.0), 1.0))
@@ -0,0 +1,235 @@
+import argparse
+import json
+import struct
+import time
+import numpy as np
+from car_sim.car import Car
+from car_sim.rewind import StateHistory
+from car_sim.vehicle_spec import VehicleSpec
+from car_sim.world import World
+
+# Input logs: everything needed to re-run a drive exactly. A log holds the
+# world seed, the step size, the vehicle's constants and the car's state
+# when recording started, then the controls of every physics step. Physics
+# is deterministic given those as long as the ground it touches has been
+# generated: headless runs make sure of that (World.require_chunks), so a
+# headless recording replays bit for bit. A rendered run never waits for
+# generation and drives on the noise fallback where chunks are still
+# loading; the log counts those steps, and a recording without any replays
+# exactly too.
+#
+# Layout: MAGIC, header length (uint32) and JSON header, then fixed-size
+# event records, and once the recording is closed a JSON footer (step
+# count, steps driven on fallback ground and final car state), its length and END_MAGIC. Controls are held
+# from one event to the next, so only steps where they change or a gear
+# shift happens get a record. A log cut short by a crash still replays up
+# to its last record.
+MAGIC = b'CARSIMLG'
+END_MAGIC = b'CARSIMND'
+VERSION = 1
+
+# step, throttle, brake, steering, handbrake, shift (+1 up, -1 down, 0), rewind
+RECORD = struct.Struct('<I4dbb')
+RECORD_DTYPE = np.dtype([('step', '<u4'), ('throttle', '<f8'), ('brake', '<f8'), ('steering', '<f8'),
+                         ('handbrake', '<f8'), ('shift', 'i1'), ('rewind', 'i1')])
+
+IDLE_CONTROLS = {'throttle': 0, 'brake': 0, 'steering': 0, 'handbrake': 0, 'rewind': False}
+
+
+def drive(car, controls, shifts, dt, history=None):
+    # One physics step from a step's inputs, the same for live driving and
+    # replays. While rewinding, the step goes back one recorded state.
+    if controls['rewind']:
+        if history is not None:
+            history.rewind(1)
+        return
+    if history is not None:
+        history.record()
+    car.apply_steering(controls['steering'])
+    car.apply_throttle(controls['throttle'])
+    car.apply_brake(controls['brake'])
+    car.apply_handbrake(controls['handbrake'])
+    for shift in shifts:
+        if shift > 0:
+            car.shift_up()
+        else:
+            car.shift_down()
+    car.update(dt)
+
+
+class InputRecorder:
+    def __init__(self, path, world, car, dt, history=None):
+        self.car = car
+        self.world = world
+        self.steps = 0
+        self.fallback_steps = 0  # Steps run before the ground around the car was generated
+        self.flush_interval = max(1, int(round(1.0 / dt)))  # About once a second
+        self.last_controls = None
+
+        header = {
+            'version': VERSION,
+            'seed': world.seed,
+            'terrain_seeds': [world.terrain.seed1, world.terrain.seed2],
+            'dt': dt,
+            'vehicle': car.spec.name,
+            'spec': car.spec.values,
+            'state': car.snapshot(),
+            'history_steps': history.capacity if history is not None else 0,
+        }
+        data = json.dumps(header).encode()
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC + struct.pack('<I', len(data)) + data)
+
+    def record(self, controls, shifts):
+        # Inputs of the step about to run
+        values = (float(controls['throttle']), float(controls['brake']),
+                  float(controls['steering']), float(controls['handbrake']), int(bool(controls['rewind'])))
+        if values != self.last_controls and not shifts:
+            self.file.write(RECORD.pack(self.steps, *values[:4], 0, values[4]))
+        for shift in shifts:
+            self.file.write(RECORD.pack(self.steps, *values[:4], 1 if shift > 0 else -1, values[4]))
+        self.last_controls = values
+        if not self.world.chunks_ready(self.car.x, self.car.y):
+            self.fallback_steps += 1
+        self.steps += 1
+        if self.steps % self.flush_interval == 0:
+            self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+        data = json.dumps({'steps': self.steps, 'fallback_steps': self.fallback_steps,
+                           'state': self.car.snapshot()}).encode()
+        self.file.write(data + struct.pack('<I', len(data)) + END_MAGIC)
+        self.file.close()
+
+
+class InputLog:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an input log")
+        start = len(MAGIC) + 4
+        (length,) = struct.unpack_from('<I', data, len(MAGIC))
+        self.header = json.loads(data[start:start + length])
+        if self.header['version'] != VERSION:
+            raise ValueError(f"{path}: unsupported log version {self.header['version']}")
+        start += length
+
+        # Footer of a closed log; without one, the records run to the end
+        self.footer = None
+        end = len(data)
+        if data.endswith(END_MAGIC):
+            (length,) = struct.unpack_from('<I', data, end - len(END_MAGIC) - 4)
+            end -= len(END_MAGIC) + 4 + length
+            self.footer = json.loads(data[end:end + length])
+        end -= (end - start) % RECORD.size  # Drop a half-written record
+        self.records = np.frombuffer(data[start:end], dtype=RECORD_DTYPE).tolist()
+
+        if self.footer is not None:
+            self.steps = self.footer['steps']
+        else:
+            self.steps = self.records[-1][0] + 1 if self.records else 0
+        self.seed = self.header['seed']
+        self.dt = self.header['dt']
+        self.final_state = tuple(self.footer['state']) if self.footer is not None else None
+        self.fallback_steps = self.footer.get('fallback_steps', 0) if self.footer is not None else None
+
+
+# Drives a car through a log's steps on `world`, which must have been built
+# from the log's seed
+class Replay:
+    def __init__(self, log, world):
+        if [world.terrain.seed1, world.terrain.seed2] != log.header['terrain_seeds']:
+            raise ValueError("world does not match the log's seeds")
+        self.log = log
+        self.world = world
+        self.dt = log.dt
+
+        spec = VehicleSpec(log.header['vehicle'], log.header['spec'])
+        self.car = Car(0.0, 0.0, 0.0, world, spec)
+        self.car.restore(log.header['state'])
+        self.history = None
+        if log.header['history_steps']:
+            self.history = StateHistory(self.car, seconds=log.header['history_steps'], rate=1)
+
+        self.controls = dict(IDLE_CONTROLS)
+        self.steps = 0
+        self.next_record = 0
+
+    @property
+    def finished(self):
+        return self.steps >= self.log.steps
+
+    def step(self):
+        # The next recorded step, always with the log's dt. As when
+        # recording, the chunks around the car must be resident first.
+        if self.finished:
+            return False
+        records = self.log.records
+        shifts = []
+        while self.next_record < len(records) and records[self.next_record][0] == self.steps:
+            _, throttle, brake, steering, handbrake, shift, rewind = records[self.next_record]
+            self.controls = {'throttle': throttle, 'brake': brake, 'steering': steering,
+                             'handbrake': handbrake, 'rewind': bool(rewind)}
+            if shift:
+                shifts.append(shift)
+            self.next_record += 1
+        drive(self.car, self.controls, shifts, self.dt, self.history)
+        self.steps += 1
+        return True
+
+    def matches_recording(self):
+        # Whether a finished replay ended exactly where the recording did,
+        # compared bit for bit (None if the log has no final state)
+        if self.log.final_state is None:
+            return None
+        replayed = np.array(self.car.snapshot(), dtype=float)
+        recorded = np.array(self.log.final_state, dtype=float)
+        return replayed.tobytes() == recorded.tobytes()
+
+
+def replay_headless(path, cache_dir=None):
+    # Replays a log without a window as fast as possible; returns the
+    # finished Replay
+    log = InputLog(path)
+    world = World(seed=log.seed, cache_dir=cache_dir, headless=True)
+    try:
+        replay = Replay(log, world)
+        while not replay.finished:
+            world.require_chunks(replay.car.x, replay.car.y)
+            replay.step()
+            world.update((replay.car.x, replay.car.y))
+    finally:
+        world.shutdown()
+    return replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an input log headless and check the result")
+    parser.add_argument("log", help="input log recorded with car-sim --record")
+    parser.add_argument("--cache-dir", default=None, help="chunk cache to load the world from")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    replay = replay_headless(args.log, args.cache_dir)
+    elapsed = time.perf_counter() - start
+    car = replay.car
+    print(f"{replay.steps} steps ({replay.steps * replay.dt:.1f} s simulated) in {elapsed:.2f} s")
+    print(f"final position ({car.x:.3f}, {car.y:.3f}, {car.z:.3f}), "
+          f"speed {abs(car.velocity) * 3.6:.1f} km/h, gear {car.current_gear}")
+    match = replay.matches_recording()
+    if match is None:
+        print("log has no final state (recording was not closed)")
+    elif match:
+        print("final state matches the recording exactly")
+    else:
+        print("final state differs from the recording")
+        if replay.log.fallback_steps:
+            print(f"{replay.log.fallback_steps} recorded steps ran before their ground was generated")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
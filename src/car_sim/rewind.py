@@ -0,0 +1,56 @@
+import numpy as np
+
+# Rewind history for one car: its state before each physics step, kept in
+# a ring buffer allocated once up front. Recording writes the car's state
+# into the next row in place, building no snapshot tuple, and overwrites
+# the oldest row when full; rewinding restores an earlier row and forgets
+# the steps after it.
+#
+#     history = StateHistory(car, seconds=180, rate=60)
+#     history.record()    # Before every car.update(dt)
+#     history.rewind(60)  # Back one second
+class StateHistory:
+    def __init__(self, car, seconds=180.0, rate=60.0):
+        self.car = car
+        self.capacity = max(1, int(round(seconds * rate)))
+        self.states = np.zeros((self.capacity, len(car.state_fields)))
+        self.rows = list(self.states)  # Row views, made once so recording needn't
+        self.head = 0  # Row the next record goes to
+        self.count = 0
+
+        # Rows hold floats; these fields go back to their own types
+        self.int_columns = [car.state_fields.index(name) for name in car.int_fields]
+        self.bool_columns = [car.state_fields.index(name) for name in car.bool_fields]
+
+    def __len__(self):
+        return self.count
+
+    def record(self):
+        self.car.write_state(self.rows[self.head])
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def state(self, steps_back=1):
+        # Snapshot recorded `steps_back` records ago (1 is the latest)
+        if not 1 <= steps_back <= self.count:
+            raise IndexError(f"only {self.count} steps recorded")
+        values = self.states[(self.head - steps_back) % self.capacity].tolist()
+        for column in self.int_columns:
+            values[column] = int(values[column])
+        for column in self.bool_columns:
+            values[column] = bool(values[column])
+        return tuple(values)
+
+    def rewind(self, steps=1):
+        # Restore the car to where it was `steps` steps ago (or as far back
+        # as recorded); returns how many steps it went back
+        steps = min(steps, self.count)
+        if steps:
+            self.car.restore(self.state(steps))
+            self.head = (self.head - steps) % self.capacity
+            self.count -= steps
+        return steps
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
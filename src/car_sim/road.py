@@ -1,4 +1,3 @@
-from OpenGL.GL import *
 import numpy as np
 import math
 
@@ -17,7 +16,28 @@ class Road:
         # Road network
         self.points = self.generate_road_points()
         self.segments = self.create_road_segments()
-        self.display_list = None  # Initialize as None
+        self.segment_types = ['ASPHALT'] * len(self.segments)
+        
+        # Road type lookup tables for vectorized queries
+        self.type_names = list(self.road_types)
+        self.type_friction = np.array([self.road_types[t]['friction'] for t in self.type_names])
+        self.segment_type_index = np.array([self.type_names.index(t) for t in self.segment_types])
+        
+        # Spatial index for point-to-road queries
+        self.index = self.build_index()
+        
+        # Segments clipped and binned into the world's chunk grid. Each
+        # resident chunk gets its own road mesh (see RoadRenderer), built
+        # with its terrain and released with it.
+        self.chunk_size = world.chunk_size
+        self.chunk_segments = self.bin_segments()
+        
+        # Per-chunk raster of distance to the nearest road centre line, for
+        # generation-time checks (tree placement). Distances are capped at
+        # the index radius; chunks with no road that close get no raster.
+        self.distance_resolution = 50  # Cells per chunk side
+        self.chunk_distances = {}
+        self.needs_rebuild = False  # Chunk meshes are stale (see invalidate)
     
     def generate_road_points(self):
         points = []
@@ -51,67 +71,153 @@ class Road:
         segments.append((len(self.points) - 1, 0))
         return segments
     
-    def draw(self):
-        # Create or recreate display list every frame
-        if self.display_list is not None:
-            glDeleteLists(self.display_list, 1)
-        
-        self.display_list = glGenLists(1)
-        glNewList(self.display_list, GL_COMPILE)
-        
-        # Draw road surface
-        glColor3f(0.2, 0.2, 0.2)  # Asphalt color
-        
-        for i in range(len(self.points)):
-            p1 = self.points[i]
-            p2 = self.points[(i + 1) % len(self.points)]
+    def invalidate(self):
+        # Call after the road network or the terrain under it changes. Chunk
+        # data is redone at once; meshes of resident chunks are rebuilt on
+        # the next draw.
+        self.segment_type_index = np.array([self.type_names.index(t) for t in self.segment_types])
+        self.index = self.build_index()
+        self.chunk_segments = self.bin_segments()
+        for key in list(self.world.terrain.heightmaps):
+            self.add_chunk(key, self.build_chunk_distance(key))
+        self.needs_rebuild = True
+    
+    def bin_segments(self):
+        # Split every segment where it crosses a chunk border and group the
+        # pieces by chunk key: {key: (starts, ends, type indices)}
+        points = np.array(self.points, dtype=float)
+        pieces = {}
+        for (i, j), road_type in zip(self.segments, self.segment_type_index):
+            start, end = points[i], points[j]
+            delta = end - start
             
-            # Get terrain heights
-            h1 = self.world.get_height_at(p1[0], p1[1]) + 0.1
-            h2 = self.world.get_height_at(p2[0], p2[1]) + 0.1
+            # Parameters along the segment where it crosses grid lines
+            cuts = [0.0, 1.0]
+            for axis in range(2):
+                if delta[axis] == 0:
+                    continue
+                low, high = sorted((start[axis], end[axis]))
+                lines = np.arange(math.floor(low / self.chunk_size) + 1,
+                                  math.ceil(high / self.chunk_size)) * self.chunk_size
+                cuts.extend((lines - start[axis]) / delta[axis])
+            cuts = np.unique(np.clip(cuts, 0.0, 1.0))
             
-            # Calculate road edges
-            dx = p2[0] - p1[0]
-            dy = p2[1] - p1[1]
-            length = math.sqrt(dx*dx + dy*dy)
-            if length > 0:
-                nx = -dy/length * self.width/2
-                ny = dx/length * self.width/2
-                
-                # Draw road segment
-                glBegin(GL_QUADS)
-                glVertex3f(p1[0] - nx, p1[1] - ny, h1)
-                glVertex3f(p1[0] + nx, p1[1] + ny, h1)
-                glVertex3f(p2[0] + nx, p2[1] + ny, h2)
-                glVertex3f(p2[0] - nx, p2[1] - ny, h2)
-                glEnd()
-                
-                # Draw road markings
-                glColor3f(1.0, 1.0, 1.0)  # White for markings
-                glBegin(GL_LINES)
-                glVertex3f(p1[0], p1[1], h1 + 0.01)  # Slightly above road
-                glVertex3f(p2[0], p2[1], h2 + 0.01)
-                glEnd()
-                glColor3f(0.2, 0.2, 0.2)  # Back to asphalt color
-        
-        glEndList()
-        glCallList(self.display_list)
+            piece_starts = start + cuts[:-1, None] * delta
+            piece_ends = start + cuts[1:, None] * delta
+            middles = np.floor((piece_starts + piece_ends) / 2 / self.chunk_size).astype(int)
+            for key, piece_start, piece_end in zip(map(tuple, middles.tolist()), piece_starts, piece_ends):
+                pieces.setdefault(key, []).append((piece_start, piece_end, road_type))
+        
+        return {key: (np.array([p[0] for p in chunk_pieces]),
+                      np.array([p[1] for p in chunk_pieces]),
+                      np.array([p[2] for p in chunk_pieces]))
+                for key, chunk_pieces in pieces.items()}
     
-    def get_road_type_at(self, x, y):
-        # Find nearest road segment and return its type
-        min_dist = float('inf')
-        road_type = 'ASPHALT'
+    def build_chunk_mesh(self, key, heights):
+        # Runs on a worker thread. Road surface triangles followed by marking
+        # lines for one chunk, interleaved as position/normal/color like the
+        # terrain, with heights taken from the chunk's own height grid.
+        # Returns None when no road passes through the chunk.
+        pieces = self.chunk_segments.get(key)
+        if pieces is None:
+            return None
+        starts, ends, road_types = pieces
         
-        for i in range(len(self.points)):
-            p1 = self.points[i]
-            p2 = self.points[(i + 1) % len(self.points)]
-            
-            # Calculate distance to road segment
-            dist = self.point_to_segment_distance(x, y, p1[0], p1[1], p2[0], p2[1])
-            if dist < min_dist:
-                min_dist = dist
+        origin = np.array(key, dtype=float) * self.chunk_size
+        grid = heights[None]
+        chunk_index = np.zeros(len(starts), dtype=np.int64)
+        start_heights = self.world.terrain.sample_heightmaps(
+            grid, chunk_index, starts[:, 0] - origin[0], starts[:, 1] - origin[1])[0] + 0.1
+        end_heights = self.world.terrain.sample_heightmaps(
+            grid, chunk_index, ends[:, 0] - origin[0], ends[:, 1] - origin[1])[0] + 0.1
+        
+        # Calculate road edges
+        delta = ends - starts
+        length = np.hypot(delta[:, 0], delta[:, 1])
+        keep = length > 0
+        if not keep.any():
+            return None
+        starts, ends, road_types = starts[keep], ends[keep], road_types[keep]
+        start_heights, end_heights = start_heights[keep], end_heights[keep]
+        offset = np.column_stack([-delta[keep, 1], delta[keep, 0]]) / length[keep, None] * self.width / 2
+        
+        def corner(base, side, height):
+            return np.column_stack([base + side, height])
         
-        return road_type if min_dist < self.width/2 else None
+        # Two triangles per piece quad
+        a = corner(starts, -offset, start_heights)
+        b = corner(starts, offset, start_heights)
+        c = corner(ends, offset, end_heights)
+        d = corner(ends, -offset, end_heights)
+        surface = np.stack([a, b, c, a, c, d], axis=1).reshape(-1, 3)
+        
+        # Center line markings, slightly above the road
+        markings = np.stack([corner(starts, 0, start_heights + 0.01),
+                             corner(ends, 0, end_heights + 0.01)], axis=1).reshape(-1, 3)
+        
+        vertices = np.vstack([surface, markings])
+        normals = np.tile([0.0, 0.0, 1.0], (len(vertices), 1))
+        type_colors = np.array([self.road_types[t]['color'] for t in self.type_names])
+        colors = np.vstack([np.repeat(type_colors[road_types], 6, axis=0),
+                            np.tile([1.0, 1.0, 1.0], (len(markings), 1))])  # White for markings
+        data = np.hstack([vertices, normals, colors]).astype(np.float32)
+        return data, len(surface), len(markings)
+    
+    def build_chunk_distance(self, key):
+        # Runs on a worker thread: distance raster for one chunk, sampled at
+        # (distance_resolution + 1)^2 grid points including the borders
+        steps = np.linspace(0.0, self.chunk_size, self.distance_resolution + 1)
+        xs = key[0] * self.chunk_size + steps[:, None]
+        zs = key[1] * self.chunk_size + steps[None, :]
+        distance = self.index.within_width_batch(xs, zs)[1]
+        if np.isinf(distance).all():
+            return None
+        return np.minimum(distance, self.index.radius).astype(np.float32)
+    
+    def sample_chunk_distance(self, distance, local_x, local_z):
+        # Bilinear lookup into a chunk's distance raster for arrays of
+        # chunk-local positions
+        cell = self.chunk_size / self.distance_resolution
+        fx = np.asarray(local_x) / cell
+        fz = np.asarray(local_z) / cell
+        i = np.clip(fx.astype(np.int64), 0, self.distance_resolution - 1)
+        j = np.clip(fz.astype(np.int64), 0, self.distance_resolution - 1)
+        tx = fx - i
+        tz = fz - j
+        return ((distance[i, j] * (1 - tx) + distance[i + 1, j] * tx) * (1 - tz) +
+                (distance[i, j + 1] * (1 - tx) + distance[i + 1, j + 1] * tx) * tz)
+    
+    def add_chunk(self, key, distance):
+        self.release_chunk(key)
+        if distance is not None:
+            self.chunk_distances[key] = distance
+    
+    def release_chunk(self, key):
+        self.chunk_distances.pop(key, None)
+    
+    def build_index(self):
+        points = np.array(self.points, dtype=float)
+        segments = np.array(self.segments)
+        # Everything within a full road width counts as "near" the road
+        return RoadIndex(points[segments[:, 0]], points[segments[:, 1]], radius=self.width)
+    
+    def get_road_type_at(self, x, y):
+        # Road type under a point, or None when off the road
+        segment, distance = self.index.within_width(x, y)
+        if segment < 0 or distance >= self.width / 2:
+            return None
+        return self.segment_types[segment]
+    
+    def get_road_surfaces(self, xs, ys):
+        # Vectorized surface query for arrays of points. Returns the nearest
+        # segment, its road type index into type_names and its friction;
+        # -1 / -1 / NaN where the point is not on a road.
+        segment, distance = self.index.within_width_batch(xs, ys)
+        on_road = (segment >= 0) & (distance < self.width / 2)
+        segment = np.where(on_road, segment, -1)
+        road_type = np.where(on_road, self.segment_type_index[segment], -1)
+        friction = np.where(on_road, self.type_friction[road_type], np.nan)
+        return segment, road_type, friction
     
     def point_to_segment_distance(self, x, y, x1, y1, x2, y2):
         # Calculate distance from point to line segment
@@ -135,4 +241,211 @@ class Road:
         
         x_proj = x1 + param * C
         y_proj = y1 + param * D
-        return math.sqrt((x - x_proj)**2 + (y - y_proj)**2) 
\ No newline at end of file
+        return math.sqrt((x - x_proj)**2 + (y - y_proj)**2)
+
+class RoadIndex:
+    # Uniform grid over road segments. Every segment is listed in each cell
+    # its bounding box, grown by `radius`, touches, so the cell containing a
+    # point holds every segment within `radius` of it: a within-width query
+    # is one cell lookup plus a handful of distance tests, however big the
+    # network. Nearest queries search rings of cells outwards from there.
+    def __init__(self, starts, ends, radius, cell_size=32.0):
+        self.starts = np.asarray(starts, dtype=float)
+        self.ends = np.asarray(ends, dtype=float)
+        self.radius = radius
+        self.cell_size = cell_size
+        
+        low = np.minimum(self.starts, self.ends) - radius
+        high = np.maximum(self.starts, self.ends) + radius
+        self.origin = low.min(axis=0)
+        self.shape = (np.floor((high.max(axis=0) - self.origin) / cell_size) + 1).astype(np.int64)
+        
+        # Cell range covered by every segment's padded bounding box
+        first = np.floor((low - self.origin) / cell_size).astype(np.int64)
+        last = np.floor((high - self.origin) / cell_size).astype(np.int64)
+        extent = last - first + 1
+        counts = extent[:, 0] * extent[:, 1]
+        
+        # One (cell, segment) pair per covered cell, grouped by cell (CSR)
+        segment_ids = np.repeat(np.arange(len(counts)), counts)
+        step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell_x = first[segment_ids, 0] + step // extent[segment_ids, 1]
+        cell_z = first[segment_ids, 1] + step % extent[segment_ids, 1]
+        cells = cell_x * self.shape[1] + cell_z
+        order = np.argsort(cells, kind='stable')
+        self.cell_segments = segment_ids[order]
+        self.cell_start = np.searchsorted(cells[order], np.arange(self.shape[0] * self.shape[1] + 1))
+        
+        # Plain lists for the scalar path
+        self.segment_list = [tuple(a) + tuple(b) for a, b in zip(self.starts.tolist(), self.ends.tolist())]
+    
+    def within_width(self, x, z):
+        # Nearest segment within radius of one point, from the point's own
+        # cell: (index, distance), or (-1, inf)
+        cx = math.floor((x - self.origin[0]) / self.cell_size)
+        cz = math.floor((z - self.origin[1]) / self.cell_size)
+        if not (0 <= cx < self.shape[0] and 0 <= cz < self.shape[1]):
+            return -1, math.inf
+        
+        best, best_distance = self.closest_in_cell(x, z, cx * self.shape[1] + cz, -1, math.inf)
+        if best_distance > self.radius:
+            return -1, math.inf
+        return best, best_distance
+    
+    def within_width_batch(self, xs, zs):
+        # Vectorized within_width(): arrays of segment indices and distances
+        xs, zs = np.broadcast_arrays(np.asarray(xs, dtype=float), np.asarray(zs, dtype=float))
+        shape = xs.shape
+        x = xs.ravel()
+        z = zs.ravel()
+        
+        segment = np.full(x.size, -1, dtype=np.int64)
+        distance = np.full(x.size, np.inf)
+        
+        cx = np.floor((x - self.origin[0]) / self.cell_size).astype(np.int64)
+        cz = np.floor((z - self.origin[1]) / self.cell_size).astype(np.int64)
+        inside = (cx >= 0) & (cx < self.shape[0]) & (cz >= 0) & (cz < self.shape[1])
+        points = np.flatnonzero(inside)
+        self.closest_in_cells(x, z, points, cx[points] * self.shape[1] + cz[points], segment, distance)
+        
+        too_far = distance > self.radius
+        segment[too_far] = -1
+        distance[too_far] = np.inf
+        return segment.reshape(shape), distance.reshape(shape)
+    
+    def nearest(self, x, z):
+        # Nearest segment to one point at any distance: (index, distance).
+        # Rings of cells around the point's cell (clamped into the grid) are
+        # searched outwards until nothing outside them can be closer.
+        cx = min(max(math.floor((x - self.origin[0]) / self.cell_size), 0), self.shape[0] - 1)
+        cz = min(max(math.floor((z - self.origin[1]) / self.cell_size), 0), self.shape[1] - 1)
+        best, best_distance = -1, math.inf
+        ring = 0
+        while True:
+            for dx, dz in self.ring_offsets(ring):
+                cell_x = cx + dx
+                cell_z = cz + dz
+                if 0 <= cell_x < self.shape[0] and 0 <= cell_z < self.shape[1]:
+                    best, best_distance = self.closest_in_cell(
+                        x, z, cell_x * self.shape[1] + cell_z, best, best_distance)
+            if best_distance <= float(self.unsearched_distance(x, z, cx, cz, ring)):
+                return best, best_distance
+            ring += 1
+    
+    def nearest_batch(self, xs, zs):
+        # Vectorized nearest(): arrays of segment indices and distances
+        xs, zs = np.broadcast_arrays(np.asarray(xs, dtype=float), np.asarray(zs, dtype=float))
+        shape = xs.shape
+        x = xs.ravel()
+        z = zs.ravel()
+        
+        segment = np.full(x.size, -1, dtype=np.int64)
+        distance = np.full(x.size, np.inf)
+        
+        cx = np.clip(np.floor((x - self.origin[0]) / self.cell_size).astype(np.int64), 0, self.shape[0] - 1)
+        cz = np.clip(np.floor((z - self.origin[1]) / self.cell_size).astype(np.int64), 0, self.shape[1] - 1)
+        active = np.arange(x.size)
+        ring = 0
+        while active.size:
+            for dx, dz in self.ring_offsets(ring):
+                cell_x = cx[active] + dx
+                cell_z = cz[active] + dz
+                inside = (cell_x >= 0) & (cell_x < self.shape[0]) & (cell_z >= 0) & (cell_z < self.shape[1])
+                cells = cell_x[inside] * self.shape[1] + cell_z[inside]
+                self.closest_in_cells(x, z, active[inside], cells, segment, distance)
+            bound = self.unsearched_distance(x[active], z[active], cx[active], cz[active], ring)
+            active = active[distance[active] > bound]
+            ring += 1
+        return segment.reshape(shape), distance.reshape(shape)
+    
+    @staticmethod
+    def ring_offsets(ring):
+        # Cell offsets at Chebyshev distance `ring`
+        if ring == 0:
+            return [(0, 0)]
+        side = range(-ring, ring + 1)
+        return ([(dx, dz) for dx in (-ring, ring) for dz in side] +
+                [(dx, dz) for dz in (-ring, ring) for dx in range(-ring + 1, ring)])
+    
+    def unsearched_distance(self, x, z, cx, cz, ring):
+        # Lower bound on the distance from points to any segment not yet
+        # seen after searching `ring` rings around cells (cx, cz): the
+        # distance to the part of the grid outside the searched block (inf
+        # once the block covers the whole grid). Segments are binned into
+        # every cell they touch, so an unseen one lies entirely out there.
+        size = self.cell_size
+        grid_low = self.origin
+        grid_high = self.origin + self.shape * size
+        block_x0 = np.maximum(cx - ring, 0)
+        block_x1 = np.minimum(cx + ring + 1, self.shape[0])
+        block_z0 = np.maximum(cz - ring, 0)
+        block_z1 = np.minimum(cz + ring + 1, self.shape[1])
+        
+        def to_box(exists, x0, x1, z0, z1):
+            # Distance to the box [x0, x1] x [z0, z1], inf where it is empty
+            distance = np.hypot(np.maximum(np.maximum(x0 - x, x - x1), 0.0),
+                                np.maximum(np.maximum(z0 - z, z - z1), 0.0))
+            return np.where(exists, distance, np.inf)
+        
+        # Strips of the grid left, right, below and above the block
+        x0 = grid_low[0] + block_x0 * size
+        x1 = grid_low[0] + block_x1 * size
+        z0 = grid_low[1] + block_z0 * size
+        z1 = grid_low[1] + block_z1 * size
+        return np.minimum.reduce([
+            to_box(block_x0 > 0, grid_low[0], x0, grid_low[1], grid_high[1]),
+            to_box(block_x1 < self.shape[0], x1, grid_high[0], grid_low[1], grid_high[1]),
+            to_box(block_z0 > 0, grid_low[0], grid_high[0], grid_low[1], z0),
+            to_box(block_z1 < self.shape[1], grid_low[0], grid_high[0], z1, grid_high[1]),
+        ])
+    
+    def closest_in_cell(self, x, z, cell, best, best_distance):
+        # Closest of the current best and one cell's segments to one point
+        for k in range(self.cell_start[cell], self.cell_start[cell + 1]):
+            segment = self.cell_segments[k]
+            x1, z1, x2, z2 = self.segment_list[segment]
+            distance = self.segment_distance(x, z, x1, z1, x2, z2)
+            if distance < best_distance:
+                best, best_distance = int(segment), distance
+        return best, best_distance
+    
+    def closest_in_cells(self, x, z, points, cells, segment, distance):
+        # Vectorized closest_in_cell: updates segment and distance in place
+        # for `points`, each against the segments of its cell in `cells`
+        start = self.cell_start[cells]
+        counts = self.cell_start[cells + 1] - start
+        if not counts.sum():
+            return
+        
+        # Expand to one row per (point, candidate segment) and test them all
+        pair_point = np.repeat(points, counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        pair_segment = self.cell_segments[np.repeat(start, counts) + offset]
+        pair_distance = self.segment_distances(x[pair_point], z[pair_point], pair_segment)
+        
+        # Keep the closest candidate of every point, if closer than before
+        order = np.lexsort((pair_distance, pair_point))
+        closest_point, first = np.unique(pair_point[order], return_index=True)
+        closest_distance = pair_distance[order][first]
+        closer = closest_distance < distance[closest_point]
+        segment[closest_point[closer]] = pair_segment[order][first][closer]
+        distance[closest_point[closer]] = closest_distance[closer]
+    
+    def segment_distances(self, x, z, segments):
+        # Point to segment distance, same as Road.point_to_segment_distance
+        start = self.starts[segments]
+        delta = self.ends[segments] - start
+        len_sq = (delta ** 2).sum(axis=1)
+        dot = (x - start[:, 0]) * delta[:, 0] + (z - start[:, 1]) * delta[:, 1]
+        param = np.clip(np.divide(dot, len_sq, out=np.zeros_like(dot), where=len_sq > 0), 0.0, 1.0)
+        return np.hypot(x - (start[:, 0] + param * delta[:, 0]), z - (start[:, 1] + param * delta[:, 1]))
+    
+    @staticmethod
+    def segment_distance(x, z, x1, z1, x2, z2):
+        dx = x2 - x1
+        dz = z2 - z1
+        len_sq = dx * dx + dz * dz
+        param = 0.0
+        if len_sq > 0:
+            param = min(1.0, max(0.0, ((x - x1) * dx + (z - z1) * dz) / len_sq))
+        return math.hypot(x - (x1 + param * dx), z - (z1 + param * dz))
@@ -0,0 +1,62 @@
+from OpenGL.GL import *
+import ctypes
+
+# GL side of the road network: one vertex buffer per resident chunk with
+# that chunk's road pieces, built by Road.build_chunk_mesh.
+class RoadRenderer:
+    def __init__(self, world):
+        self.world = world
+        self.road = world.road
+        self.chunk_buffers = {}  # chunk key -> (vertex buffer, surface count, marking count)
+    
+    def upload_chunk(self, key, mesh):
+        # Main thread only
+        self.release_chunk(key)
+        if mesh is None:
+            return
+        data, surface_count, marking_count = mesh
+        vertex_buffer = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, vertex_buffer)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.chunk_buffers[key] = (vertex_buffer, surface_count, marking_count)
+    
+    def release_chunk(self, key):
+        buffers = self.chunk_buffers.pop(key, None)
+        if buffers is not None:
+            glDeleteBuffers(1, [buffers[0]])
+    
+    def rebuild_chunks(self):
+        # Regenerate the road mesh of every resident chunk
+        for key, heights in list(self.world.terrain.heightmaps.items()):
+            self.upload_chunk(key, self.road.build_chunk_mesh(key, heights))
+        self.road.needs_rebuild = False
+    
+    def draw(self, chunk_keys=None):
+        # Draw the road pieces of the given chunks (all resident when None)
+        if self.road.needs_rebuild:
+            self.rebuild_chunks()
+        if chunk_keys is None:
+            chunk_keys = list(self.chunk_buffers)
+        
+        stride = 9 * 4  # position, normal, color as float32
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        for key in chunk_keys:
+            buffers = self.chunk_buffers.get(key)
+            if buffers is None:
+                continue
+            vertex_buffer, surface_count, marking_count = buffers
+            glBindBuffer(GL_ARRAY_BUFFER, vertex_buffer)
+            glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(0))
+            glNormalPointer(GL_FLOAT, stride, ctypes.c_void_p(12))
+            glColorPointer(3, GL_FLOAT, stride, ctypes.c_void_p(24))
+            
+            glDrawArrays(GL_TRIANGLES, 0, surface_count)
+            glDrawArrays(GL_LINES, surface_count, marking_count)
+        
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
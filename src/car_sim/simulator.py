@@ -3,12 +3,23 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import math
+import time
+from collections import deque
 from car_sim.car import Car
+from car_sim.vehicle_spec import VehicleSpec
+from car_sim.car_renderer import CarRenderer
 from car_sim.world import World
 from car_sim.camera import Camera
+from car_sim.physics_loop import CarPose, FixedTimestep, PhysicsThread
+from car_sim.rewind import StateHistory
+from car_sim.replay import IDLE_CONTROLS, InputLog, InputRecorder, Replay, drive
 
 class CarSimulator:
-    def __init__(self):
+    def __init__(self, seed=None, cache_dir=None, physics_rate=60.0, physics_thread=False, max_fps=0,
+                 vehicle='default', record=None, replay=None, playback_rate=1.0):
+        # `record`: input log to write; `replay`: input log to play back
+        # instead of driving (its seed, vehicle and rate replace the others)
+        # at `playback_rate` times real time
         pygame.init()
         pygame.font.init()  # Initialize font system
         display = (1024, 768)
@@ -28,8 +39,12 @@ class CarSimulator:
         glShadeModel(GL_SMOOTH)
         
         # Set up perspective with larger far plane
+        self.fov = 45
+        self.aspect = display[0] / display[1]
+        self.near_plane = 0.1
+        self.far_plane = 2000.0  # Increased far plane
         glMatrixMode(GL_PROJECTION)
-        gluPerspective(45, (display[0]/display[1]), 0.1, 2000.0)  # Increased far plane
+        gluPerspective(self.fov, self.aspect, self.near_plane, self.far_plane)
         
         # Set up better lighting
         glLightfv(GL_LIGHT0, GL_POSITION, (500.0, 500.0, 1000.0, 0.0))
@@ -40,20 +55,52 @@ class CarSimulator:
         glLightModelfv(GL_LIGHT_MODEL_AMBIENT, (0.2, 0.2, 0.2, 1.0))
         
         self.clock = pygame.time.Clock()
+        self.max_fps = max_fps  # 0 draws as fast as the GPU allows
         self.running = True
         
-        # Initialize world first
-        self.world = World()
-        
-        # Get initial terrain height for car spawn
-        spawn_x, spawn_y = 0, 0  # Spawn coordinates
-        terrain_height = self.world.get_height_at(spawn_x, spawn_y)
+        self.replay = None
+        if replay is not None:
+            log = InputLog(replay)
+            seed = log.seed
+            physics_rate = 1.0 / log.dt
         
-        # Initialize car with world reference and correct height
-        self.car = Car(x=spawn_x, y=spawn_y, z=terrain_height + 1.0, world=self.world)
+        # Initialize world first
+        self.world = World(seed=seed, cache_dir=cache_dir)
         
-        # Initialize camera with car reference
-        self.camera = Camera(self.car)
+        if replay is not None:
+            # The car starts where the recording did and follows the log
+            self.replay = Replay(log, self.world)
+            self.car = self.replay.car
+            self.history = self.replay.history
+        else:
+            # Get initial terrain height for car spawn
+            spawn_x, spawn_y = 0, 0  # Spawn coordinates
+            terrain_height = self.world.get_height_at(spawn_x, spawn_y)
+            
+            # Initialize car with world reference and correct height
+            self.car = Car(x=spawn_x, y=spawn_y, z=terrain_height + 1.0, world=self.world,
+                           spec=VehicleSpec.load(vehicle))
+            self.history = StateHistory(self.car, seconds=180, rate=physics_rate)  # Last three minutes
+        
+        # Physics runs at a fixed rate, on this thread between frames or on
+        # its own; frames draw the car at a pose interpolated between the
+        # last two physics steps
+        self.controls = dict(IDLE_CONTROLS)
+        self.shift_requests = deque()  # +1 / -1 per gear shift, applied by the next step
+        self.physics_thread = physics_thread
+        loop = PhysicsThread if physics_thread else FixedTimestep
+        self.physics = loop(self.car, self.physics_step, rate=physics_rate,
+                            max_substeps=max(8, math.ceil(8 * playback_rate)), speed=playback_rate)
+        
+        # Every step's inputs go to the log, from the car's starting state on
+        self.recorder = None
+        if record is not None:
+            self.recorder = InputRecorder(record, self.world, self.car, self.physics.dt, self.history)
+        self.pose = CarPose(self.car)
+        self.car_renderer = CarRenderer(self.car, self.pose)
+        
+        # Initialize camera with the drawn pose and the projection used above
+        self.camera = Camera(self.pose, self.fov, self.aspect, self.near_plane, self.far_plane)
         
         # Add key press tracking
         self.last_gear_shift_time = 0
@@ -67,45 +114,53 @@ class CarSimulator:
         keys = pygame.key.get_pressed()
         current_time = pygame.time.get_ticks() / 1000.0  # Convert to seconds
         
-        # Steering
+        # Controls are read once per frame and applied by every physics step
+        # until the next frame. A new dict each time, so a physics thread
+        # never sees one half updated.
+        steering = 0
         if keys[pygame.K_LEFT]:
-            self.car.apply_steering(-1)
+            steering = -1
         elif keys[pygame.K_RIGHT]:
-            self.car.apply_steering(1)
-        else:
-            self.car.apply_steering(0)
-            
-        # Throttle and brake
-        if keys[pygame.K_UP]:
-            self.car.apply_throttle(1)
-        else:
-            self.car.apply_throttle(0)
-        
-        if keys[pygame.K_DOWN]:
-            self.car.apply_brake(1)
-        else:
-            self.car.apply_brake(0)
-        
-        # Add handbrake control
-        if keys[pygame.K_SPACE]:
-            self.car.apply_handbrake(1)
-        else:
-            self.car.apply_handbrake(0)
+            steering = 1
+        self.controls = {
+            'throttle': 1 if keys[pygame.K_UP] else 0,
+            'brake': 1 if keys[pygame.K_DOWN] else 0,
+            'steering': steering,
+            'handbrake': 1 if keys[pygame.K_SPACE] else 0,
+            'rewind': bool(keys[pygame.K_BACKSPACE]),
+        }
             
-        # Gear shifting with cooldown and key press detection
+        # Gear shifting with cooldown and key press detection; the shift
+        # itself happens on the next physics step
         if current_time - self.last_gear_shift_time >= self.gear_shift_cooldown:
             # Check for new key presses
             if keys[pygame.K_a] and not self.key_states[pygame.K_a]:  # Shift down
-                if self.car.shift_down():  # Only shift if the method returns True
-                    self.last_gear_shift_time = current_time
+                self.shift_requests.append(-1)
+                self.last_gear_shift_time = current_time
             elif keys[pygame.K_d] and not self.key_states[pygame.K_d]:  # Shift up
-                if self.car.shift_up():    # Only shift if the method returns True
-                    self.last_gear_shift_time = current_time
+                self.shift_requests.append(1)
+                self.last_gear_shift_time = current_time
         
         # Update key states
         self.key_states[pygame.K_a] = keys[pygame.K_a]
         self.key_states[pygame.K_d] = keys[pygame.K_d]
             
+    def physics_step(self, dt):
+        # One fixed step: latest controls and pending shifts, then the car.
+        # While rewinding, each step goes back one recorded step instead.
+        # Ground that is still generating comes from the noise fallback;
+        # physics never waits for it.
+        if self.replay is not None:
+            self.replay.step()
+            return
+        controls = self.controls
+        shifts = []
+        while self.shift_requests:
+            shifts.append(self.shift_requests.popleft())
+        if self.recorder is not None:
+            self.recorder.record(controls, shifts)
+        drive(self.car, controls, shifts, dt, self.history)
+    
     def render(self):
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glMatrixMode(GL_MODELVIEW)
@@ -115,8 +170,8 @@ class CarSimulator:
         self.camera.update()
         
         # Draw world and car
-        self.world.draw()
-        self.car.draw()
+        self.world.draw(self.camera.frustum)
+        self.car_renderer.draw()
         
         # Switch to 2D mode for HUD
         glMatrixMode(GL_PROJECTION)
@@ -221,18 +276,36 @@ class CarSimulator:
         glEnd()
             
     def run(self):
+        self.physics.start()
+        last_time = time.perf_counter()
         while self.running:
-            dt = 1/60  # Fixed time step
-            
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
                     
-            self.handle_input()
-            self.car.update(dt)  # Pass the time step to update
+            if self.replay is None:
+                self.handle_input()
+            
+            # Physics catches up with real time (on its own thread it
+            # already has), then the frame shows the interpolated pose
+            now = time.perf_counter()
+            if isinstance(self.physics, FixedTimestep):
+                self.physics.advance(now - last_time)
+            last_time = now
+            self.physics.interpolated_pose(self.pose)
+            
+            self.world.update((self.pose.x, self.pose.y))  # Stream chunks around the car
             self.render()
             
-            # Limit frame rate
-            self.clock.tick(60)
+            # Optional frame cap
+            self.clock.tick(self.max_fps)
             
+        self.physics.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.replay is not None:
+            matches = self.replay.matches_recording()
+            if self.replay.finished and matches is not None:
+                print("Replay", "matches" if matches else "differs from", "the recording")
+        self.world.shutdown()
         pygame.quit()
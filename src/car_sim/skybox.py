@@ -1,6 +1,5 @@
 from OpenGL.GL import *
 import numpy as np
-from PIL import Image
 import math
 
 class Skybox:
@@ -0,0 +1,207 @@
+import argparse
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from car_sim.car import Car
+from car_sim.vehicle_spec import VehicleSpec
+from car_sim.world import World
+
+# Parameter sweeps over a vehicle's constants (see VehicleSpec). Every
+# combination of a parameter grid drives the same scripted inputs on a headless world; the
+# runs are spread over a process pool whose workers each build the world
+# once from the shared seed. Per-run metrics end up in one columnar .npz
+# file, one array per parameter and metric, row i being run i.
+#
+# A script is a list of (time, controls) steps; each step's controls stay
+# in effect until a later step changes them. Controls are 'throttle',
+# 'brake', 'steering' and 'handbrake' (as for Car.apply_*) and 'auto_shift':
+# shift up at the car's optimal_shift_rpm and down at its downshift_rpm.
+SCRIPTS = {
+    # Full throttle from standstill through the gears
+    'launch': [(0.0, {'throttle': 1.0, 'auto_shift': True})],
+    # Up to speed, then full braking
+    'launch_and_brake': [(0.0, {'throttle': 1.0, 'auto_shift': True}),
+                         (15.0, {'throttle': 0.0, 'brake': 1.0})],
+    # Handbrake turn out of a straight run
+    'drift': [(0.0, {'throttle': 1.0, 'auto_shift': True}),
+              (8.0, {'steering': 1.0, 'handbrake': 1.0}),
+              (10.0, {'steering': 0.0, 'handbrake': 0.0})],
+}
+
+# Default lap: waypoints relative to the spawn point, driven in order and
+# back to the start. While a course is set, steering follows it and the
+# script's steering is ignored.
+COURSE = [(150.0, 0.0), (150.0, 150.0), (0.0, 150.0), (0.0, 0.0)]
+WAYPOINT_RADIUS = 15.0
+
+_world = None  # The worker process's world, built once by _init_worker
+
+
+def expand_grid(grid):
+    # Runs of a grid: a dict of parameter -> list of values gives every
+    # combination, a list of dicts gives exactly those runs
+    if isinstance(grid, dict):
+        names = list(grid)
+        return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    return [dict(run) for run in grid]
+
+
+def _init_worker(seed):
+    global _world
+    # One generation thread per process; the pool already uses every core
+    _world = World(seed=seed, headless=True, generation_workers=1)
+
+
+def simulate(world, params, script, duration, dt=1/60, course=None, spawn=(0.0, 0.0), vehicle='default'):
+    # One run: a fresh car of `vehicle` with `params` applied to its spec,
+    # driven by `script` for `duration` seconds. Returns the run's metrics.
+    spec = VehicleSpec.load(vehicle).replace(**params)
+    spawn_x, spawn_y = spawn
+    car = Car(x=spawn_x, y=spawn_y, z=world.get_height_at(spawn_x, spawn_y) + 1.0, world=world, spec=spec)
+    world.update((car.x, car.y))
+
+    gears = spec.gear_count
+    top_speed_gear = np.zeros(gears)
+    time_0_100 = math.nan
+    lap_time = math.nan
+    distance = 0.0
+    waypoints = [(spawn_x + x, spawn_y + z) for x, z in course] if course else []
+    next_waypoint = 0
+
+    controls = {'throttle': 0.0, 'brake': 0.0, 'steering': 0.0, 'handbrake': 0.0, 'auto_shift': False}
+    steps = sorted(script, key=lambda step: step[0])
+    next_step = 0
+    for index in range(int(round(duration / dt))):
+        time = index * dt
+        while next_step < len(steps) and steps[next_step][0] <= time + 1e-9:
+            controls.update(steps[next_step][1])
+            next_step += 1
+
+        steering = controls['steering']
+        if next_waypoint < len(waypoints):
+            # Steer at the next waypoint; positive input turns clockwise
+            target_x, target_y = waypoints[next_waypoint]
+            heading = math.atan2(target_y - car.y, target_x - car.x)
+            error = (heading - car.angle + math.pi) % (2 * math.pi) - math.pi
+            steering = -max(-1.0, min(1.0, error * 2.0))
+
+        car.apply_throttle(controls['throttle'])
+        car.apply_brake(controls['brake'])
+        car.apply_steering(steering)
+        car.apply_handbrake(controls['handbrake'])
+        if controls['auto_shift']:
+            if car.current_rpm >= spec.optimal_shift_rpm:
+                car.shift_up()
+            elif car.current_rpm <= spec.downshift_rpm:
+                car.shift_down()
+
+        x, y = car.x, car.y
+        car.update(dt)
+        world.update((car.x, car.y))
+        distance += math.hypot(car.x - x, car.y - y)
+
+        speed_kmh = abs(car.velocity * 3.6)
+        gear = car.current_gear - 1
+        top_speed_gear[gear] = max(top_speed_gear[gear], speed_kmh)
+        if math.isnan(time_0_100) and speed_kmh >= 100.0:
+            time_0_100 = time + dt
+        if next_waypoint < len(waypoints):
+            target_x, target_y = waypoints[next_waypoint]
+            if math.hypot(car.x - target_x, car.y - target_y) < WAYPOINT_RADIUS:
+                next_waypoint += 1
+                if next_waypoint == len(waypoints):
+                    lap_time = time + dt
+
+    return {
+        'time_0_100': time_0_100,
+        'top_speed': float(top_speed_gear.max()),
+        'top_speed_gear': top_speed_gear,
+        'lap_time': lap_time,
+        'distance': distance,
+        'final_speed': abs(car.velocity * 3.6),
+    }
+
+
+def _run(job):
+    params, script, duration, dt, course, vehicle = job
+    return simulate(_world, params, script, duration, dt, course, vehicle=vehicle)
+
+
+def collect_columns(runs, results):
+    # One array per parameter and metric. Per-gear values and list-valued
+    # parameters become 2D arrays, padded with NaN where runs differ in
+    # length.
+    def column(values):
+        if all(np.ndim(v) == 0 for v in values):
+            return np.array(values)
+        width = max(len(v) for v in values)
+        array = np.full((len(values), width), np.nan)
+        for row, v in enumerate(values):
+            array[row, :len(v)] = v
+        return array
+
+    columns = {'run': np.arange(len(runs))}
+    for name in dict.fromkeys(name for run in runs for name in run):
+        columns[name] = column([run.get(name, np.nan) for run in runs])
+    for name in results[0] if results else []:
+        columns[name] = column([result[name] for result in results])
+    return columns
+
+
+def run_sweep(grid, script='launch', duration=30.0, dt=1/60, seed=0, course=None, workers=None, out=None,
+              vehicle='default'):
+    # Runs every point of `grid` (see expand_grid) on `vehicle` with
+    # `script` (a name from SCRIPTS or a step list) on `workers` processes
+    # (all cores when None). Returns the columns and writes them to `out`
+    # if given.
+    runs = expand_grid(grid)
+    if isinstance(script, str):
+        script = SCRIPTS[script]
+    if course is True:
+        course = COURSE
+    workers = workers or os.cpu_count() or 1
+
+    jobs = [(params, script, duration, dt, course, vehicle) for params in runs]
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(seed,)) as pool:
+        results = list(pool.map(_run, jobs, chunksize=chunksize))
+
+    columns = collect_columns(runs, results)
+    if out is not None:
+        np.savez_compressed(out, **columns)
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep car parameters over headless simulations")
+    parser.add_argument("grid",
+                        help="JSON file with a dict of parameter -> list of values, or a list of runs")
+    parser.add_argument("--out", default="sweep.npz", help="columnar result file")
+    parser.add_argument("--script", default="launch",
+                        help=f"input script: one of {', '.join(SCRIPTS)}, or a JSON file of (time, controls) steps")
+    parser.add_argument("--duration", type=float, default=30.0, help="simulated seconds per run")
+    parser.add_argument("--rate", type=float, default=60.0, help="physics steps per second")
+    parser.add_argument("--seed", type=int, default=0, help="world seed shared by all runs")
+    parser.add_argument("--vehicle", default="default",
+                        help="vehicle the parameters apply to: a packaged name or a vehicle JSON file")
+    parser.add_argument("--lap", action="store_true", help="drive the default course and time the lap")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    args = parser.parse_args()
+
+    with open(args.grid) as f:
+        grid = json.load(f)
+    script = args.script
+    if script not in SCRIPTS:
+        with open(script) as f:
+            script = json.load(f)
+
+    columns = run_sweep(grid, script, args.duration, 1 / args.rate, args.seed,
+                        course=args.lap, workers=args.workers, out=args.out, vehicle=args.vehicle)
+    print(f"{len(columns['run'])} runs written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,4 @@
 import numpy as np
-from OpenGL.GL import *
-from PIL import Image
 import random
 import math
 
@@ -14,18 +12,31 @@ class Terrain:
         self.biome_scale = 200.0
         self.base_height = 0.0
         
-        # Optimization
-        self.display_lists = {}
-        self.vertex_buffers = {}
+        # Chunk data (meshes and GL buffers live in TerrainRenderer)
+        self.heightmaps = {}  # Generated height grid per chunk, for height queries
+        self.height_ranges = {}  # (min, max) height per chunk, for bounding boxes
         
         self.size = world.size
         # Make resolution an integer
         self.resolution = 25  # Fixed resolution per chunk
         self.scale = world.chunk_size / float(self.resolution)
         
-        # Terrain generation seeds
-        self.seed1 = random.randint(0, 10000)
-        self.seed2 = random.randint(0, 10000)
+        # Level of detail: quads per chunk side, full resolution first. Every
+        # level's grid is generated; TerrainRenderer picks which one to draw.
+        self.lod_resolutions = [self.resolution, 12, 6, 3]
+        
+        # Terrain generation seeds, derived from the world seed so a world
+        # can be recreated (and its cached chunks reused)
+        rng = random.Random(world.seed)
+        self.seed1 = rng.randint(0, 10000)
+        self.seed2 = rng.randint(0, 10000)
+        
+        # Lookup tables for vectorized generation (biome index -> properties)
+        self.biomes = list(world.terrain_types)
+        self.biome_height_mods = np.array(
+            [world.terrain_types[b]['height_mod'] for b in self.biomes])
+        self.biome_colors = np.array(
+            [world.terrain_types[b]['color'] for b in self.biomes])
     
     def improved_noise(self, x, y, seed):
         # Simple but effective noise function
@@ -56,6 +67,30 @@ class Terrain:
         value = a * (1 - u) * (1 - v) + b * u * (1 - v) + c * (1 - u) * v + d * u * v
         return value
 
+    def improved_noise_array(self, x, y, seed):
+        # Vectorized improved_noise; same operations in the same order so
+        # the result matches the scalar version bit for bit
+        x = x * 0.1 + seed
+        y = y * 0.1 + seed
+        
+        x_int = np.trunc(x)
+        y_int = np.trunc(y)
+        x_frac = x - x_int
+        y_frac = y - y_int
+        
+        u = x_frac * x_frac * (3 - 2 * x_frac)
+        v = y_frac * y_frac * (3 - 2 * y_frac)
+        
+        def get_random(a, b):
+            return np.mod(np.sin(a * 12.9898 + b * 78.233) * 43758.5453123, 1.0)
+        
+        a = get_random(x_int, y_int)
+        b = get_random(x_int + 1, y_int)
+        c = get_random(x_int, y_int + 1)
+        d = get_random(x_int + 1, y_int + 1)
+        
+        return a * (1 - u) * (1 - v) + b * u * (1 - v) + c * (1 - u) * v + d * u * v
+
     def get_biome(self, x, z):
         # Determine biome based on height and position
         value = self.improved_noise(x * 0.005, z * 0.005, self.seed2)
@@ -72,97 +107,158 @@ class Terrain:
         else:
             return 'DESERT'
 
-    def generate_chunk(self, chunk_x, chunk_z):
-        vertices = []
-        colors = []
-        normals = []
-        
-        # Generate terrain with multiple frequencies
-        for x in range(self.resolution + 1):
-            for z in range(self.resolution + 1):
-                # Calculate world position for noise
-                world_x = chunk_x + x * (self.world.chunk_size / self.resolution)
-                world_z = chunk_z + z * (self.world.chunk_size / self.resolution)
-                
-                # Generate height using multiple frequencies
-                height = (
-                    self.improved_noise(world_x * 0.02, world_z * 0.02, self.seed1) * 1.0 +
-                    self.improved_noise(world_x * 0.04, world_z * 0.04, self.seed1) * 0.5 +
-                    self.improved_noise(world_x * 0.08, world_z * 0.08, self.seed1) * 0.25
-                ) * self.height_scale
-                
-                # Get biome and adjust height
-                biome = self.get_biome(world_x, world_z)
-                height *= self.world.terrain_types[biome]['height_mod']
-                color = self.world.terrain_types[biome]['color']
-                
-                # Use local coordinates for vertices
-                local_x = x * (self.world.chunk_size / self.resolution)
-                local_z = z * (self.world.chunk_size / self.resolution)
-                
-                vertices.append((local_x, local_z, height))
-                colors.append(color)
-                
-                # Calculate normal
-                if x > 0 and z > 0:
-                    prev_x = vertices[-2][2] - height
-                    prev_z = vertices[-self.resolution-1][2] - height
-                    normal = (prev_x, 1.0, prev_z)  # Changed normal calculation
-                    length = math.sqrt(normal[0]**2 + normal[1]**2 + normal[2]**2)
-                    normals.append((normal[0]/length, normal[1]/length, normal[2]/length))
-                else:
-                    normals.append((0, 1, 0))
-        
-        return self.create_optimized_mesh(vertices, colors, normals)
-
-    def create_optimized_mesh(self, vertices, colors, normals):
-        display_list = glGenLists(1)
-        glNewList(display_list, GL_COMPILE)
-        
-        glBegin(GL_TRIANGLES)
-        for i in range(self.resolution):
-            for j in range(self.resolution):
-                idx = i * (self.resolution + 1) + j
-                
-                # Calculate indices for the two triangles
-                v1 = idx
-                v2 = idx + 1
-                v3 = idx + self.resolution + 1
-                v4 = idx + self.resolution + 2
-                
-                # First triangle
-                glNormal3fv(normals[v1])
-                glColor3fv(colors[v1])
-                glVertex3fv(vertices[v1])
-                
-                glNormal3fv(normals[v2])
-                glColor3fv(colors[v2])
-                glVertex3fv(vertices[v2])
-                
-                glNormal3fv(normals[v3])
-                glColor3fv(colors[v3])
-                glVertex3fv(vertices[v3])
-                
-                # Second triangle
-                glNormal3fv(normals[v2])
-                glColor3fv(colors[v2])
-                glVertex3fv(vertices[v2])
-                
-                glNormal3fv(normals[v4])
-                glColor3fv(colors[v4])
-                glVertex3fv(vertices[v4])
-                
-                glNormal3fv(normals[v3])
-                glColor3fv(colors[v3])
-                glVertex3fv(vertices[v3])
+    def get_biome_indices(self, x, z):
+        # Vectorized get_biome; returns indices into self.biomes
+        value = self.improved_noise_array(x * 0.005, z * 0.005, self.seed2)
+        height = self.improved_noise_array(x * 0.02, z * 0.02, self.seed1)
+        return self._classify_biomes(height, value)
+
+    def _classify_biomes(self, height, value):
+        # Same decision tree as get_biome, evaluated over whole arrays
+        index = {name: i for i, name in enumerate(self.biomes)}
+        conditions = [
+            height > 0.7,
+            (height > 0.6) & (value > 0.6),
+            height > 0.6,
+            (height > 0.4) & (value > 0.5),
+            height > 0.2,
+        ]
+        choices = [
+            index['MOUNTAIN'],
+            index['SNOW'],
+            index['FOREST'],
+            index['FOREST'],
+            index['GRASS'],
+        ]
+        return np.select(conditions, choices, index['DESERT']).astype(np.uint8)
+
+    def sample_points(self, world_x, world_z):
+        # Noise heights and biomes at arbitrary world positions (arrays)
+        base = self.improved_noise_array(world_x * 0.02, world_z * 0.02, self.seed1)
+        heights = (
+            base * 1.0 +
+            self.improved_noise_array(world_x * 0.04, world_z * 0.04, self.seed1) * 0.5 +
+            self.improved_noise_array(world_x * 0.08, world_z * 0.08, self.seed1) * 0.25
+        ) * self.height_scale
+        
+        # The first octave doubles as the biome height noise
+        value = self.improved_noise_array(world_x * 0.005, world_z * 0.005, self.seed2)
+        biomes = self._classify_biomes(base, value)
+        heights *= self.biome_height_mods[biomes]
+        return heights, biomes
+
+    def sample_chunk(self, chunk_x, chunk_z, resolution):
+        # Noise part of chunk generation: height and biome grids, indexed
+        # [x, z] and flattened in the same x-major vertex order the mesh uses
+        step = self.world.chunk_size / resolution
+        offsets = np.arange(resolution + 1) * step
+        world_x, world_z = np.meshgrid(chunk_x + offsets, chunk_z + offsets, indexing='ij')
+        return self.sample_points(world_x, world_z)
+
+    def shade_chunk(self, heights, biomes, resolution):
+        # Per-vertex colors and normals derived from the grids
+        colors = self.biome_colors[biomes].reshape(-1, 3)
         
-        glEnd()
-        glEndList()
+        # Normals keep the original scheme: the vertex before in the same row
+        # and the vertex `resolution` places back in the flattened grid
+        flat = heights.ravel()
+        normals = np.zeros((flat.size, 3))
+        normals[:, 1] = 1.0
+        inner = np.zeros(heights.shape, dtype=bool)
+        inner[1:, 1:] = True
+        k = np.flatnonzero(inner)
+        prev_x = flat[k - 1] - flat[k]
+        prev_z = flat[k - resolution] - flat[k]
+        # float_power goes through libm pow() like the scalar ``**2`` did;
+        # plain squaring rounds differently in the last bit
+        length = np.sqrt(np.float_power(prev_x, 2) + 1.0 + np.float_power(prev_z, 2))
+        normals[k, 0] = prev_x / length
+        normals[k, 1] = 1.0 / length
+        normals[k, 2] = prev_z / length
+        return colors, normals
+
+    def sample_chunk_grids(self, chunk_x, chunk_z):
+        # (heights, biomes) for every LOD level; each samples the noise on its own grid
+        return [self.sample_chunk(chunk_x, chunk_z, resolution)
+                for resolution in self.lod_resolutions]
+
+    def build_chunk(self, chunk_x, chunk_z, grids=None, level=0):
+        # Everything a chunk needs except GL objects; safe to run on a worker
+        # thread. Pass `grids` (e.g. from the disk cache) to skip the noise.
+        # Only the mesh of LOD `level` is built; the grids are kept so other
+        # levels can be built from them when the chunk changes level.
+        if grids is None:
+            grids = self.sample_chunk_grids(chunk_x, chunk_z)
+        return grids, self.build_level_mesh(grids, level)
+
+    def build_level_mesh(self, grids, level):
+        # Interleaved vertex data of one LOD level from the chunk's grids
+        heights, biomes = grids[level]
+        resolution = self.lod_resolutions[level]
+        colors, normals = self.shade_chunk(heights, biomes, resolution)
+        return self.build_mesh_data(heights, colors, normals, resolution)
+
+    def build_mesh_data(self, heights, colors, normals, resolution):
+        # Use local coordinates for vertices
+        offsets = np.arange(resolution + 1) * (self.world.chunk_size / resolution)
+        local_x, local_z = np.meshgrid(offsets, offsets, indexing='ij')
+        vertices = np.stack([local_x.ravel(), local_z.ravel(), heights.ravel()], axis=1)
+        
+        # Skirt: the chunk's rim repeated below the surface. Where a neighbour
+        # is drawn at another LOD level the edges don't line up exactly, and
+        # the skirt fills the gap. No LOD deviates from the surface by more
+        # than the chunk's own height range.
+        rim = self.rim_indices(resolution)
+        skirt = vertices[rim].copy()
+        skirt[:, 2] -= heights.max() - heights.min() + 1.0
+        vertices = np.vstack([vertices, skirt])
+        normals = np.vstack([normals, normals[rim]])
+        colors = np.vstack([colors, colors[rim]])
         
-        return display_list
+        # Interleave position/normal/color per vertex, ready for upload
+        return np.hstack([vertices, normals, colors]).astype(np.float32)
+
+    def add_chunk(self, key, heights):
+        # Make a generated chunk queryable
+        self.heightmaps[key] = heights
+        self.height_ranges[key] = (float(heights.min()), float(heights.max()))
 
-    def draw(self):
-        glCallList(self.display_list)
+    def release_chunk(self, key):
+        self.heightmaps.pop(key, None)
+        self.height_ranges.pop(key, None)
+
+    def rim_indices(self, resolution):
+        # Grid vertices around the chunk border, in order, as one closed loop
+        row = resolution + 1
+        steps = np.arange(resolution)
+        last = resolution
+        return np.concatenate([
+            steps,                          # x = 0 edge
+            steps * row + last,             # z = last edge
+            last * row + (last - steps),    # x = last edge, backwards
+            (last - steps) * row,           # z = 0 edge, backwards
+        ])
+
+    def create_grid_indices(self, resolution=None):
+        # Two triangles per grid cell, same winding as the original mesh
+        if resolution is None:
+            resolution = self.resolution
+        row = resolution + 1
+        i, j = np.meshgrid(np.arange(resolution), np.arange(resolution), indexing='ij')
+        v1 = (i * row + j).ravel()
+        v2 = v1 + 1
+        v3 = v1 + row
+        v4 = v1 + row + 1
+        return np.stack([v1, v2, v3, v2, v4, v3], axis=1).ravel().astype(np.uint16)
+
+    def create_skirt_indices(self, resolution):
+        # Two triangles joining each rim edge to its copy below the surface
+        rim = self.rim_indices(resolution)
+        skirt = (resolution + 1) ** 2 + np.arange(rim.size)
+        rim_next = np.roll(rim, -1)
+        skirt_next = np.roll(skirt, -1)
+        return np.stack([rim, rim_next, skirt, rim_next, skirt_next, skirt],
+                        axis=1).ravel().astype(np.uint16)
 
     def generate_height_map(self):
         heights = np.zeros((self.resolution, self.resolution))
@@ -187,49 +283,68 @@ class Terrain:
                 
         return heights
     
-    def create_display_list(self):
-        display_list = glGenLists(1)
-        glNewList(display_list, GL_COMPILE)
-        
-        # Draw ground
-        glBegin(GL_TRIANGLES)
-        
-        # Step size for reduced vertex count
-        step = 2
-        for y in range(0, self.resolution - 1, step):
-            for x in range(0, self.resolution - 1, step):
-                # Calculate positions
-                x1 = (x - self.resolution/2) * self.scale
-                x2 = ((x + step) - self.resolution/2) * self.scale
-                y1 = (y - self.resolution/2) * self.scale
-                y2 = ((y + step) - self.resolution/2) * self.scale
-                
-                h11 = self.heights[y, x]
-                h21 = self.heights[y, min(x + step, self.resolution-1)]
-                h12 = self.heights[min(y + step, self.resolution-1), x]
-                h22 = self.heights[min(y + step, self.resolution-1), min(x + step, self.resolution-1)]
-                
-                # Set color based on position from center
-                dist = math.sqrt(x*x + y*y) / self.resolution
-                if dist < 0.3:
-                    glColor3f(0.2, 0.6, 0.1)  # Darker green for center
-                else:
-                    glColor3f(0.3, 0.7, 0.2)  # Lighter green for outskirts
-                
-                # First triangle
-                glVertex3f(x1, y1, h11)
-                glVertex3f(x2, y1, h21)
-                glVertex3f(x1, y2, h12)
-                
-                # Second triangle
-                glVertex3f(x2, y1, h21)
-                glVertex3f(x2, y2, h22)
-                glVertex3f(x1, y2, h12)
-                
-        glEnd()
-        glEndList()
+    def sample_heightmap(self, heights, local_x, local_z):
+        # Bilinear interpolation inside a chunk's height grid
+        fx = local_x / self.scale
+        fz = local_z / self.scale
+        i = min(max(int(fx), 0), self.resolution - 1)
+        j = min(max(int(fz), 0), self.resolution - 1)
+        tx = fx - i
+        tz = fz - j
+        
+        # item() keeps the arithmetic in plain Python floats
+        h00 = heights.item(i, j)
+        h10 = heights.item(i + 1, j)
+        h01 = heights.item(i, j + 1)
+        h11 = heights.item(i + 1, j + 1)
+        return (h00 * (1 - tx) + h10 * tx) * (1 - tz) + (h01 * (1 - tx) + h11 * tx) * tz
+
+    def sample_heightmap_gradient(self, heights, local_x, local_z):
+        # Height plus its x/z derivatives, taken exactly from the bilinear patch
+        fx = local_x / self.scale
+        fz = local_z / self.scale
+        i = min(max(int(fx), 0), self.resolution - 1)
+        j = min(max(int(fz), 0), self.resolution - 1)
+        tx = fx - i
+        tz = fz - j
         
-        return display_list 
+        h00 = heights.item(i, j)
+        h10 = heights.item(i + 1, j)
+        h01 = heights.item(i, j + 1)
+        h11 = heights.item(i + 1, j + 1)
+        height = (h00 * (1 - tx) + h10 * tx) * (1 - tz) + (h01 * (1 - tx) + h11 * tx) * tz
+        dh_dx = ((h10 - h00) * (1 - tz) + (h11 - h01) * tz) / self.scale
+        dh_dz = ((h01 - h00) * (1 - tx) + (h11 - h10) * tx) / self.scale
+        return height, dh_dx, dh_dz
+
+    def sample_heightmaps(self, stack, chunk_index, local_x, local_z):
+        # Vectorized sample_heightmap_gradient over many points. `stack` holds
+        # height grids (N, res+1, res+1); each point names its grid.
+        fx = local_x / self.scale
+        fz = local_z / self.scale
+        i = np.clip(fx.astype(np.int64), 0, self.resolution - 1)
+        j = np.clip(fz.astype(np.int64), 0, self.resolution - 1)
+        tx = fx - i
+        tz = fz - j
+        
+        h00 = stack[chunk_index, i, j]
+        h10 = stack[chunk_index, i + 1, j]
+        h01 = stack[chunk_index, i, j + 1]
+        h11 = stack[chunk_index, i + 1, j + 1]
+        height = (h00 * (1 - tx) + h10 * tx) * (1 - tz) + (h01 * (1 - tx) + h11 * tx) * tz
+        dh_dx = ((h10 - h00) * (1 - tz) + (h11 - h01) * tz) / self.scale
+        dh_dz = ((h01 - h00) * (1 - tx) + (h11 - h10) * tx) / self.scale
+        return height, dh_dx, dh_dz
+
+    def sample_points_gradient(self, world_x, world_z, step=0.5):
+        # Noise height with central-difference slopes, for points whose chunk
+        # has no height grid yet
+        heights, _ = self.sample_points(world_x, world_z)
+        dh_dx = (self.sample_points(world_x + step, world_z)[0] -
+                 self.sample_points(world_x - step, world_z)[0]) / (2 * step)
+        dh_dz = (self.sample_points(world_x, world_z + step)[0] -
+                 self.sample_points(world_x, world_z - step)[0]) / (2 * step)
+        return heights, dh_dx, dh_dz
 
     def get_height_at(self, local_x, local_z, chunk_x, chunk_z):
         # Convert world coordinates to height calculation
@@ -0,0 +1,132 @@
+from OpenGL.GL import *
+import numpy as np
+import ctypes
+
+# GL side of the terrain: one interleaved vertex buffer per chunk, for the
+# LOD level the chunk is drawn at, index buffers shared by all chunks, and
+# the choice of LOD level. The first mesh comes from Terrain.build_chunk on
+# the generation workers; when a chunk changes level the new mesh is built
+# from its grids and replaces the old one.
+class TerrainRenderer:
+    def __init__(self, world):
+        self.world = world
+        self.terrain = world.terrain
+
+        self.vertex_buffers = {}  # Interleaved vertex buffer of the current LOD level, per chunk
+        self.chunk_grids = {}  # (heights, biomes) per LOD level, per chunk
+        self.index_buffers = None  # Grid topology per LOD level, shared by all chunks
+        self.index_counts = None
+
+        # A chunk moves to level i + 1 once it is farther than lod_distances[i]
+        # (plus/minus the hysteresis band, so it doesn't flicker on the edge).
+        self.lod_distances = [300.0, 700.0, 1300.0]
+        self.lod_hysteresis = 40.0
+        self.lod_rebuild_budget = 8  # Level changes built per frame; the rest wait a frame
+        self.chunk_lods = {}
+        self.lod_center = None
+
+    def initial_level(self, key):
+        # LOD level a new chunk starts at, from its distance to where the
+        # LODs were last updated (safe to call from the workers)
+        center = self.lod_center or self.world.focus_pos
+        size = self.world.chunk_size
+        distance = np.hypot((key[0] + 0.5) * size - center[0], (key[1] + 0.5) * size - center[1])
+        return int(np.searchsorted(self.lod_distances, distance))
+
+    def upload_chunk(self, key, grids, level, mesh_data):
+        # Main thread only; returns the bytes kept for the chunk
+        self.vertex_buffers[key] = self.create_optimized_mesh(mesh_data)
+        self.chunk_grids[key] = grids
+        self.chunk_lods[key] = level
+        # The full-resolution heights are counted with the chunk's data already
+        grid_bytes = sum(heights.nbytes + biomes.nbytes for heights, biomes in grids) - grids[0][0].nbytes
+        return mesh_data.nbytes + grid_bytes
+
+    def release_chunk(self, key):
+        vertex_buffer = self.vertex_buffers.pop(key, None)
+        if vertex_buffer is not None:
+            glDeleteBuffers(1, [vertex_buffer])
+        self.chunk_grids.pop(key, None)
+        self.chunk_lods.pop(key, None)
+
+    def change_level(self, key, level):
+        # Swap a chunk's mesh for another LOD level, freeing the old one
+        mesh_data = self.terrain.build_level_mesh(self.chunk_grids[key], level)
+        glDeleteBuffers(1, [self.vertex_buffers[key]])
+        self.vertex_buffers[key] = self.create_optimized_mesh(mesh_data)
+        self.chunk_lods[key] = level
+
+    def create_optimized_mesh(self, data):
+        # Shared vertices are stored a single time; triangles come from the
+        # index buffer every chunk shares.
+        vertex_buffer = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, vertex_buffer)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        if self.index_buffers is None:
+            self.create_index_buffers()
+
+        return vertex_buffer
+
+    def create_index_buffers(self):
+        self.index_buffers = []
+        self.index_counts = []
+        for resolution in self.terrain.lod_resolutions:
+            indices = np.concatenate([self.terrain.create_grid_indices(resolution),
+                                      self.terrain.create_skirt_indices(resolution)])
+            index_buffer = glGenBuffers(1)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, index_buffer)
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+            self.index_buffers.append(index_buffer)
+            self.index_counts.append(indices.size)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def update_lods(self, center_x, center_z):
+        # Pick each resident chunk's LOD level from its distance to the
+        # center. A chunk only goes coarser once past threshold + hysteresis
+        # and only finer once back inside threshold - hysteresis. Chunks
+        # whose level changes get their new mesh built here.
+        self.lod_center = (center_x, center_z)
+        keys = list(self.vertex_buffers)
+        if not keys:
+            return
+
+        size = self.world.chunk_size
+        centers = (np.array(keys, dtype=float) + 0.5) * size
+        distance = np.hypot(centers[:, 0] - center_x, centers[:, 1] - center_z)
+
+        thresholds = np.array(self.lod_distances)
+        coarsest = np.searchsorted(thresholds - self.lod_hysteresis, distance)
+        finest = np.searchsorted(thresholds + self.lod_hysteresis, distance)
+        current = np.array([self.chunk_lods[key] for key in keys])
+        levels = np.clip(current, finest, coarsest)
+
+        # Nearest chunks first, so the ones that matter most change first
+        changed = np.flatnonzero(levels != current)
+        changed = changed[np.argsort(distance[changed])][:self.lod_rebuild_budget]
+        for i in changed.tolist():
+            self.change_level(keys[i], int(levels[i]))
+
+    def begin_draw(self):
+        # Client state shared by all chunk draws in a frame
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+
+    def draw_chunk(self, key):
+        level = self.chunk_lods[key]
+        stride = 9 * 4  # position, normal, color as float32
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_buffers[key])
+        glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(0))
+        glNormalPointer(GL_FLOAT, stride, ctypes.c_void_p(12))
+        glColorPointer(3, GL_FLOAT, stride, ctypes.c_void_p(24))
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_buffers[level])
+        glDrawElements(GL_TRIANGLES, self.index_counts[level], GL_UNSIGNED_SHORT, None)
+
+    def end_draw(self):
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
@@ -1,18 +1,25 @@
-from OpenGL.GL import *
 import numpy as np
-import random
 import math
 
 class TreeSystem:
+    # One tree instance; 'height' is the ground height under the trunk,
+    # sampled when the chunk is generated
+    tree_dtype = np.dtype([('x', np.float32), ('z', np.float32), ('height', np.float32),
+                           ('scale', np.float32), ('type', np.uint8)])
+    
     def __init__(self, world):
         self.world = world
         self.tree_types = {
-            'PINE': {'height': 15, 'width': 5, 'color': (0.1, 0.4, 0.1)},
-            'OAK': {'height': 12, 'width': 8, 'color': (0.2, 0.5, 0.2)},
-            'PALM': {'height': 18, 'width': 6, 'color': (0.3, 0.6, 0.2)},
-            'CACTUS': {'height': 8, 'width': 3, 'color': (0.2, 0.5, 0.2)}
+            'PINE': {'height': 15, 'width': 5, 'color': (0.1, 0.4, 0.1), 'trunk_radius': 0.4},
+            'OAK': {'height': 12, 'width': 8, 'color': (0.2, 0.5, 0.2), 'trunk_radius': 0.6},
+            'PALM': {'height': 18, 'width': 6, 'color': (0.3, 0.6, 0.2), 'trunk_radius': 0.5},
+            'CACTUS': {'height': 8, 'width': 3, 'color': (0.2, 0.5, 0.2), 'trunk_radius': 0.5}
         }
         
+        # Trees are stored as structured arrays; 'type' indexes type_names
+        self.type_names = list(self.tree_types)
+        self.trunk_radii = np.array([self.tree_types[t]['trunk_radius'] for t in self.type_names])
+        
         # Vegetation density per biome
         self.density = {
             'GRASS': 0.3,
@@ -22,163 +29,452 @@ class TreeSystem:
             'SNOW': 0.1
         }
         
-        # Tree instances per chunk
+        # Tree types that grow in each biome, picked uniformly; OAK elsewhere
+        self.biome_tree_types = {
+            'FOREST': ['PINE', 'OAK'],
+            'DESERT': ['CACTUS'],
+            'SNOW': ['PINE']
+        }
+        
+        # Trees keep this far from the road edge
+        self.road_clearance = 2.0
+        
+        # Minimum distance between trees of a chunk (Poisson-disc style
+        # rejection); None places candidates independently
+        self.min_tree_spacing = None
+        
+        # Tree instances per chunk, keyed by integer chunk coordinates, as
+        # tree_dtype arrays. Use chunk_tree_array / gather_trees / iter_trees
+        # rather than the dict itself.
         self.chunk_trees = {}
         
-        # Display list for each tree type
-        self.tree_display_lists = self.create_tree_display_lists()
+        # How far the largest tree reaches above its base and sideways from
+        # its trunk (scale goes up to 1.2), for chunk bounding boxes
+        self.max_tree_height = max(t['height'] for t in self.tree_types.values()) * 1.2
+        self.max_tree_radius = max(t['width'] for t in self.tree_types.values()) * 1.2
+        
+        # Spatial hash over trunks for collision queries: each chunk's tree
+        # array is sorted by trunk_cell_size cells and chunk_trunk_cells holds
+        # where every cell's run starts (CSR offsets, row-major over x then z)
+        self.trunk_cell_size = 5.0
+        self.trunk_cells_per_side = max(1, int(round(world.chunk_size / self.trunk_cell_size)))
+        self.chunk_trunk_cells = {}
+        
+        # Triangle meshes for each tree type and mesh level, interleaved
+        # position/normal/color; level 0 is the full mesh, level 1 the
+        # reduced one drawn farther away
+        self.lod_segments = [8, 4]  # Mesh segments for the two mesh levels
+        self.tree_meshes = [self.create_tree_meshes(segments) for segments in self.lod_segments]
     
-    def create_tree_display_lists(self):
-        display_lists = {}
+    def create_tree_meshes(self, segments=8):
+        meshes = {}
         for tree_type, properties in self.tree_types.items():
-            display_list = glGenLists(1)
-            glNewList(display_list, GL_COMPILE)
-            
             height = properties['height']
             width = properties['width']
             color = properties['color']
             
-            # Draw trunk
-            glColor3f(0.4, 0.2, 0.0)
-            self.draw_cylinder(width * 0.2, height * 0.4)
+            # Trunk
+            trunk = self.cylinder_mesh(width * 0.2, height * 0.4, segments)
             
-            # Draw foliage
-            glColor3fv(color)
-            glTranslatef(0, 0, height * 0.4)
+            # Foliage, on top of the trunk
             if tree_type == 'PINE':
-                self.draw_cone(width, height * 0.6)
+                foliage = self.cone_mesh(width, height * 0.6, segments)
             elif tree_type == 'CACTUS':
-                self.draw_cylinder(width * 0.3, height * 0.6)
+                foliage = self.cylinder_mesh(width * 0.3, height * 0.6, segments)
             else:
-                self.draw_sphere(width * 0.5)
+                foliage = self.sphere_mesh(width * 0.5, segments)
+            foliage[:, 2] += height * 0.4
             
-            glEndList()
-            display_lists[tree_type] = display_list
-        
-        return display_lists
-    
-    def get_vegetation_type(self, biome):
-        if biome == 'FOREST':
-            return random.choice(['PINE', 'OAK'])
-        elif biome == 'DESERT':
-            return 'CACTUS'
-        elif biome == 'SNOW':
-            return 'PINE'
-        else:
-            return 'OAK'
+            meshes[tree_type] = np.vstack([
+                np.hstack([trunk, np.tile((0.4, 0.2, 0.0), (len(trunk), 1))]),
+                np.hstack([foliage, np.tile(color, (len(foliage), 1))]),
+            ]).astype(np.float32)
+        
+        return meshes
+    
+    def chunk_rng(self, key):
+        # Generator for one chunk, derived from the world seed and the chunk
+        # key only: the same trees whatever thread or order builds the chunk
+        return np.random.default_rng(
+            [self.world.seed & 0xFFFFFFFF, key[0] & 0xFFFFFFFF, key[1] & 0xFFFFFFFF])
     
-    def generate_chunk_vegetation(self, chunk_x, chunk_z, biome):
-        if (chunk_x, chunk_z) in self.chunk_trees:
-            return
+    def create_chunk_vegetation(self, chunk_x, chunk_z, biomes, road_distance=None):
+        # Trees for one chunk. `biomes` is the chunk's biome index grid (the
+        # terrain's level 0 grid) or a single biome name for the whole
+        # chunk. `road_distance` is the chunk's road distance raster (see
+        # Road.build_chunk_distance); candidates on or next to the road are
+        # dropped. Ground heights are left at zero for the caller to fill.
+        terrain = self.world.terrain
+        chunk_size = self.world.chunk_size
+        if isinstance(biomes, str):
+            biomes = np.full((2, 2), terrain.biomes.index(biomes), dtype=np.uint8)
+        rng = self.chunk_rng(self.world.chunk_store.chunk_key(chunk_x, chunk_z))
         
-        trees = []
-        density = self.density[biome]
+        # Candidates for the densest biome, all drawn at once
+        densities = np.array([self.density[b] for b in terrain.biomes])
+        num_candidates = int(chunk_size * chunk_size * densities.max() * 0.001)
+        local = rng.random((num_candidates, 2)) * chunk_size
+        thinning = rng.random(num_candidates)
+        type_choice = rng.random(num_candidates)
+        scales = rng.uniform(0.8, 1.2, num_candidates)
         
-        # Use deterministic random for consistent placement
-        random.seed(f"{chunk_x},{chunk_z}")
+        # Biome under each candidate from the nearest grid vertex, then thin
+        # the candidates down to that biome's density
+        cells = biomes.shape[0] - 1
+        i = np.rint(local[:, 0] / chunk_size * cells).astype(np.int64)
+        j = np.rint(local[:, 1] / chunk_size * cells).astype(np.int64)
+        candidate_biomes = biomes[i, j]
+        keep = thinning < densities[candidate_biomes] / densities.max()
         
-        # Generate vegetation based on biome
-        num_trees = int(self.world.chunk_size * self.world.chunk_size * density * 0.001)
-        for _ in range(num_trees):
-            x = chunk_x + random.random() * self.world.chunk_size
-            z = chunk_z + random.random() * self.world.chunk_size
-            
-            tree_type = self.get_vegetation_type(biome)
-            scale = random.uniform(0.8, 1.2)
-            trees.append((x, z, tree_type, scale))
-        
-        self.chunk_trees[(chunk_x, chunk_z)] = trees
-    
-    def draw(self):
-        glEnable(GL_LIGHTING)
-        for chunk_pos, trees in self.chunk_trees.items():
-            for x, z, tree_type, scale in trees:
-                # Get terrain height at tree position
-                height = self.world.get_height_at(x, z)
-                
-                glPushMatrix()
-                glTranslatef(x, z, height)  # Place tree on terrain
-                glScalef(scale, scale, scale)
-                glCallList(self.tree_display_lists[tree_type])
-                glPopMatrix()
-    
-    def draw_cylinder(self, radius, height, segments=8):
-        glBegin(GL_TRIANGLE_STRIP)
-        for i in range(segments + 1):
-            angle = 2 * math.pi * i / segments
-            x = radius * math.cos(angle)
-            y = radius * math.sin(angle)
-            glVertex3f(x, y, 0)
-            glVertex3f(x, y, height)
-        glEnd()
-    
-    def draw_cone(self, radius, height, segments=8):
-        glBegin(GL_TRIANGLE_FAN)
-        glVertex3f(0, 0, height)
-        for i in range(segments + 1):
-            angle = 2 * math.pi * i / segments
-            x = radius * math.cos(angle)
-            y = radius * math.sin(angle)
-            glVertex3f(x, y, 0)
-        glEnd()
-    
-    def draw_sphere(self, radius, segments=8):
-        for i in range(segments):
-            lat0 = math.pi * (-0.5 + float(i) / segments)
-            z0 = math.sin(lat0)
-            zr0 = math.cos(lat0)
-            
-            lat1 = math.pi * (-0.5 + float(i + 1) / segments)
-            z1 = math.sin(lat1)
-            zr1 = math.cos(lat1)
-            
-            glBegin(GL_TRIANGLE_STRIP)
-            for j in range(segments + 1):
-                lng = 2 * math.pi * float(j) / segments
-                x = math.cos(lng)
-                y = math.sin(lng)
+        if road_distance is not None:
+            distance = self.world.road.sample_chunk_distance(road_distance, local[:, 0], local[:, 1])
+            keep &= distance >= self.world.road.width / 2 + self.road_clearance
+        
+        if self.min_tree_spacing is not None:
+            keep &= self.spaced_out(local, keep, self.min_tree_spacing)
+        
+        # Tree type per candidate from its biome's choices
+        choices, counts = self.biome_type_table()
+        options = counts[candidate_biomes]
+        types = choices[candidate_biomes, (type_choice * options).astype(np.int64)]
+        
+        trees = np.zeros(int(keep.sum()), dtype=self.tree_dtype)
+        trees['x'] = chunk_x + local[keep, 0]
+        trees['z'] = chunk_z + local[keep, 1]
+        trees['scale'] = scales[keep]
+        trees['type'] = types[keep]
+        return trees
+    
+    def biome_type_table(self):
+        # (biome, choice) -> tree type index, plus the number of choices
+        # per biome, indexed like terrain.biomes
+        lists = [self.biome_tree_types.get(b, ['OAK']) for b in self.world.terrain.biomes]
+        choices = np.zeros((len(lists), max(len(l) for l in lists)), dtype=np.uint8)
+        for row, names in enumerate(lists):
+            choices[row, :len(names)] = [self.type_names.index(name) for name in names]
+        return choices, np.array([len(l) for l in lists])
+    
+    def spaced_out(self, points, candidates, spacing):
+        # Greedy dart throwing: walk the candidates in draw order and keep
+        # one only if no kept point is closer than `spacing`
+        delta = points[:, None, :] - points[None, :, :]
+        close = (delta ** 2).sum(axis=-1) < spacing * spacing
+        kept = np.zeros(len(points), dtype=bool)
+        for index in np.flatnonzero(candidates):
+            if not (close[index] & kept).any():
+                kept[index] = True
+        return kept
+    
+    def tree_ground_heights(self, trees, chunk_x, chunk_z, heights):
+        # Ground height under each tree from the chunk's own height grid
+        chunk_index = np.zeros(len(trees), dtype=np.int64)
+        return self.world.terrain.sample_heightmaps(
+            heights[None], chunk_index, trees['x'] - chunk_x, trees['z'] - chunk_z)[0]
+    
+    def build_trunk_hash(self, trees, chunk_x, chunk_z):
+        # Sort a chunk's trees by trunk cell; returns the sorted array and
+        # the cell offsets into it
+        n = self.trunk_cells_per_side
+        cell_size = self.world.chunk_size / n
+        ix = np.clip(((trees['x'] - chunk_x) / cell_size).astype(np.int64), 0, n - 1)
+        iz = np.clip(((trees['z'] - chunk_z) / cell_size).astype(np.int64), 0, n - 1)
+        cells = ix * n + iz
+        order = np.argsort(cells, kind='stable')
+        trunk_cells = np.searchsorted(cells[order], np.arange(n * n + 1)).astype(np.int32)
+        return trees[order], trunk_cells
+    
+    def build_chunk_batch(self, trees):
+        # Runs on a worker thread: every tree of the chunk scaled and moved
+        # into place, grouped by type, once per mesh level. Returns
+        # (vertex data, ranges) where ranges[level] lists (first vertex,
+        # vertex count) per type, or None.
+        if not len(trees):
+            return None
+        offsets = np.column_stack([trees['x'], trees['z'], trees['height']])
+        scales = trees['scale']
+        
+        parts = []
+        ranges = []
+        first = 0
+        for meshes in self.tree_meshes:
+            level_ranges = []
+            for type_index, tree_type in enumerate(self.type_names):
+                chosen = trees['type'] == type_index
+                if not chosen.any():
+                    continue
+                mesh = meshes[tree_type]
+                batch = np.repeat(mesh[None], chosen.sum(), axis=0)
+                batch[:, :, :3] = mesh[None, :, :3] * scales[chosen, None, None] + offsets[chosen, None, :]
+                batch = batch.reshape(-1, 9)
+                parts.append(batch)
+                level_ranges.append((first, len(batch)))
+                first += len(batch)
+            ranges.append(level_ranges)
+        return np.vstack(parts), ranges
+    
+    def add_chunk(self, key, trees, trunk_cells):
+        self.chunk_trees[key] = trees
+        self.chunk_trunk_cells[key] = trunk_cells
+    
+    def release_chunk(self, key):
+        self.chunk_trees.pop(key, None)
+        self.chunk_trunk_cells.pop(key, None)
+    
+    def chunk_tree_array(self, key):
+        # Trees of one resident chunk (empty when none or not resident)
+        trees = self.chunk_trees.get(key)
+        return trees if trees is not None else np.zeros(0, dtype=self.tree_dtype)
+    
+    def gather_trees(self, chunk_keys):
+        # Trees of several chunks in one array, for vectorized queries
+        arrays = [self.chunk_trees[key] for key in chunk_keys if key in self.chunk_trees]
+        if not arrays:
+            return np.zeros(0, dtype=self.tree_dtype)
+        return np.concatenate(arrays)
+    
+    def iter_trees(self, key):
+        # (x, z, tree_type, scale, ground_height) per tree of a chunk, as
+        # plain Python values
+        trees = self.chunk_tree_array(key)
+        for x, z, height, scale, type_index in trees.tolist():
+            yield x, z, self.type_names[type_index], scale, height
+    
+    def trees_in_box(self, min_x, min_z, max_x, max_z):
+        # Trees whose trunk cell overlaps a world-space box, from the spatial
+        # hash; a superset of the trees inside the box
+        chunk_size = self.world.chunk_size
+        n = self.trunk_cells_per_side
+        cell_size = chunk_size / n
+        parts = []
+        for chunk_ix in range(math.floor(min_x / chunk_size), math.floor(max_x / chunk_size) + 1):
+            for chunk_iz in range(math.floor(min_z / chunk_size), math.floor(max_z / chunk_size) + 1):
+                key = (chunk_ix, chunk_iz)
+                trees = self.chunk_trees.get(key)
+                trunk_cells = self.chunk_trunk_cells.get(key)  # None if evicted meanwhile
+                if trees is None or trunk_cells is None or not len(trees):
+                    continue
                 
-                glVertex3f(x * zr0 * radius, y * zr0 * radius, z0 * radius)
-                glVertex3f(x * zr1 * radius, y * zr1 * radius, z1 * radius)
-            glEnd()
-
-class Vegetation:
-    def __init__(self, world):
-        self.world = world
-        self.tree_types = {
-            'PINE': {'height': 15, 'width': 5, 'color': (0.1, 0.4, 0.1)},
-            'OAK': {'height': 12, 'width': 8, 'color': (0.2, 0.5, 0.2)},
-            'PALM': {'height': 18, 'width': 6, 'color': (0.3, 0.6, 0.2)},
-            'CACTUS': {'height': 8, 'width': 3, 'color': (0.2, 0.5, 0.2)}
-        }
+                # Cell range of the box inside this chunk; each x row of
+                # cells is one contiguous run of the sorted array
+                chunk_x = chunk_ix * chunk_size
+                chunk_z = chunk_iz * chunk_size
+                ix0 = min(max(int((min_x - chunk_x) // cell_size), 0), n - 1)
+                ix1 = min(max(int((max_x - chunk_x) // cell_size), 0), n - 1)
+                iz0 = min(max(int((min_z - chunk_z) // cell_size), 0), n - 1)
+                iz1 = min(max(int((max_z - chunk_z) // cell_size), 0), n - 1)
+                for ix in range(ix0, ix1 + 1):
+                    start = trunk_cells[ix * n + iz0]
+                    end = trunk_cells[ix * n + iz1 + 1]
+                    if end > start:
+                        parts.append(trees[start:end])
         
-        # Vegetation density per biome
-        self.density = {
-            'GRASS': 0.3,
-            'FOREST': 0.8,
-            'DESERT': 0.1,
-            'MOUNTAIN': 0.2,
-            'SNOW': 0.1
-        }
+        if not parts:
+            return np.zeros(0, dtype=self.tree_dtype)
+        return np.concatenate(parts)
+    
+    def sweep_trunks(self, x0, z0, x1, z1, radius):
+        # Earliest contact of a circle of `radius` moving in a straight line
+        # from (x0, z0) to (x1, z1) with any trunk. Returns (t, normal_x,
+        # normal_z) with t in [0, 1] along the move and the unit normal
+        # pointing from the trunk(s) to the circle, or None for a clear path.
+        # A circle already touching a trunk only collides while moving
+        # towards it, so it can always back out.
+        reach = radius + float(self.trunk_radii.max())
+        trees = self.trees_in_box(min(x0, x1) - reach, min(z0, z1) - reach,
+                                  max(x0, x1) + reach, max(z0, z1) + reach)
+        if not len(trees):
+            return None
         
-        # Optimization
-        self.instance_buffer = {}
-        self.billboard_textures = {}
+        # Solve |start + t * move - trunk| = radius + trunk radius for t
+        fx = x0 - trees['x'].astype(float)
+        fz = z0 - trees['z'].astype(float)
+        move_x = x1 - x0
+        move_z = z1 - z0
+        contact = radius + self.trunk_radii[trees['type']]
+        a = move_x * move_x + move_z * move_z
+        b = 2 * (fx * move_x + fz * move_z)
+        c = fx * fx + fz * fz - contact * contact
+        
+        overlapping = (c <= 0) & (b < 0)
+        if overlapping.any():
+            # Stuck against trunks: push away from all of them at once
+            t = 0.0
+            hit = overlapping
+        else:
+            if a == 0:
+                return None
+            disc = b * b - 4 * a * c
+            with np.errstate(invalid='ignore'):
+                toi = (-b - np.sqrt(disc)) / (2 * a)
+            toi = np.where((disc >= 0) & (toi >= 0) & (toi <= 1), toi, np.inf)
+            first = int(np.argmin(toi))
+            if not np.isfinite(toi[first]):
+                return None
+            t = float(toi[first])
+            hit = np.zeros(len(trees), dtype=bool)
+            hit[first] = True
+        
+        # Normals from the trunks to the circle centre at contact
+        nx = fx[hit] + t * move_x
+        nz = fz[hit] + t * move_z
+        length = np.hypot(nx, nz)
+        length[length == 0] = 1.0
+        normal_x = float((nx / length).sum())
+        normal_z = float((nz / length).sum())
+        length = math.hypot(normal_x, normal_z)
+        if length > 0:
+            normal_x /= length
+            normal_z /= length
+        return t, normal_x, normal_z
+    
+    def sweep_trunks_batch(self, x0, z0, x1, z1, radius):
+        # sweep_trunks for N moves at once, given as arrays. Returns (hit,
+        # t, normal_x, normal_z) arrays; t is inf and the normal zero where
+        # the path is clear.
+        x0, z0, x1, z1 = (np.asarray(v, dtype=float) for v in (x0, z0, x1, z1))
+        count = len(x0)
+        hit = np.zeros(count, dtype=bool)
+        t = np.full(count, np.inf)
+        normal_x = np.zeros(count)
+        normal_z = np.zeros(count)
+        if not count or not self.chunk_trees:
+            return hit, t, normal_x, normal_z
+    
+        # Global trunk cells each move's box covers; cell (gx, gz) is local
+        # cell (gx % n, gz % n) of chunk (gx // n, gz // n)
+        n = self.trunk_cells_per_side
+        cell_size = self.world.chunk_size / n
+        reach = radius + float(self.trunk_radii.max())
+        gx0 = np.floor((np.minimum(x0, x1) - reach) / cell_size).astype(np.int64)
+        gz0 = np.floor((np.minimum(z0, z1) - reach) / cell_size).astype(np.int64)
+        gx1 = np.floor((np.maximum(x0, x1) + reach) / cell_size).astype(np.int64)
+        gz1 = np.floor((np.maximum(z0, z1) + reach) / cell_size).astype(np.int64)
+        span_x = int((gx1 - gx0).max()) + 1
+        span_z = int((gz1 - gz0).max()) + 1
+        gx = gx0[:, None, None] + np.arange(span_x)[None, :, None]
+        gz = gz0[:, None, None] + np.arange(span_z)[None, None, :]
+        gx, gz = np.broadcast_arrays(gx, gz)
+        inside = (gx <= gx1[:, None, None]) & (gz <= gz1[:, None, None])
+        move_index = np.broadcast_to(np.arange(count)[:, None, None], gx.shape)[inside]
+        gx = gx[inside]
+        gz = gz[inside]
+    
+        # Trees of every chunk involved in one array, with each chunk's cell
+        # offsets shifted to index into it
+        chunk_keys, chunk_index = self.world.chunk_store.unique_keys(gx // n, gz // n)
+        arrays = []
+        offsets = np.zeros((len(chunk_keys), n * n + 1), dtype=np.int64)
+        base = 0
+        for row, (kx, kz) in enumerate(chunk_keys.tolist()):
+            trees = self.chunk_trees.get((kx, kz))
+            trunk_cells = self.chunk_trunk_cells.get((kx, kz))
+            if trees is None or trunk_cells is None or not len(trees):
+                offsets[row] = base
+                continue
+            arrays.append(trees)
+            offsets[row] = trunk_cells + base
+            base += len(trees)
+        if not arrays:
+            return hit, t, normal_x, normal_z
+        trees = np.concatenate(arrays)
+    
+        # One (move, tree) pair per tree in a covered cell
+        cell = (gx % n) * n + gz % n
+        start = offsets[chunk_index, cell]
+        counts = offsets[chunk_index, cell + 1] - start
+        pair_move = np.repeat(move_index, counts)
+        run_start = np.repeat(np.cumsum(counts) - counts, counts)
+        pair_tree = np.arange(counts.sum()) - run_start + np.repeat(start, counts)
+        if not len(pair_tree):
+            return hit, t, normal_x, normal_z
+        trees = trees[pair_tree]
+    
+        # Same contact equation as sweep_trunks, per pair
+        fx = x0[pair_move] - trees['x'].astype(float)
+        fz = z0[pair_move] - trees['z'].astype(float)
+        move_x = (x1 - x0)[pair_move]
+        move_z = (z1 - z0)[pair_move]
+        contact = radius + self.trunk_radii[trees['type']]
+        a = move_x * move_x + move_z * move_z
+        b = 2 * (fx * move_x + fz * move_z)
+        c = fx * fx + fz * fz - contact * contact
+    
+        # Moves already against trunks push away from all of them at t = 0
+        overlapping = (c <= 0) & (b < 0)
+        stuck = np.zeros(count, dtype=bool)
+        stuck[pair_move[overlapping]] = True
+    
+        disc = b * b - 4 * a * c
+        with np.errstate(invalid='ignore', divide='ignore'):
+            toi = (-b - np.sqrt(disc)) / (2 * a)
+        valid = (a > 0) & (disc >= 0) & (toi >= 0) & (toi <= 1) & ~stuck[pair_move]
+        toi = np.where(valid, toi, np.inf)
+        np.minimum.at(t, pair_move, toi)
     
-    def generate_vegetation(self, chunk_x, chunk_z, biome):
-        vegetation = []
-        density = self.density[biome]
+        # The first pair reaching each move's earliest contact is its hit
+        first = np.zeros(len(pair_move), dtype=bool)
+        earliest = np.flatnonzero(valid & (toi == t[pair_move]))
+        _, unique_index = np.unique(pair_move[earliest], return_index=True)
+        first[earliest[unique_index]] = True
+        t[stuck] = 0.0
+        pair_hit = overlapping | first
+        hit[pair_move[pair_hit]] = True
+    
+        # Normals from the trunks to the circle centre at contact
+        moves = pair_move[pair_hit]
+        nx = fx[pair_hit] + t[moves] * move_x[pair_hit]
+        nz = fz[pair_hit] + t[moves] * move_z[pair_hit]
+        length = np.hypot(nx, nz)
+        length[length == 0] = 1.0
+        np.add.at(normal_x, moves, nx / length)
+        np.add.at(normal_z, moves, nz / length)
+        length = np.hypot(normal_x, normal_z)
+        length[length == 0] = 1.0
+        normal_x /= length
+        normal_z /= length
+        return hit, t, normal_x, normal_z
+    
+    # Tree parts as triangle lists of (position, normal) rows, base at the origin
+    
+    def cylinder_mesh(self, radius, height, segments=8):
+        angles = np.linspace(0, 2 * math.pi, segments + 1)
+        ring = np.column_stack([np.cos(angles), np.sin(angles)])
+        bottom = np.column_stack([ring * radius, np.zeros(segments + 1)])
+        top = np.column_stack([ring * radius, np.full(segments + 1, height)])
+        side = np.column_stack([ring, np.zeros(segments + 1)])
         
-        # Use deterministic random for consistent placement
-        random.seed(f"{chunk_x},{chunk_z}")
+        # Two triangles per side quad
+        i = np.arange(segments)
+        corners = [(bottom, i), (top, i), (top, i + 1), (bottom, i), (top, i + 1), (bottom, i + 1)]
+        positions = np.stack([ring_points[index] for ring_points, index in corners], axis=1)
+        normals = np.stack([side[index] for _, index in corners], axis=1)
+        return np.hstack([positions.reshape(-1, 3), normals.reshape(-1, 3)])
+    
+    def cone_mesh(self, radius, height, segments=8):
+        angles = np.linspace(0, 2 * math.pi, segments + 1)
+        middle = (angles[:-1] + angles[1:]) / 2
         
-        # Generate vegetation based on biome
-        for _ in range(int(density * 100)):
-            x = chunk_x + random.random() * self.world.chunk_size
-            z = chunk_z + random.random() * self.world.chunk_size
-            
-            # Choose appropriate vegetation type
-            veg_type = self.get_vegetation_type(biome)
-            vegetation.append((x, z, veg_type))
+        def slope_normals(a):
+            n = np.column_stack([np.cos(a) * height, np.sin(a) * height, np.full(len(a), radius)])
+            return n / np.linalg.norm(n, axis=1, keepdims=True)
+        
+        # One triangle per segment from the apex down to the base ring
+        base = np.column_stack([np.cos(angles) * radius, np.sin(angles) * radius, np.zeros(segments + 1)])
+        apex = np.tile([0.0, 0.0, height], (segments, 1))
+        positions = np.stack([apex, base[:-1], base[1:]], axis=1)
+        normals = np.stack([slope_normals(middle), slope_normals(angles[:-1]), slope_normals(angles[1:])], axis=1)
+        return np.hstack([positions.reshape(-1, 3), normals.reshape(-1, 3)])
+    
+    def sphere_mesh(self, radius, segments=8):
+        latitudes = math.pi * (-0.5 + np.arange(segments + 1) / segments)
+        longitudes = 2 * math.pi * np.arange(segments + 1) / segments
+        lat, lng = np.meshgrid(latitudes, longitudes, indexing='ij')
+        points = np.stack([np.cos(lng) * np.cos(lat), np.sin(lng) * np.cos(lat), np.sin(lat)], axis=-1)
         
-        return vegetation 
\ No newline at end of file
+        # Two triangles per latitude/longitude quad; unit points are the normals
+        i, j = np.meshgrid(np.arange(segments), np.arange(segments), indexing='ij')
+        i = i.ravel()
+        j = j.ravel()
+        corners = [(i, j), (i + 1, j), (i + 1, j + 1), (i, j), (i + 1, j + 1), (i, j + 1)]
+        unit = np.stack([points[a, b] for a, b in corners], axis=1).reshape(-1, 3)
+        return np.hstack([unit * radius, unit])
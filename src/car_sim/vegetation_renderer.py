@@ -0,0 +1,282 @@
+from OpenGL.GL import *
+import numpy as np
+import ctypes
+
+# GL side of the trees: a near chunk has one vertex buffer with its trees
+# pre-transformed at every mesh level, a far one a buffer of impostor quads
+# textured from an impostor atlas. The first comes from
+# TreeSystem.build_chunk_batch or build_chunk_impostors on the generation
+# workers; when a chunk crosses lod_distances[1] the other one is built from
+# its resident trees and replaces it.
+class TreeRenderer:
+    def __init__(self, world):
+        self.world = world
+        self.vegetation = world.vegetation
+        
+        # Level of detail by distance from the camera: full meshes closer
+        # than lod_distances[0], reduced meshes up to lod_distances[1] and
+        # impostors beyond that. Chunks switch between meshes and impostors
+        # only once past lod_distances[1] plus/minus the hysteresis band.
+        self.lod_distances = [150.0, 400.0]
+        self.lod_hysteresis = 40.0
+        self.lod_rebuild_budget = 8  # Chunks switched per frame; the rest wait a frame
+        self.lod_center = None
+        
+        # Near chunks: one vertex buffer holding all their trees
+        # pre-transformed at every mesh level, grouped by type:
+        # (buffer, [[(first, count), ...] per level])
+        self.chunk_batches = {}
+        
+        # Impostors: every type rendered once from the side into one texture
+        # atlas, one tile per type. impostor_sizes holds each type's half
+        # width and height at scale 1. A far tree is two crossed upright
+        # quads with its tile, fixed in the chunk's buffer, so drawing them
+        # costs nothing per frame: (buffer, vertex count) per chunk.
+        self.chunk_impostors = {}
+        tree_meshes = self.vegetation.tree_meshes[0]
+        self.impostor_tile_size = (64, 128)
+        self.impostor_sizes = np.array([
+            (np.abs(tree_meshes[t][:, :2]).max(), tree_meshes[t][:, 2].max())
+            for t in self.vegetation.type_names])
+        self.impostor_texture = self.create_impostor_texture()
+    
+    def create_impostor_texture(self):
+        # Render every tree type orthographically from the side into the
+        # back buffer, read it back and key out the background. The buffer
+        # is cleared again before the first frame is drawn.
+        tile_width, tile_height = self.impostor_tile_size
+        width = tile_width * len(self.vegetation.type_names)
+        key_color = (1.0, 0.0, 1.0)
+        
+        glPushAttrib(GL_ALL_ATTRIB_BITS)
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        
+        glClearColor(*key_color, 1.0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glEnable(GL_DEPTH_TEST)
+        glEnable(GL_LIGHTING)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        for index, tree_type in enumerate(self.vegetation.type_names):
+            half_width, height = self.impostor_sizes[index]
+            glViewport(index * tile_width, 0, tile_width, tile_height)
+            glMatrixMode(GL_PROJECTION)
+            glLoadIdentity()
+            glOrtho(-half_width, half_width, 0, height, -2 * half_width, 2 * half_width)
+            glMatrixMode(GL_MODELVIEW)
+            glLoadIdentity()
+            glRotatef(-90, 1, 0, 0)  # Look along +y with z up
+            
+            mesh = self.vegetation.tree_meshes[0][tree_type]
+            positions = np.ascontiguousarray(mesh[:, 0:3])
+            normals = np.ascontiguousarray(mesh[:, 3:6])
+            colors = np.ascontiguousarray(mesh[:, 6:9])
+            glVertexPointer(3, GL_FLOAT, 0, positions)
+            glNormalPointer(GL_FLOAT, 0, normals)
+            glColorPointer(3, GL_FLOAT, 0, colors)
+            glDrawArrays(GL_TRIANGLES, 0, len(mesh))
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        pixels = glReadPixels(0, 0, width, tile_height, GL_RGB, GL_UNSIGNED_BYTE)
+        
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
+        glPopAttrib()
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        
+        rgb = np.frombuffer(pixels, dtype=np.uint8).reshape(tile_height, width, 3)
+        background = (np.abs(rgb.astype(int) - np.array(key_color) * 255) < 8).all(axis=-1)
+        rgba = np.empty((tile_height, width, 4), dtype=np.uint8)
+        rgba[..., :3] = rgb
+        rgba[..., 3] = np.where(background, 0, 255)
+        # Give transparent texels the foliage colour so filtering does not
+        # bleed the key colour into the edges
+        for index, tree_type in enumerate(self.vegetation.type_names):
+            tile = rgba[:, index * tile_width:(index + 1) * tile_width]
+            tile[tile[..., 3] == 0, :3] = np.array(self.vegetation.tree_types[tree_type]['color']) * 255
+        
+        texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, tile_height, 0, GL_RGBA, GL_UNSIGNED_BYTE, rgba)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        return texture
+    
+    def build_chunk_impostors(self, trees):
+        # Runs on a worker thread: impostor vertex data for a chunk's trees,
+        # interleaved position/texture coordinate, two crossed quads (along
+        # x and along z) per tree standing on the ground, or None
+        if not len(trees):
+            return None
+        sizes = self.impostor_sizes[trees['type']] * trees['scale'][:, None]
+        half_width = sizes[:, 0]
+        
+        quads = np.empty((len(trees), 2, 4, 5), dtype=np.float32)
+        quads[:, :, :, 0] = trees['x'][:, None, None]
+        quads[:, :, :, 1] = trees['z'][:, None, None]
+        quads[:, 0, [0, 3], 0] -= half_width[:, None]
+        quads[:, 0, [1, 2], 0] += half_width[:, None]
+        quads[:, 1, [0, 3], 1] -= half_width[:, None]
+        quads[:, 1, [1, 2], 1] += half_width[:, None]
+        quads[:, :, [0, 1], 2] = trees['height'][:, None, None]
+        quads[:, :, [2, 3], 2] = (trees['height'] + sizes[:, 1])[:, None, None]
+        
+        # Each type has its own tile of the atlas
+        tile = 1.0 / len(self.vegetation.type_names)
+        u0 = trees['type'] * tile
+        quads[:, :, [0, 3], 3] = u0[:, None, None]
+        quads[:, :, [1, 2], 3] = (u0 + tile)[:, None, None]
+        quads[:, :, [0, 1], 4] = 0.0
+        quads[:, :, [2, 3], 4] = 1.0
+        return quads.reshape(-1, 5)
+    
+    def starts_far(self, key):
+        # Whether a new chunk starts as impostors, from its distance to
+        # where the LODs were last updated (safe to call from the workers)
+        center = self.lod_center or self.world.focus_pos
+        size = self.world.chunk_size
+        distance = np.hypot((key[0] + 0.5) * size - center[0], (key[1] + 0.5) * size - center[1])
+        return distance > self.lod_distances[1]
+    
+    def build_chunk(self, key, trees):
+        # Runs on a worker thread: (mesh batch, impostors) for a chunk's
+        # trees, only the one its distance calls for
+        if self.starts_far(key):
+            return None, self.build_chunk_impostors(trees)
+        return self.vegetation.build_chunk_batch(trees), None
+    
+    def upload_chunk(self, key, batch, impostors):
+        # Main thread only
+        self.release_chunk(key)
+        if batch is not None:
+            data, ranges = batch
+            self.chunk_batches[key] = (self.create_buffer(data), ranges)
+        if impostors is not None:
+            self.chunk_impostors[key] = (self.create_buffer(impostors), len(impostors))
+    
+    def update_lods(self, center_x, center_z):
+        # Swap meshes for impostors on chunks that moved past
+        # lod_distances[1] + hysteresis and back on chunks that came inside
+        # lod_distances[1] - hysteresis, nearest first, freeing the old buffer
+        self.lod_center = (center_x, center_z)
+        keys = list(self.chunk_batches) + list(self.chunk_impostors)
+        if not keys:
+            return
+        far = np.zeros(len(keys), dtype=bool)
+        far[len(self.chunk_batches):] = True
+        
+        size = self.world.chunk_size
+        centers = (np.array(keys, dtype=float) + 0.5) * size
+        distance = np.hypot(centers[:, 0] - center_x, centers[:, 1] - center_z)
+        threshold = self.lod_distances[1]
+        switch = np.where(far, distance < threshold - self.lod_hysteresis,
+                          distance > threshold + self.lod_hysteresis)
+        changed = np.flatnonzero(switch)
+        changed = changed[np.argsort(distance[changed])][:self.lod_rebuild_budget]
+        for i in changed.tolist():
+            key = keys[i]
+            trees = self.vegetation.chunk_tree_array(key)
+            if far[i]:
+                self.upload_chunk(key, self.vegetation.build_chunk_batch(trees), None)
+            else:
+                self.upload_chunk(key, None, self.build_chunk_impostors(trees))
+    
+    def create_buffer(self, data):
+        vertex_buffer = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, vertex_buffer)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        return vertex_buffer
+    
+    def release_chunk(self, key):
+        batch = self.chunk_batches.pop(key, None)
+        if batch is not None:
+            glDeleteBuffers(1, [batch[0]])
+        impostors = self.chunk_impostors.pop(key, None)
+        if impostors is not None:
+            glDeleteBuffers(1, [impostors[0]])
+    
+    def chunk_lod(self, chunk_keys, eye_x, eye_z):
+        # Mesh level per chunk from the distance between the camera and the
+        # chunk centre: 0 full mesh, 1 reduced mesh, 2 impostor
+        if not chunk_keys:
+            return np.zeros(0, dtype=np.int64)
+        centers = (np.array(chunk_keys, dtype=float) + 0.5) * self.world.chunk_size
+        distance = np.hypot(centers[:, 0] - eye_x, centers[:, 1] - eye_z)
+        return np.searchsorted(self.lod_distances, distance)
+    
+    def draw(self, chunk_keys=None, eye=(0.0, 0.0)):
+        # Draw the trees of the given chunks (all chunks when None) as seen
+        # from `eye` (x, z): near chunks take one draw call per tree type,
+        # far ones one for all their impostors
+        if chunk_keys is None:
+            chunk_keys = list(self.chunk_batches) + list(self.chunk_impostors)
+        near = [key for key in chunk_keys if key in self.chunk_batches]
+        # Inside the hysteresis band a near chunk may be past the last mesh
+        # level; it keeps the reduced mesh until it switches to impostors
+        levels = np.minimum(self.chunk_lod(near, eye[0], eye[1]), len(self.vegetation.tree_meshes) - 1)
+        
+        glEnable(GL_LIGHTING)
+        stride = 9 * 4  # position, normal, color as float32
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        for key, level in zip(near, levels.tolist()):
+            vertex_buffer, ranges = self.chunk_batches[key]
+            glBindBuffer(GL_ARRAY_BUFFER, vertex_buffer)
+            glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(0))
+            glNormalPointer(GL_FLOAT, stride, ctypes.c_void_p(12))
+            glColorPointer(3, GL_FLOAT, stride, ctypes.c_void_p(24))
+            for first, count in ranges[level]:
+                glDrawArrays(GL_TRIANGLES, first, count)
+        
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        
+        self.draw_impostors(chunk_keys)
+    
+    def draw_impostors(self, chunk_keys):
+        chunks = [self.chunk_impostors[key] for key in chunk_keys if key in self.chunk_impostors]
+        if not chunks:
+            return
+        
+        # Lighting is baked into the texture; cut the background out with
+        # the alpha test so impostors still write depth
+        glDisable(GL_LIGHTING)
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.impostor_texture)
+        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+        glEnable(GL_ALPHA_TEST)
+        glAlphaFunc(GL_GREATER, 0.5)
+        glColor3f(1.0, 1.0, 1.0)
+        
+        stride = 5 * 4  # position, texture coordinate as float32
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        for vertex_buffer, count in chunks:
+            glBindBuffer(GL_ARRAY_BUFFER, vertex_buffer)
+            glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(0))
+            glTexCoordPointer(2, GL_FLOAT, stride, ctypes.c_void_p(12))
+            glDrawArrays(GL_QUADS, 0, count)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        
+        glDisable(GL_ALPHA_TEST)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glDisable(GL_TEXTURE_2D)
+        glEnable(GL_LIGHTING)
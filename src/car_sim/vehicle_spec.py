@@ -0,0 +1,132 @@
+import bisect
+import json
+import math
+import os
+import threading
+import numpy as np
+
+
+def read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+# A vehicle model: every constant the car physics uses, loaded from a data
+# file in car_sim/vehicles, plus lookup tables derived from them once.
+# Specs are read-only and shared; cars of the same model all point at the
+# same one, and per-car state stays on the car.
+#
+# Data files group the constants in sections (body, engine, transmission,
+# brakes, steering, drift); on the spec they are plain attributes. The
+# engine's power curve is a list of (rpm / max_rpm, power factor) points,
+# linear in between and continued along its last segment past the end. A
+# point repeated with a new factor gives a step.
+class VehicleSpec:
+    sections = ('body', 'engine', 'transmission', 'brakes', 'steering', 'drift')
+    directory = os.path.join(os.path.dirname(__file__), 'vehicles')
+
+    _loaded = {}
+    _lock = threading.Lock()
+
+    def __init__(self, name, values):
+        set_value = object.__setattr__
+        set_value(self, 'name', name)
+        set_value(self, 'values', dict(values))
+        for key, value in values.items():
+            if isinstance(value, list):
+                value = tuple(tuple(v) if isinstance(v, list) else v for v in value)
+            set_value(self, key, value)
+
+        # Per-gear lists need an entry for every gear; extra ones are unused
+        gears = len(self.gear_ratios)
+        if min(len(self.gear_speed_limits), len(self.min_start_speed)) < gears:
+            raise ValueError(f"{name}: gear_speed_limits and min_start_speed need a value for each of {gears} gears")
+        for key, value in self.derive_tables().items():
+            set_value(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("VehicleSpec is read-only; use replace() for a changed copy")
+
+    def __delattr__(self, key):
+        raise AttributeError("VehicleSpec is read-only")
+
+    def __repr__(self):
+        return f"VehicleSpec({self.name!r})"
+
+    def derive_tables(self):
+        tables = {'gear_count': len(self.gear_ratios)}
+
+        # Engine RPM per m/s of road speed in each gear
+        wheel_rpm_per_speed = 60 / (2 * math.pi * self.tire_rolling_radius)
+        drive_ratios = np.array(self.gear_ratios, dtype=float) * self.differential_ratio
+        tables['rpm_per_speed'] = tuple((wheel_rpm_per_speed * drive_ratios).tolist())
+
+        # Full-throttle engine force per gear at the power curve's points:
+        # engine power times the power factor times the gear's overall ratio
+        # and the transmission efficiency, with the slope of each segment
+        # (zero for a step), so a lookup is one search and one multiply-add
+        points = np.array(self.power_curve, dtype=float)
+        rpm_points = points[:, 0] * self.max_rpm
+        force = self.engine_power * points[None, :, 1] * drive_ratios[:, None] * self.transmission_efficiency
+        width = np.diff(rpm_points)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(width > 0, np.diff(force, axis=1) / width, 0.0)
+        tables['rpm_points'] = tuple(rpm_points.tolist())
+        tables['force_points'] = tuple(tuple(row) for row in force.tolist())
+        tables['force_slopes'] = tuple(tuple(row) for row in slope.tolist())
+        tables['force_arrays'] = (read_only(rpm_points), read_only(force), read_only(slope))
+
+        # Speed (km/h) below which each gear is held back
+        tables['penalty_speed'] = tuple(speed * 1.2 for speed in self.min_start_speed)
+        return tables
+
+    def engine_force(self, gear, rpm):
+        # Full-throttle force in `gear` (1-based) at `rpm`, from the tables;
+        # past the last point the last segment continues, so over-revving
+        # loses power
+        i = min(max(bisect.bisect_right(self.rpm_points, rpm) - 1, 0), len(self.rpm_points) - 2)
+        return self.force_points[gear - 1][i] + self.force_slopes[gear - 1][i] * (rpm - self.rpm_points[i])
+
+    def engine_forces(self, gears, rpms):
+        # engine_force for arrays of gears and RPMs
+        rpm_points, force, slope = self.force_arrays
+        i = np.clip(np.searchsorted(rpm_points, rpms, side='right') - 1, 0, len(rpm_points) - 2)
+        gear_index = gears - 1
+        return force[gear_index, i] + slope[gear_index, i] * (rpms - rpm_points[i])
+
+    def replace(self, **changes):
+        # A copy with some constants changed (tables rebuilt), e.g. for sweeps
+        unknown = set(changes) - set(self.values)
+        if unknown:
+            raise ValueError(f"{self.name}: unknown vehicle parameters {sorted(unknown)}")
+        return VehicleSpec(self.name, {**self.values, **changes})
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        values = {}
+        for section in cls.sections:
+            values.update(data.get(section, {}))
+        return cls(data.get('name', os.path.splitext(os.path.basename(path))[0]), values)
+
+    @classmethod
+    def load(cls, vehicle='default'):
+        # Shared spec for a packaged vehicle name or a path to a data file;
+        # every caller asking for the same one gets the same object
+        path = vehicle
+        if not vehicle.endswith('.json'):
+            path = os.path.join(cls.directory, vehicle + '.json')
+        path = os.path.abspath(path)
+        with cls._lock:
+            spec = cls._loaded.get(path)
+            if spec is None:
+                spec = cls.from_file(path)
+                cls._loaded[path] = spec
+        return spec
+
+    @classmethod
+    def available(cls):
+        # Names of the packaged vehicles
+        return sorted(os.path.splitext(name)[0] for name in os.listdir(cls.directory)
+                      if name.endswith('.json'))
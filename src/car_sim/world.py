@@ -1,17 +1,49 @@
-from OpenGL.GL import *
-from OpenGL.GLU import *
 import numpy as np
-from terrain import Terrain
-from skybox import Skybox
-from road import Road
-from vegetation import TreeSystem
+import math
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor, wait
+from car_sim.chunk_cache import ChunkCache
+from car_sim.chunk_store import ChunkStore
+from car_sim.terrain import Terrain
+from car_sim.road import Road
+from car_sim.vegetation import TreeSystem
 
+# The world as data: terrain heights, roads and trees per resident chunk,
+# streamed around a focus point. Nothing here needs a GL context; drawing is
+# done by a WorldRenderer, which only exists when the world is not headless.
 class World:
-    def __init__(self):
+    def __init__(self, seed=None, cache_dir=None, headless=False, generation_workers=None):
+        # Everything procedural derives from this; same seed, same world
+        self.seed = seed if seed is not None else random.randint(0, 2**31 - 1)
+        self.headless = headless
+        
         # World dimensions and settings
         self.size = 2000.0
         self.chunk_size = 100.0
-        self.view_distance = 500.0
+        self.view_distance = 2000.0  # Matches the far plane; distant chunks use coarse LODs
+        if headless:
+            # Physics only needs the ground near the car
+            self.view_distance = 2 * self.chunk_size
+        self.vegetation_distance = self.view_distance  # Far trees are drawn as impostors
+        
+        # Chunk generation runs on worker threads (the noise work is NumPy);
+        # only GL uploads happen on the render thread, a few per frame.
+        # Headless worlds take every finished chunk right away instead, so a
+        # run does not depend on thread timing.
+        self.generation_workers = generation_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_chunk_uploads = 4
+        self.executor = ThreadPoolExecutor(max_workers=self.generation_workers)
+        self.pending_chunks = {}  # chunk key -> future
+        
+        # Resident chunks, keyed by integer chunk coordinates. Chunks out of
+        # view are evicted (least recently needed, farthest first) once the
+        # budget is exceeded.
+        self.chunk_store = ChunkStore(self.chunk_size, max_chunks=2000,
+                                      max_bytes=128 * 1024 * 1024)
+        self.focus_key = (0, 0)  # Chunk the car was in at the last update
+        self.focus_pos = (0.0, 0.0)
+        self._chunk_offsets = None
         
         # Terrain variety
         self.terrain_types = {
@@ -22,107 +54,274 @@ class World:
             'SNOW': {'color': (0.9, 0.9, 0.9), 'height_mod': 1.5}
         }
         
-        # Setup lighting first
-        self.setup_lighting()
-        
         # Initialize all components
         self.terrain = Terrain(self)
         self.road = Road(self)
         self.vegetation = TreeSystem(self)
-        self.skybox = Skybox()
         
-        # Generate base terrain after all components are initialized
-        self.generate_base_terrain()
+        # Generated chunks persist across launches of the same world
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = ChunkCache(
+                cache_dir, self.seed, self.terrain.resolution,
+                self.chunk_size, self.terrain.lod_resolutions, self.vegetation.type_names,
+                self.vegetation.tree_dtype, self.generation_parameters())
         
-    def setup_lighting(self):
-        glEnable(GL_LIGHTING)
-        glEnable(GL_LIGHT0)
-        glEnable(GL_COLOR_MATERIAL)
+        # Last chunk used by get_height_at; consecutive queries tend to hit it
+        self._height_hint = (None, None)
         
-        # Main directional light (sun)
-        glLightfv(GL_LIGHT0, GL_POSITION, (1.0, 1.0, 2.0, 0.0))
-        glLightfv(GL_LIGHT0, GL_AMBIENT, (0.3, 0.3, 0.3, 1.0))
-        glLightfv(GL_LIGHT0, GL_DIFFUSE, (1.0, 1.0, 0.9, 1.0))
+        # Evicting a chunk releases its data everywhere at once
+        self.chunk_store.register(self.terrain)
+        self.chunk_store.register(self.vegetation)
+        self.chunk_store.register(self.road)
+        self.chunk_store.register(self)
         
-        # Global ambient light
-        glLightModelfv(GL_LIGHT_MODEL_AMBIENT, (0.2, 0.2, 0.2, 1.0))
+        # GL side, imported here so headless runs never load OpenGL
+        self.renderer = None
+        if not headless:
+            from car_sim.world_renderer import WorldRenderer
+            self.renderer = WorldRenderer(self)
+        
+        # Generate base terrain after all components are initialized
+        self.generate_base_terrain()
         
-        # Material properties
-        glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
-        glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, (0.2, 0.2, 0.2, 1.0))
-        glMaterialf(GL_FRONT_AND_BACK, GL_SHININESS, 8.0)
-
     def generate_base_terrain(self):
         # Generate initial chunks around origin
         chunk_radius = 5  # Number of chunks in each direction
+        if self.headless:
+            chunk_radius = int(self.view_distance / self.chunk_size)
         for x in range(-chunk_radius, chunk_radius + 1):
             for z in range(-chunk_radius, chunk_radius + 1):
-                chunk_x = x * self.chunk_size
-                chunk_z = z * self.chunk_size
-                
-                # Generate terrain for this chunk
-                chunk_mesh = self.terrain.generate_chunk(chunk_x, chunk_z)
-                self.terrain.display_lists[(chunk_x, chunk_z)] = chunk_mesh
-                
-                # Generate vegetation for this chunk
-                biome = self.terrain.get_biome(chunk_x, chunk_z)
-                self.vegetation.generate_chunk_vegetation(chunk_x, chunk_z, biome)
+                self.request_chunk((x, z))
+        
+        # Nothing is on screen yet, so wait and upload everything at once
+        wait(list(self.pending_chunks.values()))
+        self.upload_finished_chunks(budget=None)
 
-    def update(self, camera_pos):
-        # Get camera chunk position
-        camera_chunk_x = int(camera_pos[0] / self.chunk_size) * self.chunk_size
-        camera_chunk_z = int(camera_pos[1] / self.chunk_size) * self.chunk_size
+    def generation_parameters(self):
+        # Everything besides the seeds that decides what a generated chunk
+        # holds; the chunk cache is only reused while these stay the same
+        vegetation = self.vegetation
+        return {
+            'terrain': {'height_scale': self.terrain.height_scale, 'terrain_types': self.terrain_types,
+                        'lod_resolutions': self.terrain.lod_resolutions},
+            'road': {'points': np.asarray(self.road.points, dtype=float).tolist(),
+                     'segments': np.asarray(self.road.segments).tolist(), 'width': self.road.width},
+            'vegetation': {'tree_types': vegetation.tree_types, 'density': vegetation.density,
+                           'biome_tree_types': vegetation.biome_tree_types,
+                           'road_clearance': vegetation.road_clearance,
+                           'min_tree_spacing': vegetation.min_tree_spacing},
+        }
+
+    def build_chunk(self, key):
+        # Runs on a worker thread: pure data, no GL calls. Vertex data for
+        # drawing is built here too when there is a renderer.
+        chunk_x, chunk_z = self.chunk_store.chunk_origin(key)
+        road_distance = self.road.build_chunk_distance(key)
+        cached = self.cache.load(key) if self.cache is not None else None
+        if cached is not None:
+            grids, trees = cached
+        else:
+            grids = self.terrain.sample_chunk_grids(chunk_x, chunk_z)
+            biomes = grids[0][1]  # Biome grid at full resolution
+            trees = self.vegetation.create_chunk_vegetation(chunk_x, chunk_z, biomes, road_distance)
+            trees['height'] = self.vegetation.tree_ground_heights(trees, chunk_x, chunk_z, grids[0][0])
+            if self.cache is not None:
+                self.cache.save(key, grids, trees)
+        
+        heights = grids[0][0]
+        trees, trunk_cells = self.vegetation.build_trunk_hash(trees, chunk_x, chunk_z)
+        render_data = None
+        if self.renderer is not None:
+            render_data = self.renderer.build_chunk(key, grids, trees)
+        return heights, trees, trunk_cells, road_distance, render_data
+
+    def request_chunk(self, key):
+        if key in self.chunk_store or key in self.pending_chunks:
+            return
+        self.pending_chunks[key] = self.executor.submit(self.build_chunk, key)
+
+    def upload_finished_chunks(self, budget):
+        # Make finished chunks resident (and move them to the GPU), at most
+        # `budget` per call (None = all)
+        finished = [key for key, future in self.pending_chunks.items() if future.done()]
+        if budget is not None:
+            finished = finished[:budget]
         
-        # Load/unload chunks based on distance
+        for key in finished:
+            self.upload_chunk(key)
+
+    def upload_chunk(self, key):
+        heights, trees, trunk_cells, road_distance, render_data = self.pending_chunks.pop(key).result()
+        self.terrain.add_chunk(key, heights)
+        self.vegetation.add_chunk(key, trees, trunk_cells)
+        self.road.add_chunk(key, road_distance)
+        nbytes = heights.nbytes + trees.nbytes + trunk_cells.nbytes
+        if road_distance is not None:
+            nbytes += road_distance.nbytes
+        if render_data is not None:
+            nbytes += self.renderer.upload_chunk(key, render_data)
+        self.chunk_store.add(key, nbytes)
+
+    def chunks_around(self, x, z):
+        # The chunk at (x, z) and its eight neighbours: all the ground and
+        # trees a car there can touch within a physics step
+        center_x, center_z = self.chunk_store.chunk_key(x, z)
+        return [(center_x + dx, center_z + dz) for dx in (-1, 0, 1) for dz in (-1, 0, 1)]
+
+    def chunks_ready(self, x, z):
+        return all(key in self.chunk_store for key in self.chunks_around(x, z))
+
+    def require_chunks(self, x, z):
+        # Make the chunks around (x, z) resident now, waiting for any still
+        # being generated. Headless runs call this before every physics
+        # step, so they never fall back to the raw noise or miss trees of a
+        # chunk that is still loading, and a run doesn't depend on thread
+        # timing. A rendered world never blocks on generation: its physics
+        # uses the noise fallback until the chunks stream in.
+        if not self.headless:
+            raise RuntimeError("require_chunks blocks on generation; only headless worlds may call it")
+        missing = [key for key in self.chunks_around(x, z) if key not in self.chunk_store]
+        if not missing:
+            return
+        for key in missing:
+            self.request_chunk(key)
+        wait([self.pending_chunks[key] for key in missing])
+        for key in missing:
+            self.upload_chunk(key)
+
+    def release_chunk(self, key):
+        if self._height_hint[0] == key:
+            self._height_hint = (None, None)
+
+    def chunk_offsets(self):
+        # Chunk offsets within view distance, nearest first
         chunk_radius = int(self.view_distance / self.chunk_size)
-        for x in range(-chunk_radius, chunk_radius + 1):
-            for z in range(-chunk_radius, chunk_radius + 1):
-                chunk_x = camera_chunk_x + x * self.chunk_size
-                chunk_z = camera_chunk_z + z * self.chunk_size
-                
-                # Check if chunk needs to be generated
-                if (chunk_x, chunk_z) not in self.terrain.display_lists:
-                    chunk_mesh = self.terrain.generate_chunk(chunk_x, chunk_z)
-                    self.terrain.display_lists[(chunk_x, chunk_z)] = chunk_mesh
-                    
-                    # Generate vegetation for new chunk
-                    biome = self.terrain.get_biome(chunk_x, chunk_z)
-                    self.vegetation.generate_chunk_vegetation(chunk_x, chunk_z, biome)
-
-    def draw(self):
-        # Draw skybox first
-        glDisable(GL_LIGHTING)
-        self.skybox.draw()
-        
-        # Enable lighting for terrain and objects
-        glEnable(GL_LIGHTING)
-        glEnable(GL_DEPTH_TEST)
-        
-        # Draw terrain chunks
-        for chunk_pos, display_list in self.terrain.display_lists.items():
-            glPushMatrix()
-            glTranslatef(chunk_pos[0], chunk_pos[1], 0)  # Move to chunk position
-            glCallList(display_list)
-            glPopMatrix()
-        
-        # Draw roads
-        self.road.draw()
-        
-        # Draw vegetation
-        self.vegetation.draw()
+        if self._chunk_offsets is None or self._chunk_offsets[0] != chunk_radius:
+            offsets = [(x, z) for x in range(-chunk_radius, chunk_radius + 1)
+                              for z in range(-chunk_radius, chunk_radius + 1)
+                              if x * x + z * z <= chunk_radius * chunk_radius]
+            offsets.sort(key=lambda o: o[0] * o[0] + o[1] * o[1])
+            self._chunk_offsets = (chunk_radius, offsets)
+        return self._chunk_offsets[1]
+
+    def update(self, camera_pos):
+        center_x, center_z = self.chunk_store.chunk_key(camera_pos[0], camera_pos[1])
+        self.focus_key = (center_x, center_z)
+        self.focus_pos = (camera_pos[0], camera_pos[1])
+        self.chunk_store.next_frame()
+        
+        # Queue missing chunks, nearest first so they finish first, and mark
+        # resident ones as still needed
+        for x, z in self.chunk_offsets():
+            key = (center_x + x, center_z + z)
+            self.chunk_store.touch(key)
+            self.request_chunk(key)
+        
+        if self.headless:
+            wait(list(self.pending_chunks.values()))
+            self.upload_finished_chunks(budget=None)
+        else:
+            self.upload_finished_chunks(self.max_chunk_uploads)
+        self.chunk_store.evict((center_x, center_z))
+        if self.renderer is not None:
+            self.renderer.update(camera_pos)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.cache is not None:
+            self.cache.flush()
+
+    def draw(self, frustum=None):
+        self.renderer.draw(frustum)
+
+    def heightmap_for(self, key):
+        # Height grid of a resident chunk (None if not generated yet), going
+        # through the last-chunk hint first
+        hint_key, heights = self._height_hint
+        if key != hint_key:
+            heights = self.terrain.heightmaps.get(key)
+            if heights is None:
+                return None
+            self._height_hint = (key, heights)
+        return heights
 
     def get_height_at(self, x, z):
         # Get the height of terrain at any world position
-        chunk_x = int(x / self.chunk_size) * self.chunk_size
-        chunk_z = int(z / self.chunk_size) * self.chunk_size
+        key = self.chunk_store.chunk_key(x, z)
+        chunk_x, chunk_z = self.chunk_store.chunk_origin(key)
+        
+        heights = self.heightmap_for(key)
+        if heights is None:
+            # Chunk not generated yet: evaluate the noise directly
+            return self.terrain.get_height_at(x - chunk_x, z - chunk_z, chunk_x, chunk_z)
+        
+        # Interpolate within the chunk's cached height grid
+        return self.terrain.sample_heightmap(heights, x - chunk_x, z - chunk_z)
+
+    def get_heights(self, xs, zs):
+        # Terrain heights for arrays of world positions, same surface as
+        # get_height_at
+        return self.sample_terrain(xs, zs, gradients=False)[0]
+
+    def get_height_and_normal(self, xs, zs):
+        # Terrain heights and unit surface normals, (x, z, up) like the
+        # vertices, for arrays of world positions. Normals come from the
+        # exact slope of the interpolated surface.
+        if np.ndim(xs) == 0 and np.ndim(zs) == 0:
+            # Single point: stay in plain floats
+            height, dh_dx, dh_dz = self.get_height_and_gradient_at(xs, zs)
+            length = math.sqrt(dh_dx * dh_dx + dh_dz * dh_dz + 1.0)
+            return height, (-dh_dx / length, -dh_dz / length, 1.0 / length)
+        
+        heights, dh_dx, dh_dz = self.sample_terrain(xs, zs, gradients=True)
+        normals = np.stack([-dh_dx, -dh_dz, np.ones_like(heights)], axis=-1)
+        normals /= np.linalg.norm(normals, axis=-1, keepdims=True)
+        return heights, normals
+
+    def get_height_and_gradient_at(self, x, z):
+        key = self.chunk_store.chunk_key(x, z)
+        chunk_x, chunk_z = self.chunk_store.chunk_origin(key)
+        
+        heights = self.heightmap_for(key)
+        if heights is None:
+            height, dh_dx, dh_dz = self.terrain.sample_points_gradient(np.array(x), np.array(z))
+            return float(height), float(dh_dx), float(dh_dz)
+        return self.terrain.sample_heightmap_gradient(heights, x - chunk_x, z - chunk_z)
+
+    def sample_terrain(self, xs, zs, gradients):
+        xs, zs = np.broadcast_arrays(np.asarray(xs, dtype=float), np.asarray(zs, dtype=float))
+        shape = xs.shape
+        x = xs.ravel()
+        z = zs.ravel()
+        
+        # Group points by chunk; each distinct chunk is looked up once
+        chunk_ix = np.floor(x / self.chunk_size).astype(np.int64)
+        chunk_iz = np.floor(z / self.chunk_size).astype(np.int64)
+        keys, inverse = self.chunk_store.unique_keys(chunk_ix, chunk_iz)
+        grids = [self.terrain.heightmaps.get((int(kx), int(kz))) for kx, kz in keys]
+        resident = np.array([grid is not None for grid in grids])
+        point_resident = resident[inverse]
+        
+        heights = np.empty(x.size)
+        dh_dx = np.zeros(x.size)
+        dh_dz = np.zeros(x.size)
         
-        # Ensure the chunk exists
-        if (chunk_x, chunk_z) not in self.terrain.display_lists:
-            chunk_mesh = self.terrain.generate_chunk(chunk_x, chunk_z)
-            self.terrain.display_lists[(chunk_x, chunk_z)] = chunk_mesh
+        if point_resident.any():
+            stack = np.stack([grid for grid in grids if grid is not None])
+            stack_index = (np.cumsum(resident) - 1)[inverse[point_resident]]
+            local_x = x[point_resident] - chunk_ix[point_resident] * self.chunk_size
+            local_z = z[point_resident] - chunk_iz[point_resident] * self.chunk_size
+            sampled = self.terrain.sample_heightmaps(stack, stack_index, local_x, local_z)
+            heights[point_resident], dh_dx[point_resident], dh_dz[point_resident] = sampled
         
-        # Get local coordinates within chunk
-        local_x = x - chunk_x
-        local_z = z - chunk_z
+        missing = ~point_resident
+        if missing.any():
+            # Chunks not generated yet: evaluate the noise directly
+            if gradients:
+                sampled = self.terrain.sample_points_gradient(x[missing], z[missing])
+                heights[missing], dh_dx[missing], dh_dz[missing] = sampled
+            else:
+                heights[missing] = self.terrain.sample_points(x[missing], z[missing])[0]
         
-        return self.terrain.get_height_at(local_x, local_z, chunk_x, chunk_z) 
\ No newline at end of file
+        return heights.reshape(shape), dh_dx.reshape(shape), dh_dz.reshape(shape)
@@ -0,0 +1,130 @@
+from OpenGL.GL import *
+import numpy as np
+from car_sim.skybox import Skybox
+from car_sim.terrain_renderer import TerrainRenderer
+from car_sim.road_renderer import RoadRenderer
+from car_sim.vegetation_renderer import TreeRenderer
+
+# Everything of the world that needs a GL context: lighting, the sky and the
+# GPU copies of resident chunks. World itself stays pure data so it can run
+# headless; it hands finished chunks to the renderer when there is one.
+class WorldRenderer:
+    def __init__(self, world):
+        self.world = world
+
+        # Setup lighting first
+        self.setup_lighting()
+
+        self.terrain = TerrainRenderer(world)
+        self.road = RoadRenderer(world)
+        self.vegetation = TreeRenderer(world)
+        self.skybox = Skybox()
+
+        # GPU data goes with the chunk like everything else
+        world.chunk_store.register(self)
+
+    def setup_lighting(self):
+        glEnable(GL_LIGHTING)
+        glEnable(GL_LIGHT0)
+        glEnable(GL_COLOR_MATERIAL)
+
+        # Main directional light (sun)
+        glLightfv(GL_LIGHT0, GL_POSITION, (1.0, 1.0, 2.0, 0.0))
+        glLightfv(GL_LIGHT0, GL_AMBIENT, (0.3, 0.3, 0.3, 1.0))
+        glLightfv(GL_LIGHT0, GL_DIFFUSE, (1.0, 1.0, 0.9, 1.0))
+
+        # Global ambient light
+        glLightModelfv(GL_LIGHT_MODEL_AMBIENT, (0.2, 0.2, 0.2, 1.0))
+
+        # Material properties
+        glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
+        glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, (0.2, 0.2, 0.2, 1.0))
+        glMaterialf(GL_FRONT_AND_BACK, GL_SHININESS, 8.0)
+
+    def build_chunk(self, key, grids, trees):
+        # Runs on a worker thread next to World.build_chunk: vertex data for
+        # the terrain at the LOD level its distance calls for, the road
+        # pieces, and the tree meshes or impostors, no GL calls
+        world = self.world
+        chunk_x, chunk_z = world.chunk_store.chunk_origin(key)
+        level = self.terrain.initial_level(key)
+        grids, mesh = world.terrain.build_chunk(chunk_x, chunk_z, grids, level)
+        road_mesh = world.road.build_chunk_mesh(key, grids[0][0])
+        tree_batch, impostors = self.vegetation.build_chunk(key, trees)
+        return (grids, level, mesh), road_mesh, tree_batch, impostors
+
+    def upload_chunk(self, key, render_data):
+        # Main thread only; returns the bytes handed to the GPU
+        terrain_mesh, road_mesh, tree_batch, impostors = render_data
+        nbytes = self.terrain.upload_chunk(key, *terrain_mesh)
+        self.road.upload_chunk(key, road_mesh)
+        self.vegetation.upload_chunk(key, tree_batch, impostors)
+        if road_mesh is not None:
+            nbytes += road_mesh[0].nbytes
+        if tree_batch is not None:
+            nbytes += tree_batch[0].nbytes
+        if impostors is not None:
+            nbytes += impostors.nbytes
+        return nbytes
+
+    def release_chunk(self, key):
+        self.terrain.release_chunk(key)
+        self.road.release_chunk(key)
+        self.vegetation.release_chunk(key)
+
+    def update(self, camera_pos):
+        self.terrain.update_lods(camera_pos[0], camera_pos[1])
+        self.vegetation.update_lods(camera_pos[0], camera_pos[1])
+
+    def visible_chunks(self, frustum):
+        # Chunks whose bounding box (terrain plus the tallest tree or road
+        # edge it could hold) intersects the view frustum
+        world = self.world
+        keys = list(self.terrain.vertex_buffers)
+        if frustum is None or not keys:
+            return keys
+
+        grid = np.array(keys, dtype=float) * world.chunk_size
+        ranges = np.array([world.terrain.height_ranges[key] for key in keys])
+        pad = max(world.vegetation.max_tree_radius, world.road.width / 2)
+        box_min = np.column_stack([grid - pad, ranges[:, 0]])
+        box_max = np.column_stack([grid + world.chunk_size + pad,
+                                   ranges[:, 1] + world.vegetation.max_tree_height])
+
+        visible = frustum.boxes_visible(box_min, box_max)
+        return [key for key, shown in zip(keys, visible) if shown]
+
+    def draw(self, frustum=None):
+        world = self.world
+
+        # Draw skybox first
+        glDisable(GL_LIGHTING)
+        self.skybox.draw()
+
+        # Enable lighting for terrain and objects
+        glEnable(GL_LIGHTING)
+        glEnable(GL_DEPTH_TEST)
+
+        # Only chunks in view are drawn, terrain and vegetation alike
+        visible = self.visible_chunks(frustum)
+
+        # Draw terrain chunks, one indexed draw call each
+        self.terrain.begin_draw()
+        for key in visible:
+            chunk_x, chunk_z = world.chunk_store.chunk_origin(key)
+            glPushMatrix()
+            glTranslatef(chunk_x, chunk_z, 0)  # Move to chunk position
+            self.terrain.draw_chunk(key)
+            glPopMatrix()
+        self.terrain.end_draw()
+
+        # Draw roads of the visible chunks
+        self.road.draw(visible)
+
+        # Draw vegetation for the visible chunks near the car, with detail
+        # falling off with distance from the camera
+        radius = world.vegetation_distance / world.chunk_size
+        near = [key for key in visible
+                if (key[0] - world.focus_key[0]) ** 2 + (key[1] - world.focus_key[1]) ** 2 <= radius * radius]
+        eye = frustum.eye[:2] if frustum is not None else world.focus_pos
+        self.vegetation.draw(near, eye)
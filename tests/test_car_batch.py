@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from car_sim.car import Car
+from car_sim.car_batch import CarBatch
+from car_sim.world import World
+
+STATE = ['x', 'y', 'z', 'velocity', 'angle', 'current_rpm', 'current_gear', 'pitch', 'drift_angle']
+
+
+@pytest.fixture(scope='module')
+def world():
+    world = World(seed=3, headless=True)
+    yield world
+    world.shutdown()
+
+
+def test_batch_matches_scalar_cars(world):
+    rng = np.random.default_rng(0)
+    count = 32
+    cars = [Car(float(x), float(y), 0.0, world) for x, y in rng.uniform(-150, 150, (count, 2))]
+    for car in cars:
+        car.z = world.get_height_at(car.x, car.y) + 1
+        car.angle = float(rng.uniform(0, 2 * np.pi))
+    # A few cars drive straight at trees, so collisions are covered too
+    trees = world.vegetation.gather_trees(list(world.vegetation.chunk_trees))
+    for car, tree in zip(cars[:6], trees[::7]):
+        car.x, car.y, car.angle = float(tree['x']) - 12, float(tree['z']), 0.0
+    batch = CarBatch.from_cars(cars)
+
+    dt = 1 / 60
+    for step in range(900):
+        # Inputs change every 20 steps; gear shifts happen on those steps
+        inputs = np.random.default_rng(step // 20)
+        throttle = (inputs.random(count) < 0.7).astype(float)
+        brake = (inputs.random(count) < 0.1) * inputs.random(count)
+        steering = inputs.uniform(-1, 1, count) * (inputs.random(count) < 0.5)
+        handbrake = (inputs.random(count) < 0.05).astype(float)
+        up = inputs.random(count) < 0.02
+        down = inputs.random(count) < 0.01
+        shifting = step % 20 == 0
+
+        for i, car in enumerate(cars):
+            car.apply_throttle(throttle[i])
+            car.apply_brake(brake[i])
+            car.apply_steering(steering[i])
+            car.apply_handbrake(handbrake[i])
+            if shifting and up[i]:
+                car.shift_up()
+            if shifting and down[i]:
+                car.shift_down()
+            car.update(dt)
+        batch.apply_throttle(throttle)
+        batch.apply_brake(brake)
+        batch.apply_steering(steering)
+        batch.apply_handbrake(handbrake)
+        if shifting:
+            batch.shift_up(up)
+            batch.shift_down(down)
+        batch.update(dt)
+
+        for name in STATE:
+            scalar = np.array([getattr(car, name) for car in cars], dtype=float)
+            np.testing.assert_allclose(getattr(batch, name), scalar, rtol=0, atol=1e-9,
+                                       err_msg=f"{name} after step {step}")
+    assert np.abs(batch.velocity).max() > 10  # The cars actually went somewhere
@@ -0,0 +1,75 @@
+import numpy as np
+from car_sim.chunk_cache import ChunkCache
+from car_sim.vegetation import TreeSystem
+from car_sim.world import World
+
+LOD_RESOLUTIONS = [4, 2]
+TREE_TYPES = ['PINE', 'OAK']
+
+
+def open_cache(root, generation):
+    return ChunkCache(root, 1, LOD_RESOLUTIONS[0], 100.0, LOD_RESOLUTIONS, TREE_TYPES,
+                      TreeSystem.tree_dtype, generation)
+
+
+def chunk_data(key):
+    rng = np.random.default_rng([key[0] & 0xFF, key[1] & 0xFF])
+    grids = [(rng.random((r + 1, r + 1)), rng.integers(0, 5, (r + 1, r + 1), dtype=np.uint8))
+             for r in LOD_RESOLUTIONS]
+    trees = np.zeros(3, dtype=TreeSystem.tree_dtype)
+    trees['x'] = rng.random(3)
+    trees['type'] = [0, 1, 0]
+    return grids, trees
+
+
+def assert_loaded(cache, key):
+    grids, trees = chunk_data(key)
+    loaded = cache.load(key)
+    assert loaded is not None
+    loaded_grids, loaded_trees = loaded
+    for (heights, biomes), (loaded_heights, loaded_biomes) in zip(grids, loaded_grids):
+        assert np.array_equal(heights, loaded_heights)
+        assert np.array_equal(biomes, loaded_biomes)
+    assert loaded_trees.tobytes() == trees.tobytes()
+
+
+def test_round_trip_across_reopen(tmp_path):
+    generation = {'road': {'width': 8.0}}
+    cache = open_cache(tmp_path, generation)
+    for key in [(0, 0), (-1, 17)]:
+        cache.save(key, *chunk_data(key))
+    assert cache.load((3, 3)) is None
+    assert_loaded(cache, (0, 0))
+    cache.flush()
+
+    reopened = open_cache(tmp_path, generation)
+    assert_loaded(reopened, (0, 0))
+    assert_loaded(reopened, (-1, 17))
+    assert isinstance(reopened.load((0, 0))[1], np.memmap)
+
+
+def test_changed_generation_parameters_clear_the_cache(tmp_path):
+    cache = open_cache(tmp_path, {'road': {'width': 8.0}})
+    cache.save((0, 0), *chunk_data((0, 0)))
+    cache.flush()
+
+    changed = open_cache(tmp_path, {'road': {'width': 9.0}})
+    assert changed.generation_hash != cache.generation_hash
+    assert changed.load((0, 0)) is None
+
+
+def test_seeds_sharing_terrain_seeds_get_their_own_trees(tmp_path):
+    # Both seeds derive the same terrain seeds but place trees differently
+    def chunk_trees(seed, cache_dir):
+        world = World(seed=seed, cache_dir=cache_dir, headless=True)
+        trees = world.vegetation.chunk_tree_array((0, 0)).copy()
+        terrain_seeds = (world.terrain.seed1, world.terrain.seed2)
+        world.shutdown()
+        return trees, terrain_seeds
+
+    first, first_terrain = chunk_trees(5173, tmp_path)
+    cached, second_terrain = chunk_trees(8509, tmp_path)
+    uncached, _ = chunk_trees(8509, None)
+    assert first_terrain == second_terrain
+    assert first.tobytes() != uncached.tobytes()
+    assert cached.tobytes() == uncached.tobytes()
@@ -0,0 +1,60 @@
+import math
+import numpy as np
+from car_sim.road import RoadIndex
+
+
+def brute_force(starts, ends, x, z):
+    distances = [RoadIndex.segment_distance(x, z, *a, *b) for a, b in zip(starts, ends)]
+    best = int(np.argmin(distances))
+    return best, distances[best]
+
+
+def test_nearest_finds_segment_in_neighbouring_cell():
+    # The query sits just left of a cell border; the only close segment is
+    # binned in the cell to its right, far more than radius away from the
+    # cell the point falls in
+    starts = [(0.0, 0.0), (100.0, 0.0)]
+    ends = [(0.0, 200.0), (100.0, 200.0)]
+    index = RoadIndex(starts, ends, radius=4.0)
+    border = index.origin[0] + 3 * index.cell_size
+    x, z = border - 0.5, 100.0
+    cell = 2 * index.shape[1] + int((z - index.origin[1]) // index.cell_size)
+    assert index.cell_start[cell] == index.cell_start[cell + 1]
+
+    expected = brute_force(starts, ends, x, z)
+    segment, distance = index.nearest(x, z)
+    assert segment == expected[0]
+    assert math.isclose(distance, expected[1])
+    assert index.within_width(x, z) == (-1, math.inf)
+
+    segments, distances = index.nearest_batch([x], [z])
+    assert segments[0] == expected[0]
+    assert math.isclose(distances[0], expected[1])
+
+
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(3)
+    starts = rng.uniform(-300, 300, size=(40, 2))
+    ends = starts + rng.uniform(-40, 40, size=(40, 2))
+    index = RoadIndex(starts, ends, radius=6.0)
+
+    # Points inside and well outside the grid
+    xs = rng.uniform(-600, 600, size=500)
+    zs = rng.uniform(-600, 600, size=500)
+    segments, distances = index.nearest_batch(xs, zs)
+    for x, z, segment, distance in zip(xs, zs, segments, distances):
+        expected_segment, expected_distance = brute_force(starts.tolist(), ends.tolist(), x, z)
+        assert math.isclose(distance, expected_distance)
+        assert math.isclose(index.segment_distance(x, z, *starts[segment], *ends[segment]), expected_distance)
+        single_segment, single_distance = index.nearest(x, z)
+        assert single_segment == segment
+        assert math.isclose(single_distance, expected_distance)
+
+
+def test_within_width_is_limited_to_radius():
+    index = RoadIndex([(0.0, 0.0)], [(0.0, 100.0)], radius=5.0)
+    assert index.within_width(3.0, 50.0)[0] == 0
+    assert index.within_width(7.0, 50.0) == (-1, math.inf)
+    segments, distances = index.within_width_batch([3.0, 7.0, 1000.0], [50.0, 50.0, 50.0])
+    assert segments.tolist() == [0, -1, -1]
+    assert math.isclose(distances[0], 3.0) and np.isinf(distances[1:]).all()
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from car_sim.world import World
+
+
+@pytest.fixture(scope='module')
+def terrain():
+    world = World(seed=7, headless=True)
+    yield world.terrain
+    world.shutdown()
+
+
+def sample_grid():
+    # Chunk-like grids around the origin, negative coordinates included
+    offsets = np.arange(26) * 4.0
+    return np.meshgrid(offsets - 60.0, offsets - 40.0, indexing='ij')
+
+
+def test_noise_array_matches_scalar(terrain):
+    world_x, world_z = sample_grid()
+    for scale, seed in [(0.02, terrain.seed1), (0.04, terrain.seed1), (0.08, terrain.seed1),
+                        (0.005, terrain.seed2)]:
+        array = terrain.improved_noise_array(world_x * scale, world_z * scale, seed)
+        scalar = [terrain.improved_noise(x * scale, z * scale, seed)
+                  for x, z in zip(world_x.ravel().tolist(), world_z.ravel().tolist())]
+        assert array.ravel().tolist() == scalar
+
+
+def test_sample_points_matches_scalar_heights_and_biomes(terrain):
+    world_x, world_z = sample_grid()
+    heights, biomes = terrain.sample_points(world_x, world_z)
+    for x, z, height, biome in zip(world_x.ravel().tolist(), world_z.ravel().tolist(),
+                                   heights.ravel().tolist(), biomes.ravel().tolist()):
+        assert height == terrain.get_height_at(x, z, 0.0, 0.0)
+        assert terrain.biomes[biome] == terrain.get_biome(x, z)